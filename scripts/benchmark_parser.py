@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Measure the per-output cost of parsing structured model outputs.
+
+Compares the single-pass parser (core/parser.py) with the original per-key
+regex parser on the same texts and checks that both return the same fields.
+
+Usage:
+    # Synthetic outputs
+    python scripts/benchmark_parser.py --num 20000
+
+    # Raw outputs stored in an output tree (raw_output fields of *_annotation.json)
+    python scripts/benchmark_parser.py --output_dir ./output
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from auto_asset_annotator.core.parser import parse_annotation  # noqa: E402
+
+KEYS = ["Category", "Description", "Material", "Dimensions", "Mass", "Placement"]
+
+
+def legacy_parse(text):
+    """The original parser: one lookahead regex per key over the whole text."""
+    if not text or not text.strip():
+        return {}
+    text = re.sub(r'\s*addCriterion:?\s*', ' ', text, flags=re.IGNORECASE)
+    text = re.sub(r'^\*\*Image\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'(\b\w+\b)(\s+\1){3,}', r'\1', text).strip()
+    if not text:
+        return {}
+    if re.search(r'(?:^|\n)[\*#\-]*\s*Object\s+\d+', text, re.IGNORECASE):
+        match = re.search(r'(?:^|\n)[\*#\-]*[ \t]*\*?[ \t]*Object[ \t]*1:?[ \t]*[^\n]*\n([\s\S]*?)(?=(?:^|\n)[\*#\-]*[ \t]*\*?[ \t]*Object[ \t]*2:|\Z)', text, re.IGNORECASE)
+        if match:
+            text = match.group(1).strip()
+    result = {}
+    for key in KEYS:
+        pattern = r"(?:^|\n)[\*#\-]*\s*(" + key + r")\s*:\s*([\s\S]*?)(?=(?:^|\n)[\*#\-]*\s*(?:Category|Description|Material|Dimensions|Mass|Placement)\s*:|$)"
+        match = re.search(pattern, text, re.IGNORECASE)
+        result[key.lower()] = re.sub(r'^[\*#\-]*\s*', '', match.group(2).strip()) if match else None
+    if all(v is None for v in result.values()):
+        return {}
+    return result
+
+
+WORDS = (
+    "the a an wooden metal plastic ceramic glass fabric round flat square tall short wide narrow handle body base "
+    "frame top leg legs seat back surface edge corner smooth glossy matte painted polished textured white black "
+    "gray brown blue red green light dark small large sturdy simple modern classic decorative functional used for "
+    "holding storing placing sitting with and of on in at its which has is are"
+).split()
+
+
+def synthetic_outputs(num, seed=0):
+    """Outputs in the requested format, with markdown headers and multi-object variants mixed in."""
+    rng = random.Random(seed)
+
+    def sentence(n):
+        words = [rng.choice(WORDS)]
+        while len(words) < n:
+            word = rng.choice(WORDS)
+            if word != words[-1]:
+                words.append(word)
+        return " ".join(words).capitalize() + "."
+
+    outputs = []
+    for i in range(num):
+        fields = [
+            f"Category: object{i % 50}",
+            "Description: " + " ".join(sentence(rng.randint(8, 20)) for _ in range(rng.randint(3, 4))),
+            "Material: " + ", ".join(rng.sample(WORDS, rng.randint(2, 6))),
+            f"Dimensions: {rng.random():.2f} * {rng.random():.2f} * {rng.random():.2f}" + rng.choice(["", " m", " meters"]),
+            f"Mass: {rng.random() * 10:.1f}" + rng.choice(["", " kg"]),
+            "Placement: " + rng.choice(["OnFloor", "OnTable, OnFloor", "OnWall"]),
+        ]
+        style = rng.random()
+        if style < 0.3:
+            text = "\n".join("**" + f.replace(": ", ":** ", 1) for f in fields)
+        elif style < 0.4:
+            text = "### Object 1\n\n" + "\n\n".join(fields) + "\n\n### Object 2\n\n" + "\n".join(fields[:3])
+        else:
+            text = "\n".join(fields)
+        outputs.append(text)
+    return outputs
+
+
+def stored_outputs(output_dir):
+    outputs = []
+    for root, _, files in os.walk(output_dir):
+        for name in files:
+            if not name.endswith("_annotation.json"):
+                continue
+            try:
+                with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for value in data.values() if isinstance(data, dict) else []:
+                if isinstance(value, dict) and isinstance(value.get("raw_output"), str):
+                    outputs.append(value["raw_output"])
+    return outputs
+
+
+def time_parser(parse, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            parse(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the structured output parser")
+    parser.add_argument("--output_dir", help="Parse raw_output fields stored under this directory")
+    parser.add_argument("--num", type=int, default=20000, help="Number of synthetic outputs")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeats (best is reported)")
+    args = parser.parse_args()
+
+    texts = stored_outputs(args.output_dir) if args.output_dir else synthetic_outputs(args.num)
+    if not texts:
+        print("No outputs to parse.")
+        return
+    mismatches = sum(parse_annotation(text) != legacy_parse(text) for text in texts)
+
+    legacy = time_parser(legacy_parse, texts, args.repeat)
+    single_pass = time_parser(parse_annotation, texts, args.repeat)
+    print(f"Outputs:      {len(texts)} (avg {sum(map(len, texts)) / len(texts):.0f} chars)")
+    print(f"Per-key regex: {legacy / len(texts) * 1e6:8.1f} us/output  ({legacy:.2f}s total)")
+    print(f"Single pass:   {single_pass / len(texts) * 1e6:8.1f} us/output  ({single_pass:.2f}s total)")
+    print(f"Speedup:       {legacy / single_pass:.1f}x")
+    print(f"Mismatches:    {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
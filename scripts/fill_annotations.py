@@ -9,17 +9,39 @@ And fills them into target files at:
     /cpfs/shared/simulation/zhuzihou/dev/usd-scene-physics-prep/GRScenes-test1/GRScenes_assets/{category}/{asset_id}/{asset_id}_annotation.json
 
 Fields filled: description, material, dimensions, mass, placement
+
+The source is read with the annotator's output store reader (per-asset files
+or JSONL shards). Target asset directories are indexed with one listing per
+category, the read-modify-write of the targets runs on a thread pool
+(--workers, sized for network storage where each file access is a round
+trip), and only targets whose content changes are written, atomically.
+A hash of the values filled into each target, with the target file's
+mtime and size after the fill, is kept in the source directory
+(.fill_ledger.json.gz): a re-run stats such targets instead of reading
+them, and re-reads any target replaced since; --verify re-reads every
+target regardless.
 """
 
+import gzip
+import hashlib
 import json
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from auto_asset_annotator.utils.output_store import open_output_store  # noqa: E402
 
 # Paths
 SOURCE_DIR = Path("/cpfs/shared/simulation/zhuzihou/dev/Auto-Asset-Annotator/output")
 TARGET_DIR = Path("/cpfs/shared/simulation/zhuzihou/dev/usd-scene-physics-prep/GRScenes-test1/GRScenes_assets")
 
+LEDGER_FILENAME = ".fill_ledger.json.gz"
+TEXT_FIELDS = ["description", "material", "dimensions", "mass"]
+
 
 def parse_placement(placement_value: Optional[str]) -> list:
     """
@@ -36,82 +58,90 @@ def parse_placement(placement_value: Optional[str]) -> list:
     return [p for p in placements if p]
 
 
-def process_annotation(source_file: Path, target_file: Path, dry_run: bool = False) -> dict:
+def fill_values(source_annotation: dict) -> dict:
+    """The target fields a source annotation sets (empty values are not filled)."""
+    values = {}
+    for field in TEXT_FIELDS:
+        source_value = source_annotation.get(field)
+        # Skip None or empty values
+        if source_value is not None and source_value != "":
+            values[field] = source_value
+
+    # Placement needs format conversion
+    source_placement = source_annotation.get("placement")
+    if source_placement is not None and source_placement != "":
+        values["placement"] = parse_placement(source_placement)
+    return values
+
+
+def values_hash(values: dict) -> str:
+    return hashlib.sha1(json.dumps(values, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def file_stamp(path: Path) -> List[int]:
+    """[mtime_ns, size] of a file: changes whenever the file is rewritten or replaced."""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def process_annotation(asset_key: str, values: dict, target_file: Path, dry_run: bool = False,
+                       filled: Optional[list] = None) -> dict:
     """
-    Process a single annotation file pair.
-    Returns status dict with success/failure info.
+    Fill values into one target file.
+    filled is the ledger entry [values hash, mtime_ns, size] recorded when the
+    same values were last filled into this target: if the target's stamp still
+    matches, it is skipped without being read.
+    Returns status dict with success/failure info; "stamp" is the target's
+    [mtime_ns, size] once it holds the values (None in dry runs that would write).
     """
     result = {
-        "source": str(source_file),
+        "source": asset_key,
         "target": str(target_file),
         "success": False,
         "skipped": False,
+        "missing": False,
         "error": None,
-        "fields_updated": []
+        "fields_updated": [],
+        "stamp": None,
     }
 
     try:
-        # Read source file
-        with open(source_file, 'r', encoding='utf-8') as f:
-            source_data = json.load(f)
-
-        # Source has nested structure: {"category/asset_id": {fields...}}
-        if not source_data:
-            result["error"] = "Empty source file"
-            return result
-
-        # Get the nested data (first and only value)
-        source_annotation = list(source_data.values())[0]
-
-        # Check for raw_output field (indicates parse failure, skip these)
-        if "raw_output" in source_annotation:
+        if filled is not None and filled[1:] == file_stamp(target_file):
             result["skipped"] = True
-            result["error"] = "Source has raw_output (parse failure)"
+            result["error"] = "No changes needed (unchanged since last fill)"
+            result["stamp"] = filled[1:]
             return result
 
         # Read target file
         with open(target_file, 'r', encoding='utf-8') as f:
             target_data = json.load(f)
 
-        # Fields to copy
-        fields = ["description", "material", "dimensions", "mass"]
-
-        # Track if any changes were made
-        changes_made = False
-
-        for field in fields:
-            source_value = source_annotation.get(field)
-            # Skip None or empty values
-            if source_value is not None and source_value != "":
-                if target_data.get(field) != source_value:
-                    target_data[field] = source_value
-                    result["fields_updated"].append(field)
-                    changes_made = True
-
-        # Handle placement separately (needs format conversion)
-        source_placement = source_annotation.get("placement")
-        if source_placement is not None and source_placement != "":
-            target_placement = parse_placement(source_placement)
-            if target_data.get("placement") != target_placement:
-                target_data["placement"] = target_placement
-                result["fields_updated"].append("placement")
-                changes_made = True
-
-        if not changes_made:
+        # Content would not change: compare the hash of the target's current values
+        current = {field: target_data.get(field) for field in values}
+        if values_hash(current) == values_hash(values):
             result["skipped"] = True
             result["error"] = "No changes needed (target already has data)"
+            result["stamp"] = file_stamp(target_file)
             return result
 
-        # Write updated target file
+        for field, value in values.items():
+            if target_data.get(field) != value:
+                target_data[field] = value
+                result["fields_updated"].append(field)
+
+        # Write updated target file (temporary file + rename: never a truncated target)
         if not dry_run:
-            with open(target_file, 'w', encoding='utf-8') as f:
+            tmp_file = f"{target_file}.tmp.{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump(target_data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, target_file)
+            result["stamp"] = file_stamp(target_file)
 
         result["success"] = True
         return result
 
-    except FileNotFoundError as e:
-        result["error"] = f"File not found: {e}"
+    except FileNotFoundError:
+        result["missing"] = True  # asset directory without an annotation file
         return result
     except json.JSONDecodeError as e:
         result["error"] = f"JSON decode error: {e}"
@@ -121,35 +151,52 @@ def process_annotation(source_file: Path, target_file: Path, dry_run: bool = Fal
         return result
 
 
-def find_matching_target(source_file: Path) -> Optional[Path]:
+def build_target_index(target_dir: Path, categories: Iterable[str], workers: int) -> Dict[str, Path]:
     """
-    Find the matching target file for a given source file.
-    Source: .../output/{category}/{asset_id}_annotation.json
+    {category/asset_id: target file} for every asset directory of the given
+    categories: one directory listing per category, listed in parallel,
+    instead of an existence check per asset.
     Target: .../{category}/{asset_id}/{asset_id}_annotation.json
     """
-    # Parse source path
-    parts = source_file.relative_to(SOURCE_DIR).parts
-    if len(parts) != 2:
-        return None
-
-    category = parts[0]
-    filename = parts[1]  # {asset_id}_annotation.json
-
-    # Extract asset_id from filename
-    if not filename.endswith("_annotation.json"):
-        return None
-
-    asset_id = filename[:-len("_annotation.json")]
+    def list_category(category):
+        try:
+            with os.scandir(target_dir / category) as entries:
+                return category, [entry.name for entry in entries if entry.is_dir()]
+        except (FileNotFoundError, NotADirectoryError):
+            return category, []
+
+    index = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for category, asset_ids in executor.map(list_category, sorted(categories)):
+            for asset_id in asset_ids:
+                index[f"{category}/{asset_id}"] = target_dir / category / asset_id / f"{asset_id}_annotation.json"
+    return index
+
+
+def load_ledger(source_dir: Path, target_dir: Path) -> Dict[str, list]:
+    """
+    {asset: [hash of the values last filled into its target, target mtime_ns, target size]}
+    for this target tree.
+    """
+    try:
+        with gzip.open(source_dir / LEDGER_FILENAME, "rt", encoding="utf-8") as f:
+            ledger = json.load(f)
+    except (OSError, ValueError, EOFError):
+        return {}
+    if ledger.get("target_dir") != str(target_dir):
+        return {}
+    return {asset: entry for asset, entry in ledger["assets"].items() if isinstance(entry, list) and len(entry) == 3}
 
-    # Build target path
-    target_file = TARGET_DIR / category / asset_id / f"{asset_id}_annotation.json"
 
-    if target_file.exists():
-        return target_file
-    return None
+def save_ledger(source_dir: Path, target_dir: Path, assets: Dict[str, list]) -> None:
+    tmp_path = source_dir / f"{LEDGER_FILENAME}.tmp.{os.getpid()}"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({"target_dir": str(target_dir), "assets": assets}, f)
+    os.replace(tmp_path, source_dir / LEDGER_FILENAME)
 
 
-def main(dry_run: bool = True, limit: Optional[int] = None, category_filter: Optional[str] = None):
+def main(dry_run: bool = True, limit: Optional[int] = None, category_filter: Optional[str] = None,
+         source_dir: Path = SOURCE_DIR, target_dir: Path = TARGET_DIR, workers: int = 32, verify: bool = False):
     """
     Main processing function.
 
@@ -157,26 +204,29 @@ def main(dry_run: bool = True, limit: Optional[int] = None, category_filter: Opt
         dry_run: If True, don't actually write changes
         limit: Maximum number of files to process (for testing)
         category_filter: Only process this category (for testing)
+        source_dir: Annotator output directory to read
+        target_dir: GRScenes assets directory to fill
+        workers: Threads reading and writing target files
+        verify: Ignore the fill ledger and read every target
     """
-    # Find all source files
-    if category_filter:
-        source_pattern = SOURCE_DIR / category_filter / "*_annotation.json"
-        source_files = list(SOURCE_DIR.glob(f"{category_filter}/*_annotation.json"))
-    else:
-        source_files = list(SOURCE_DIR.glob("*/*_annotation.json"))
+    # Read all source annotations (per-asset files or JSONL shards)
+    annotations = {
+        asset_key: annotation for asset_key, annotation in open_output_store(str(source_dir)).iter_results()
+        if len(asset_key.split("/")) == 2 and (not category_filter or asset_key.split("/")[0] == category_filter)
+    }
 
     # Sort for deterministic ordering
-    source_files.sort()
+    asset_keys = sorted(annotations)
 
-    print(f"Found {len(source_files)} source annotation files")
+    print(f"Found {len(asset_keys)} source annotations")
 
     if limit:
-        source_files = source_files[:limit]
+        asset_keys = asset_keys[:limit]
         print(f"Limited to first {limit} files")
 
     # Statistics
     stats = {
-        "total": 0,
+        "total": len(asset_keys),
         "success": 0,
         "skipped": 0,
         "failed": 0,
@@ -184,31 +234,60 @@ def main(dry_run: bool = True, limit: Optional[int] = None, category_filter: Opt
         "fields_updated": {}
     }
 
-    for source_file in source_files:
-        stats["total"] += 1
-
-        # Find matching target
-        target_file = find_matching_target(source_file)
-        if not target_file:
-            stats["no_target"] += 1
+    index = build_target_index(target_dir, {asset_key.split("/")[0] for asset_key in asset_keys}, workers)
+    filled = load_ledger(source_dir, target_dir)  # updated with this run's fills
+    ledger = {} if verify else dict(filled)
+    tasks = []
+    for asset_key in asset_keys:
+        annotation = annotations[asset_key]
+        if not isinstance(annotation, dict) or not annotation:
+            stats["failed"] += 1
+            print(f"Failed: {asset_key} - Empty or unreadable source annotation")
             continue
-
-        # Process the file
-        result = process_annotation(source_file, target_file, dry_run=dry_run)
-
-        if result["success"]:
-            stats["success"] += 1
-            for field in result["fields_updated"]:
-                stats["fields_updated"][field] = stats["fields_updated"].get(field, 0) + 1
-        elif result["skipped"]:
+        # Check for raw_output field (indicates parse failure, skip these)
+        if "raw_output" in annotation:
             stats["skipped"] += 1
-        else:
-            stats["failed"] += 1
-            print(f"Failed: {source_file} - {result['error']}")
-
-        # Progress report every 1000 files
-        if stats["total"] % 1000 == 0:
-            print(f"Processed {stats['total']} files... (success: {stats['success']}, skipped: {stats['skipped']}, failed: {stats['failed']})")
+            continue
+        target_file = index.get(asset_key)
+        if target_file is None:
+            stats["no_target"] += 1
+            continue
+        values = fill_values(annotation)
+        digest = values_hash(values)
+        entry = ledger.get(asset_key)
+        # Same values already filled: the target only needs a stat to confirm it was not replaced since
+        tasks.append((asset_key, values, target_file, digest, entry if entry and entry[0] == digest else None))
+    unchanged = sum(1 for task in tasks if task[4] is not None)
+    if unchanged:
+        print(f"{len(tasks)} targets to check ({unchanged} filled by an earlier run: stat only)")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(process_annotation, asset_key, values, target_file, dry_run, entry): (asset_key, digest)
+                   for asset_key, values, target_file, digest, entry in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            asset_key, digest = futures[future]
+            result = future.result()
+
+            if result["stamp"] is not None:
+                filled[asset_key] = [digest] + result["stamp"]
+            if result["success"]:
+                stats["success"] += 1
+                for field in result["fields_updated"]:
+                    stats["fields_updated"][field] = stats["fields_updated"].get(field, 0) + 1
+            elif result["skipped"]:
+                stats["skipped"] += 1
+            elif result["missing"]:
+                stats["no_target"] += 1
+            else:
+                stats["failed"] += 1
+                print(f"Failed: {result['target']} - {result['error']}")
+
+            # Progress report every 1000 files
+            if done % 1000 == 0:
+                print(f"Processed {done}/{len(tasks)} targets... (success: {stats['success']}, skipped: {stats['skipped']}, failed: {stats['failed']})")
+
+    if not dry_run:
+        save_ledger(source_dir, target_dir, filled)
 
     # Final report
     print("\n" + "="*60)
@@ -237,6 +316,12 @@ if __name__ == "__main__":
     parser.add_argument("--apply", action="store_true", help="Actually apply changes (default is dry-run)")
     parser.add_argument("--limit", type=int, help="Limit to first N files (for testing)")
     parser.add_argument("--category", type=str, help="Only process specific category (for testing)")
+    parser.add_argument("--source_dir", type=Path, default=SOURCE_DIR, help="Annotator output directory")
+    parser.add_argument("--target_dir", type=Path, default=TARGET_DIR, help="GRScenes assets directory")
+    parser.add_argument("--workers", type=int, default=32,
+                        help="Threads reading and writing targets (network storage: many in flight)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Read every target, ignoring the fill ledger")
 
     args = parser.parse_args()
 
@@ -245,4 +330,5 @@ if __name__ == "__main__":
         print("*** DRY RUN MODE ***")
         print("No files will be modified. Use --apply to apply changes.\n")
 
-    main(dry_run=dry_run, limit=args.limit, category_filter=args.category)
+    main(dry_run=dry_run, limit=args.limit, category_filter=args.category,
+         source_dir=args.source_dir, target_dir=args.target_dir, workers=args.workers, verify=args.verify)
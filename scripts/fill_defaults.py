@@ -3,8 +3,16 @@
 Fill empty physical property fields with category-based default values.
 
 For assets where VLM annotation left material, mass, or placement empty,
-this script fills in reasonable defaults derived from statistical analysis
-of existing annotations (medians, modes) for each category.
+this script fills in reasonable defaults derived from the annotations
+themselves: the most common material / placement and the median mass and
+dimensions of each category, read from the category statistics the
+annotator keeps up to date in the output directory (.category_stats.sqlite).
+Reading them costs nothing however many annotations there are; an output
+directory without statistics is counted once. Categories (fields) with fewer
+than --min_samples annotated values use the static table below, then the
+statistics over all categories, then its _default entry.
+
+Filled values are not counted into the statistics.
 
 Dimensions are NOT filled by default (too model-specific to generalize).
 
@@ -17,15 +25,24 @@ Usage:
 
     # Also fill dimensions (optional)
     python scripts/fill_defaults.py --output_dir ./output --asset_list remaining_incomplete.txt --apply --fill_dimensions
+
+    # Recount the statistics (e.g. after editing outputs outside the annotator)
+    python scripts/fill_defaults.py --output_dir ./output --asset_list remaining_incomplete.txt --rebuild_stats
 """
 import os
 import re
-import json
+import sys
 import argparse
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from auto_asset_annotator.utils.category_stats import CategoryStats  # noqa: E402
+from auto_asset_annotator.utils.manifest import AnnotationManifest, classify_result  # noqa: E402
+from auto_asset_annotator.utils.output_store import open_output_store  # noqa: E402
+
 MASS_PATTERN = re.compile(r'^\d+\.?\d*$')
 
-# Default values per category, derived from statistical analysis of 50k+ annotations.
+# Fallback defaults per category for categories with too few annotations,
+# from a one-off analysis of 50k+ annotations.
 # material: most common material description for the category
 # mass: median mass in kg
 # dimensions: median W * D * H in meters
@@ -124,9 +141,33 @@ def is_mass_invalid(value):
     return False
 
 
-def get_defaults(category):
-    """Get default values for a category, falling back to _default."""
-    return CATEGORY_DEFAULTS.get(category, CATEGORY_DEFAULTS["_default"])
+class DefaultsResolver:
+    """
+    Per-field defaults of a category: category statistics, then the static
+    category entry, then statistics over all categories, then _default.
+    Each category's statistics are read once.
+    """
+
+    def __init__(self, stats, min_samples):
+        self.stats = stats
+        self.min_samples = min_samples
+        self.global_defaults = stats.defaults(None, min_samples)
+        self.cache = {}
+        self.sources = {}  # category -> {field: source}
+
+    def get(self, category):
+        if category not in self.cache:
+            learned = self.stats.defaults(category, self.min_samples)
+            static = CATEGORY_DEFAULTS.get(category, {})
+            defaults, sources = {}, {}
+            for field in ("material", "mass", "dimensions", "placement"):
+                for source, values in (("stats", learned), ("static", static), ("global", self.global_defaults),
+                                       ("fallback", CATEGORY_DEFAULTS["_default"])):
+                    if field in values:
+                        defaults[field], sources[field] = values[field], source
+                        break
+            self.cache[category], self.sources[category] = defaults, sources
+        return self.cache[category]
 
 
 def main():
@@ -141,8 +182,23 @@ def main():
                         help="Actually write changes (default: dry-run)")
     parser.add_argument("--fill_dimensions", action="store_true",
                         help="Also fill dimensions field (disabled by default)")
+    parser.add_argument("--min_samples", type=int, default=20,
+                        help="Annotated values a category needs before its statistics are used")
+    parser.add_argument("--rebuild_stats", action="store_true",
+                        help="Recount the category statistics from every stored annotation")
     args = parser.parse_args()
 
+    # Per-asset files or JSONL shards, whichever the output directory holds
+    store = open_output_store(args.output_dir)
+    stats = CategoryStats(args.output_dir)
+    if args.rebuild_stats:
+        stats.clear()
+    if not stats.synced:
+        # One-time count of annotations written before the statistics existed
+        print(f"Counting category statistics of {args.output_dir}...")
+        print(f"Counted {stats.sync_from_results(store.iter_results())} annotations.")
+    resolver = DefaultsResolver(stats, args.min_samples)
+
     # Read asset list
     with open(args.asset_list, "r") as f:
         asset_ids = [line.strip() for line in f if line.strip()]
@@ -163,37 +219,29 @@ def main():
     category_update_counts = {}  # category -> count of assets updated
     missing_category_defaults = set()
 
+    valid_ids = []
     for asset_id in asset_ids:
-        parts = asset_id.split("/")
-        if len(parts) != 2:
+        if len(asset_id.split("/")) != 2:
             print(f"  WARN: Invalid asset ID format: {asset_id}")
             continue
+        valid_ids.append(asset_id)
+    annotations = store.get_many(valid_ids)
+    updates = []
 
-        category, uuid = parts
-        annotation_file = os.path.join(args.output_dir, category, f"{uuid}_annotation.json")
+    for asset_id in valid_ids:
+        category = asset_id.split("/")[0]
 
-        if not os.path.exists(annotation_file):
+        if asset_id not in annotations:
             not_found_count += 1
             continue
 
-        try:
-            with open(annotation_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"  WARN: Failed to read {annotation_file}: {e}")
-            continue
-
-        if not isinstance(data, dict) or len(data) == 0:
-            continue
-
-        key = list(data.keys())[0]
-        ann = data[key]
+        ann = annotations[asset_id]
 
         if not isinstance(ann, dict):
             continue
 
-        defaults = get_defaults(category)
-        if category not in CATEGORY_DEFAULTS and category != "_default":
+        defaults = resolver.get(category)
+        if "fallback" in resolver.sources[category].values():
             missing_category_defaults.add(category)
 
         changed = False
@@ -217,11 +265,16 @@ def main():
         if changed:
             updated_count += 1
             category_update_counts[category] = category_update_counts.get(category, 0) + 1
+            updates.append((asset_id, ann))
 
-            if args.apply:
-                data[key] = ann
-                with open(annotation_file, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4, ensure_ascii=False)
+    if args.apply:
+        store.write_many(updates)
+        # Filled assets are complete now; otherwise --retry_incomplete would re-annotate them and undo the fill
+        manifest = AnnotationManifest(args.output_dir)
+        manifest.record_statuses({asset_id: classify_result(ann) for asset_id, ann in updates})
+        manifest.close()
+    store.close()
+    stats.close()
 
     # Report
     print(f"{'=' * 60}")
@@ -243,8 +296,9 @@ def main():
         print(f"\nPer-category updates (top 20):")
         sorted_cats = sorted(category_update_counts.items(), key=lambda x: x[1], reverse=True)
         for cat, count in sorted_cats[:20]:
-            using_fallback = " (fallback)" if cat in missing_category_defaults else ""
-            print(f"  {cat}: {count}{using_fallback}")
+            sources = ", ".join(f"{field} {source}" for field, source in resolver.sources[cat].items()
+                                if field in fields_to_fill)
+            print(f"  {cat}: {count} ({sources})")
 
     if not args.apply:
         print(f"\nThis was a DRY-RUN. Use --apply to write changes.")
@@ -1,8 +1,9 @@
 import argparse
 import os
-import glob
-import json
-from tqdm import tqdm
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from auto_asset_annotator.audit import AnnotationTable  # noqa: E402
 
 def main():
     parser = argparse.ArgumentParser(description="Find assets that were successfully processed.")
@@ -10,32 +11,10 @@ def main():
     parser.add_argument("--save_list", default="success_assets.txt", help="File to save the list of success asset IDs")
     args = parser.parse_args()
 
-    # Find all JSON files recursively
-    json_files = glob.glob(os.path.join(args.output_dir, "**/*_annotation.json"), recursive=True)
-    
-    success_assets = []
-    
     print(f"Scanning {args.output_dir}...")
-    for json_file in tqdm(json_files):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Asset ID is the key in the JSON
-            # e.g. "bowl/123..."
-            if not data:
-                continue
-                
-            asset_id = list(data.keys())[0]
-            content = data[asset_id]
-            
-            # Check for success: NO "raw_output" field
-            if "raw_output" not in content:
-                success_assets.append(asset_id)
-                
-        except Exception as e:
-            # If JSON is invalid, it's definitely not a success
-            pass
+    # Success: readable and NO "raw_output" field
+    table = AnnotationTable.load(args.output_dir)
+    success_assets = table.select(table.success)
 
     print(f"Found {len(success_assets)} success assets.")
     
@@ -14,9 +14,12 @@ Usage:
 """
 import os
 import re
-import json
+import sys
 import argparse
-from tqdm import tqdm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from auto_asset_annotator.utils.manifest import AnnotationManifest, classify_result  # noqa: E402
+from auto_asset_annotator.utils.output_store import open_output_store  # noqa: E402
 
 
 DIMENSIONS_PATTERN = re.compile(r'^\d+\.?\d*\s*\*\s*\d+\.?\d*\s*\*\s*\d+\.?\d*$')
@@ -78,77 +81,66 @@ def main():
     print(f"Mode: {'APPLY' if args.apply else 'DRY-RUN'}")
     print()
 
-    for root, dirs, files in os.walk(args.new_dir):
-        for file in files:
-            if not file.endswith("_annotation.json"):
-                continue
-
-            new_path = os.path.join(root, file)
-
-            # Compute corresponding old path
-            rel_path = os.path.relpath(new_path, args.new_dir)
-            old_path = os.path.join(args.old_dir, rel_path)
-
-            if not os.path.exists(old_path):
-                no_new_count += 1
-                continue
-
-            try:
-                with open(new_path, 'r', encoding='utf-8') as f:
-                    new_data = json.load(f)
-                with open(old_path, 'r', encoding='utf-8') as f:
-                    old_data = json.load(f)
-            except Exception as e:
-                print(f"  WARN: Failed to read {rel_path}: {e}")
-                continue
-
-            if not isinstance(old_data, dict) or not isinstance(new_data, dict):
-                continue
-
-            old_key = list(old_data.keys())[0]
-            new_key = list(new_data.keys())[0]
-
-            old_ann = old_data[old_key]
-            new_ann = new_data[new_key]
-
-            if not isinstance(old_ann, dict) or not isinstance(new_ann, dict):
-                continue
-
-            # Skip if new annotation is also a failure
-            if "raw_output" in new_ann:
-                skipped_count += 1
-                continue
-
-            changed = False
-            for field in merge_fields:
-                old_val = old_ann.get(field)
-                new_val = new_ann.get(field)
-
-                # Only update if old value is empty or invalid
-                if is_field_invalid(field, old_val):
-                    if not is_field_empty(new_val):
-                        # For dimensions and mass, also validate new value format
-                        if field == "dimensions" and isinstance(new_val, str):
-                            if not DIMENSIONS_PATTERN.match(new_val.strip()):
-                                continue  # New value also bad format, skip
-                        if field == "mass" and isinstance(new_val, str):
-                            if not MASS_PATTERN.match(new_val.strip()):
-                                continue  # New value also bad format, skip
-
-                        old_ann[field] = new_val
-                        field_update_counts[field] += 1
-                        changed = True
-                    else:
-                        new_also_empty += 1
-
-            if changed:
-                updated_count += 1
-                if args.apply:
-                    old_data[old_key] = old_ann
-                    with open(old_path, 'w', encoding='utf-8') as f:
-                        json.dump(old_data, f, indent=4, ensure_ascii=False)
-            else:
-                skipped_count += 1
+    # Per-asset files or JSONL shards, whichever each directory holds
+    new_store = open_output_store(args.new_dir)
+    old_store = open_output_store(args.old_dir)
+    new_results = new_store.load_all()
+    old_results = old_store.get_many(new_results)
+    updates = []
+
+    for asset_name, new_ann in new_results.items():
+        if asset_name not in old_results:
+            no_new_count += 1
+            continue
+
+        old_ann = old_results[asset_name]
+        if old_ann is None or new_ann is None:
+            print(f"  WARN: Failed to read {asset_name}")
+            continue
+
+        if not isinstance(old_ann, dict) or not isinstance(new_ann, dict):
+            continue
+
+        # Skip if new annotation is also a failure
+        if "raw_output" in new_ann:
+            skipped_count += 1
+            continue
+
+        changed = False
+        for field in merge_fields:
+            old_val = old_ann.get(field)
+            new_val = new_ann.get(field)
+
+            # Only update if old value is empty or invalid
+            if is_field_invalid(field, old_val):
+                if not is_field_empty(new_val):
+                    # For dimensions and mass, also validate new value format
+                    if field == "dimensions" and isinstance(new_val, str):
+                        if not DIMENSIONS_PATTERN.match(new_val.strip()):
+                            continue  # New value also bad format, skip
+                    if field == "mass" and isinstance(new_val, str):
+                        if not MASS_PATTERN.match(new_val.strip()):
+                            continue  # New value also bad format, skip
+
+                    old_ann[field] = new_val
+                    field_update_counts[field] += 1
+                    changed = True
+                else:
+                    new_also_empty += 1
+
+        if changed:
+            updated_count += 1
+            updates.append((asset_name, old_ann))
+        else:
+            skipped_count += 1
+
+    if args.apply:
+        old_store.write_many(updates)
+        # The status index decides what the next run re-annotates: merged assets are no longer failed / incomplete
+        manifest = AnnotationManifest(args.old_dir)
+        manifest.record_statuses({asset_name: classify_result(result) for asset_name, result in updates})
+        manifest.close()
+    old_store.close()
 
     # Report
     print(f"\n{'=' * 60}")
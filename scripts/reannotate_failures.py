@@ -10,87 +10,32 @@ Usage:
     python scripts/reannotate_failures.py --output_dir ./output --save_list failed_assets.txt
 """
 
-import json
 import os
-import re
+import sys
 import argparse
 from collections import defaultdict
-from pathlib import Path
-from tqdm import tqdm
 
-
-def is_image_only_failure(text: str) -> bool:
-    """Check if output is just '**Image' with whitespace."""
-    if not text:
-        return False
-    # Pattern: optional whitespace, **Image, optional whitespace, end
-    return bool(re.match(r'^\s*\*\*Image\s*$', text.strip()))
-
-
-def is_multi_object_format(text: str) -> bool:
-    """Detect multi-object output format."""
-    if not text:
-        return False
-    return bool(re.search(r'(?:^|\n)[\*#\-]*\s*Object\s+\d+', text, re.IGNORECASE))
-
-
-def is_truncated(text: str) -> bool:
-    """Detect truncated output."""
-    if not text:
-        return False
-    text = text.rstrip()
-    return text.endswith(('...', ':', ' -', 'Object', 'Category'))
-
-
-def categorize_failure(raw_output: str) -> str:
-    """Categorize failure type."""
-    if is_image_only_failure(raw_output):
-        return "image_only"
-    elif is_truncated(raw_output):
-        return "truncated"
-    elif is_multi_object_format(raw_output):
-        return "multi_object"
-    else:
-        return "other"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from auto_asset_annotator.audit import FAILURE_TYPES, AnnotationTable  # noqa: E402
 
 
 def load_failed_assets(output_dir: str):
-    """Load all failed annotations with categorization."""
+    """Load all failed annotations with categorization (audit engine, one pass)."""
+    table = AnnotationTable.load(output_dir)
+    failure_types = table.failure_types()
+    raw_outputs = table.columns["raw_output"]
     failed = []
 
-    json_files = list(Path(output_dir).rglob("*_annotation.json"))
-
-    for filepath in tqdm(json_files, desc="Scanning for failures"):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            if not data or len(data) != 1:
-                continue
-
-            asset_key = list(data.keys())[0]
-            record = data[asset_key]
-
-            if 'raw_output' not in record:
-                continue
-
-            raw = record['raw_output']
-            failure_type = categorize_failure(raw)
-
-            # Get relative path for asset ID
-            rel_path = os.path.relpath(filepath, output_dir)
-            category = rel_path.split(os.sep)[0]
-
-            failed.append({
-                'filepath': str(filepath),
-                'asset_key': asset_key,
-                'category': category,
-                'failure_type': failure_type,
-                'raw_sample': raw[:200] if len(raw) > 200 else raw
-            })
-
-        except Exception as e:
-            print(f"Error reading {filepath}: {e}")
+    for i in (failure_types >= 0).nonzero()[0]:
+        raw = raw_outputs.values[raw_outputs.codes[i]]
+        raw = raw if isinstance(raw, str) else ""
+        asset_key = table.assets[i]
+        failed.append({
+            'asset_key': asset_key,
+            'category': asset_key.split("/")[0],
+            'failure_type': FAILURE_TYPES[failure_types[i]],
+            'raw_sample': raw[:200] if len(raw) > 200 else raw
+        })
 
     return failed
 
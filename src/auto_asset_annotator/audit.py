@@ -0,0 +1,298 @@
+"""
+Quality audit of an output directory in one pass.
+
+Loads every stored annotation (per-asset files or JSONL shards) once into a
+columnar AnnotationTable and computes, with array operations, everything
+scripts/find_failed_assets.py, find_incomplete_assets.py,
+find_success_assets.py and reannotate_failures.py report: failed and
+corrupted assets, empty and badly formatted physical property fields,
+failure types of raw outputs and per-category counts. Writes the retry list
+of each of those scripts, ready for --asset_list_file.
+
+Usage:
+    auto-annotator audit --output_dir ./output --save_dir ./audit
+"""
+
+import argparse
+import gc
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .utils.output_store import open_output_store
+
+# Valid dimensions: "X * Y * Z" with numeric values; valid mass: purely numeric
+DIMENSIONS_PATTERN = re.compile(r'^\d+\.?\d*\s*\*\s*\d+\.?\d*\s*\*\s*\d+\.?\d*$')
+MASS_PATTERN = re.compile(r'^\d+\.?\d*$')
+
+PHYSICAL_FIELDS = ["material", "dimensions", "mass", "placement"]
+FAILURE_TYPES = ["image_only", "multi_object", "truncated", "other"]
+
+# What a stored entry is
+CORRUPTED = 0  # unreadable per-asset file
+OTHER = 1  # readable, but not a structured record (free-text prompt types)
+FAILED = 2  # {"raw_output": ...}: structured parse failed
+RECORD = 3  # parsed record
+
+
+def is_field_empty(value: Any) -> bool:
+    """Check if a field value is empty/null/missing."""
+    if value is None:
+        return True
+    if isinstance(value, str) and value.strip() == "":
+        return True
+    if isinstance(value, list) and len(value) == 0:
+        return True
+    return False
+
+
+def is_dimensions_invalid(value: Any) -> bool:
+    """Non-empty dimensions not in "X * Y * Z" form."""
+    return not isinstance(value, str) or not DIMENSIONS_PATTERN.match(value.strip())
+
+
+def is_mass_invalid(value: Any) -> bool:
+    """Non-empty mass that is not purely numeric."""
+    return not isinstance(value, str) or not MASS_PATTERN.match(value.strip())
+
+
+def is_image_only_failure(text: str) -> bool:
+    """Check if output is just '**Image' with whitespace."""
+    if not text:
+        return False
+    return bool(re.match(r'^\s*\*\*Image\s*$', text.strip()))
+
+
+def is_multi_object_format(text: str) -> bool:
+    """Detect multi-object output format."""
+    if not text:
+        return False
+    return bool(re.search(r'(?:^|\n)[\*#\-]*\s*Object\s+\d+', text, re.IGNORECASE))
+
+
+def is_truncated(text: str) -> bool:
+    """Detect truncated output."""
+    if not text:
+        return False
+    return text.rstrip().endswith(('...', ':', ' -', 'Object', 'Category'))
+
+
+def categorize_failure(raw_output: Any) -> str:
+    """Failure type of a raw output: image_only, truncated, multi_object or other."""
+    text = raw_output if isinstance(raw_output, str) else ""
+    if is_image_only_failure(text):
+        return "image_only"
+    if is_truncated(text):
+        return "truncated"
+    if is_multi_object_format(text):
+        return "multi_object"
+    return "other"
+
+
+class Column:
+    """
+    A dictionary-encoded column: codes (one int per asset) into values (the
+    distinct values). Checks run once per distinct value and are broadcast
+    to every asset with a lookup, so e.g. the thousands of assets sharing
+    "0.5" as mass cost one regex match.
+    """
+
+    def __init__(self, codes: np.ndarray, values: List[Any]):
+        self.codes = codes
+        self.values = values
+
+    @classmethod
+    def encode(cls, items: Iterable[Any]) -> "Column":
+        index: Dict[Any, int] = {}
+        values: List[Any] = []
+        codes = []
+        for value in items:
+            # Strings (nearly every value) are their own key; anything else is
+            # keyed by type too, so 1, 1.0 and True stay distinct
+            if value.__class__ is str:
+                key = value
+            elif isinstance(value, (list, dict)):
+                key = (type(value), json.dumps(value, sort_keys=True))
+            else:
+                key = (type(value), value)
+            code = index.get(key)
+            if code is None:
+                code = index[key] = len(values)
+                values.append(value)
+            codes.append(code)
+        return cls(np.fromiter(codes, dtype=np.int64, count=len(codes)), values)
+
+    def map(self, check: Callable[[Any], Any], dtype=bool) -> np.ndarray:
+        """check(value) for every asset, evaluated once per distinct value."""
+        lookup = np.asarray([check(value) for value in self.values], dtype=dtype)
+        return lookup[self.codes] if len(self.values) else np.zeros(len(self.codes), dtype=dtype)
+
+
+class AnnotationTable:
+    """
+    The annotations of one output directory as columns: asset names, kind
+    (CORRUPTED / OTHER / FAILED / RECORD), category (the asset's top-level
+    directory) and one column per physical field plus raw_output. Built with
+    a single read of the store; every flag below is an array over assets.
+    """
+
+    def __init__(self, assets: List[str], kinds: np.ndarray, columns: Dict[str, Column], categories: Column):
+        self.assets = np.asarray(assets, dtype=object)
+        self.kinds = kinds
+        self.columns = columns
+        self.categories = categories
+
+    @classmethod
+    def from_results(cls, results: Iterable[Tuple[str, Any]]) -> "AnnotationTable":
+        assets, kinds, records = [], [], []
+        empty: Dict[str, Any] = {}
+        for asset_name, result in results:
+            assets.append(asset_name)
+            if result is None:
+                kinds.append(CORRUPTED)
+            elif not isinstance(result, dict):
+                kinds.append(OTHER)
+            else:
+                kinds.append(FAILED if "raw_output" in result else RECORD)
+            records.append(result if isinstance(result, dict) else empty)
+        fields = {name: [record.get(name) for record in records] for name in PHYSICAL_FIELDS + ["raw_output"]}
+        categories = Column.encode(name.split("/")[0] if "/" in name else "unknown" for name in assets)
+        return cls(assets, np.asarray(kinds, dtype=np.int8),
+                   {name: Column.encode(values) for name, values in fields.items()}, categories)
+
+    @classmethod
+    def load(cls, output_dir: str) -> "AnnotationTable":
+        # Loading allocates millions of small objects that all stay alive;
+        # cyclic GC passes over them would only cost time
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return cls.from_results(open_output_store(output_dir).iter_results())
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def __len__(self) -> int:
+        return len(self.assets)
+
+    @property
+    def corrupted(self) -> np.ndarray:
+        return self.kinds == CORRUPTED
+
+    @property
+    def failed(self) -> np.ndarray:
+        """Parse failures and corrupted files (find_failed_assets.py)."""
+        return (self.kinds == FAILED) | (self.kinds == CORRUPTED)
+
+    @property
+    def success(self) -> np.ndarray:
+        """Readable and not a parse failure (find_success_assets.py)."""
+        return (self.kinds == RECORD) | (self.kinds == OTHER)
+
+    def empty(self, field: str) -> np.ndarray:
+        """Parsed records whose field is empty."""
+        return (self.kinds == RECORD) & self.columns[field].map(is_field_empty)
+
+    def invalid(self, field: str) -> np.ndarray:
+        """Parsed records whose dimensions / mass are non-empty but badly formatted."""
+        check = is_dimensions_invalid if field == "dimensions" else is_mass_invalid
+        return ((self.kinds == RECORD) & ~self.columns[field].map(is_field_empty)
+                & self.columns[field].map(check))
+
+    def incomplete(self, strict: bool = False) -> np.ndarray:
+        """
+        Records with an empty physical field (with strict, also invalid
+        dimensions / mass), plus corrupted files (find_incomplete_assets.py).
+        """
+        flags = self.corrupted.copy()
+        for field in PHYSICAL_FIELDS:
+            flags |= self.empty(field)
+        if strict:
+            flags |= self.invalid("dimensions") | self.invalid("mass")
+        return flags
+
+    def failure_types(self) -> np.ndarray:
+        """Failure type (index into FAILURE_TYPES) of each FAILED record; -1 elsewhere."""
+        types = self.columns["raw_output"].map(lambda raw: FAILURE_TYPES.index(categorize_failure(raw)), dtype=np.int64)
+        return np.where(self.kinds == FAILED, types, -1)
+
+    def per_category(self, flags: np.ndarray) -> np.ndarray:
+        """Number of flagged assets in each category (indexed like categories.values)."""
+        return np.bincount(self.categories.codes, weights=flags, minlength=len(self.categories.values)).astype(np.int64)
+
+    def select(self, flags: np.ndarray) -> List[str]:
+        return self.assets[flags].tolist()
+
+
+def audit_table(table: AnnotationTable) -> Dict[str, Any]:
+    """All lists and counts of the audit, computed from table."""
+    records = table.kinds == RECORD
+    incomplete = table.incomplete()
+    failure_types = table.failure_types()
+    category_total = table.per_category(records)
+    category_incomplete = table.per_category(incomplete & records)
+    category_failed = table.per_category(table.kinds == FAILED)
+    categories = {
+        category: {"total": int(category_total[i]), "incomplete": int(category_incomplete[i]), "failed": int(category_failed[i])}
+        for i, category in enumerate(table.categories.values)
+    }
+    return {
+        "assets": len(table),
+        "corrupted": int(table.corrupted.sum()),
+        "lists": {
+            "failed": table.select(table.failed),
+            "success": table.select(table.success),
+            "incomplete": table.select(incomplete),
+            "incomplete_strict": table.select(table.incomplete(strict=True)),
+            **{f"failed_{name}": table.select(failure_types == i) for i, name in enumerate(FAILURE_TYPES)},
+        },
+        "empty_fields": {field: int(table.empty(field).sum()) for field in PHYSICAL_FIELDS},
+        "invalid_fields": {field: int(table.invalid(field).sum()) for field in ("dimensions", "mass")},
+        "failure_types": {name: int((failure_types == i).sum()) for i, name in enumerate(FAILURE_TYPES)},
+        "categories": categories,
+    }
+
+
+def write_audit(summary: Dict[str, Any], save_dir: str) -> None:
+    """<list>_assets.txt per retry list, plus audit_summary.json with the counts."""
+    os.makedirs(save_dir, exist_ok=True)
+    for name, assets in summary["lists"].items():
+        with open(os.path.join(save_dir, f"{name}_assets.txt"), "w") as f:
+            f.writelines(f"{asset}\n" for asset in assets)
+    counts = {key: value for key, value in summary.items() if key != "lists"}
+    counts["lists"] = {name: len(assets) for name, assets in summary["lists"].items()}
+    with open(os.path.join(save_dir, "audit_summary.json"), "w", encoding="utf-8") as f:
+        json.dump(counts, f, indent=2, ensure_ascii=False)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="auto-annotator audit", description="Audit an output directory and write retry lists")
+    parser.add_argument("--output_dir", required=True, help="Output directory (one prompt type) to audit")
+    parser.add_argument("--save_dir", default="audit", help="Directory for the asset lists and audit_summary.json")
+    parser.add_argument("--top", type=int, default=20, help="Categories shown in the report")
+    args = parser.parse_args(argv)
+
+    print(f"Loading annotations from {args.output_dir}...")
+    summary = audit_table(AnnotationTable.load(args.output_dir))
+    write_audit(summary, args.save_dir)
+
+    lists = summary["lists"]
+    print(f"Assets: {summary['assets']} ({summary['corrupted']} corrupted)")
+    print(f"  success            {len(lists['success'])}")
+    print(f"  failed             {len(lists['failed'])}  (" + ", ".join(f"{k} {v}" for k, v in summary["failure_types"].items()) + ")")
+    print(f"  incomplete         {len(lists['incomplete'])}")
+    print(f"  incomplete_strict  {len(lists['incomplete_strict'])}")
+    print("Empty fields: " + ", ".join(f"{k} {v}" for k, v in summary["empty_fields"].items()))
+    print("Invalid format: " + ", ".join(f"{k} {v}" for k, v in summary["invalid_fields"].items()))
+    ranked = sorted(summary["categories"].items(), key=lambda item: -(item[1]["incomplete"] + item[1]["failed"]))
+    print(f"Top {args.top} categories by incomplete + failed:")
+    for category, counts in ranked[:args.top]:
+        print(f"  {category}: {counts['incomplete']} incomplete, {counts['failed']} failed / {counts['total']} records")
+    print(f"Lists and audit_summary.json saved to {args.save_dir}")
+
+
+if __name__ == "__main__":
+    main()
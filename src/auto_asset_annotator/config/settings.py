@@ -11,6 +11,18 @@ class ModelConfig:
     attn_implementation: str = "flash_attention_2"  # 注意力机制实现，默认为 "flash_attention_2"
     temperature: float = 0.8  # 生成温度，默认为 0.8
     max_new_tokens: int = 512  # 最大新生成 token 数量，默认为 512
+    max_new_tokens_by_prompt: Dict[str, int] = field(default_factory=dict)  # 按提示词类型覆盖 max_new_tokens
+    early_stopping: bool = True  # 结构化字段全部生成后提前停止，并在陷入重复循环时中止
+    constrained_decoding: bool = False  # 属性提取提示词使用语法约束解码：固定字段顺序、数值型 Dimensions/Mass、Placement 枚举
+    min_pixels: Optional[int] = None  # 每张图片缩放后的最小像素数，None 表示使用 qwen_vl_utils 默认值
+    max_pixels: Optional[int] = None  # 每张图片缩放后的最大像素数，None 表示使用 qwen_vl_utils 默认值
+    pixel_cache_dir: Optional[str] = None  # 已解码并缩放到模型网格的图片数组缓存目录（.npy，内存映射读取，按文件哈希 + 缩放参数寻址），None 表示不缓存
+    pixel_cache_size_gb: int = 64  # 图片数组缓存的容量上限（GB），超出后淘汰最久未使用的数组
+    prefix_cache: bool = False  # 缓存并复用各资产共同的提示前缀（聊天模板 + 固定指令）的 KV 状态，仅对单行批次生效
+    prefix_cache_size: int = 4  # 最多保留的不同前缀数
+    backend: str = "hf"  # 推理后端："hf"（HuggingFace transformers）或 "mock"（确定性模拟输出，用于测试和压测）
+    mock_latency: float = 0.0  # mock 后端每次 generate 调用的模拟耗时（秒）
+    mock_response: Optional[str] = None  # mock 后端的固定输出文本，None 表示按提示和图片生成确定性的结构化文本
 
 @dataclass  # 使用 dataclass 装饰器定义 DataConfig 类，用于存储数据配置
 class DataConfig:
@@ -19,16 +31,37 @@ class DataConfig:
     views: Dict[str, List[str]]  # 视图映射字典，键为视图名称，值为文件名模式列表
     use_thumbnails_dir: bool = False  # 是否使用缩略图子目录，默认为 False
     thumbnails_dir_name: str = "thumbnails"  # 缩略图子目录名称，默认为 "thumbnails"
+    listing_cache: bool = True  # 启动时用 os.scandir 单次扫描输入目录并缓存到 output_dir/.asset_listing.json.gz（按目录 mtime 失效），查找视图图片时不再逐个访问文件系统
+    scan_workers: int = 8  # 扫描输入目录的线程数（并发列出兄弟目录，隐藏网络存储的访问延迟），1 表示串行
+    output_format: str = "files"  # 标注结果存储格式："files" 每个资产一个 <资产名>_annotation.json；"jsonl" 追加写入 output_dir/.shards 下的少量 JSONL 分片（可用 export 子命令导出为逐文件布局）
+    generation_log: bool = True  # 将每条原始生成文本追加到 output_dir/.generations 下的压缩日志，解析或归一化改进后可离线重新解析
 
 @dataclass  # 使用 dataclass 装饰器定义 ProcessingConfig 类，用于存储处理配置
 class ProcessingConfig:
-    batch_size: int = 1  # 批处理大小，默认为 1
+    batch_size: int = 1  # 批处理大小（每次 generate 调用包含的资产数），默认为 1
     num_chunks: int = 1  # 分块数量，默认为 1
     chunk_index: int = 0  # 当前分块索引，默认为 0
+    max_batch_tokens: int = 0  # 每个批次（行数 x 最长提示长度）的 token 预算，0 表示按固定 batch_size 分批
+    batch_window: int = 256  # 动态分批时一次读取并排序的资产窗口大小
+    prefetch_workers: int = 2  # 预处理线程数（查找图片、解码、分词），0 表示各阶段串行执行
+    postprocess_workers: int = 2  # 后处理线程数（解析输出、写入结果）
+    queue_size: int = 4  # 各阶段之间最多积压的批次数
+    queue_dir: Optional[str] = None  # 共享工作队列目录，设置后取代 num_chunks/chunk_index 静态分块
+    queue_batch_size: int = 32  # 工作队列中每个任务包含的资产数
+    lease_timeout: float = 600.0  # 租约超过该秒数未续期即视为失效，可被其他 worker 回收
+    heartbeat_interval: float = 60.0  # 租约续期（心跳）间隔秒数
+    num_workers: int = 1  # 单条命令内启动的模型进程数（每个 GPU 或 GPU 组一个），1 表示在当前进程内运行
+    result_cache_dir: Optional[str] = None  # 推理结果缓存目录（按图片内容、提示词、模型和生成参数寻址），None 表示不缓存
+    result_cache_size_mb: int = 1024  # 结果缓存的容量上限（MB），超出后淘汰最久未使用的条目
+    write_batch_size: int = 256  # 后台写入线程每次批量写入（并在一个事务中更新状态索引）的最多结果数
+    write_flush_interval: float = 2.0  # 结果最多在内存中等待的秒数，超时即写入；进程被强制终止时未写入的资产下次运行会重新标注
+    dedup: bool = False  # 推理前按视图感知哈希聚类近重复资产，每个簇只标注一个代表，结果复制给其他成员（类别取自各自目录）
+    dedup_max_distance: int = 3  # 同一簇内每个视图的 dHash（64 位）最多相差的位数，0 表示只合并视图完全相同的资产
 
 @dataclass  # 使用 dataclass 装饰器定义 PromptConfig 类，用于存储提示词配置
 class PromptConfig:
     default_type: str = "extract_object_attributes_prompt"  # 默认提示词类型，默认为 "extract_object_attributes_prompt"
+    types: List[str] = field(default_factory=list)  # 多提示词模式：同一资产一起运行的提示词类型列表，非空时结果写入 output_dir/<类型>/
 
 @dataclass  # 使用 dataclass 装饰器定义 Config 类，作为总配置类
 class Config:
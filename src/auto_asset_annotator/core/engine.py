@@ -0,0 +1,70 @@
+import importlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from .stopping import GenerationLimits
+from ..config.settings import ModelConfig
+
+# model.backend -> "module:class" relative to this package; modules are imported
+# on demand so that e.g. the mock backend runs without torch/transformers installed
+ENGINE_BACKENDS = {
+    "hf": ".model:ModelEngine",
+    "mock": ".mock_engine:MockEngine",
+}
+
+
+class InferenceEngine(ABC):
+    """
+    Interface between the annotation pipeline and an inference backend.
+
+    The pipeline only relies on prepare_inputs (CPU-side, may run in a worker
+    thread) and generate (device-side, runs in the engine thread); inference
+    and inference_batch chain the two.
+    """
+
+    def __init__(self, config: ModelConfig):
+        self.config = config
+        self.load()
+
+    @abstractmethod
+    def load(self) -> None:
+        """Load weights, processor, etc. described by self.config."""
+
+    @abstractmethod
+    def prepare_inputs(self, batch_messages: List[List[Dict[str, Any]]]) -> Any:
+        """Preprocess a batch of conversations into backend inputs."""
+
+    @abstractmethod
+    def generate(self, inputs: Any, limits: Optional[List[GenerationLimits]] = None) -> List[str]:
+        """
+        Generate one text per conversation passed to prepare_inputs, in order.
+        limits optionally sets each row's token budget and stopping rules;
+        without it every row uses config.max_new_tokens.
+        """
+
+    @abstractmethod
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens the backend's tokenizer produces for text."""
+
+    def inference(self, inputs_messages: List[Dict[str, Any]], limits: Optional[GenerationLimits] = None) -> str:
+        """
+        Run inference on a single message structure.
+        """
+        return self.inference_batch([inputs_messages], [limits] if limits else None)[0]
+
+    def inference_batch(self, batch_messages: List[List[Dict[str, Any]]], limits: Optional[List[GenerationLimits]] = None) -> List[str]:
+        """
+        Run inference on a batch of message structures in a single generate call.
+        Returns the generated texts in the same order as the input conversations.
+        """
+        if not batch_messages:
+            return []
+        return self.generate(self.prepare_inputs(batch_messages), limits)
+
+
+def create_engine(config: ModelConfig) -> InferenceEngine:
+    """Instantiate the backend selected by config.backend."""
+    if config.backend not in ENGINE_BACKENDS:
+        raise ValueError(f"Unknown model backend: {config.backend}. Supported: {sorted(ENGINE_BACKENDS)}")
+    module_name, class_name = ENGINE_BACKENDS[config.backend].split(":")
+    module = importlib.import_module(module_name, package=__package__)
+    return getattr(module, class_name)(config)
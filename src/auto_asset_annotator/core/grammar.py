@@ -0,0 +1,185 @@
+from typing import Dict, Hashable, List, Optional, Sequence
+
+GRAMMAR_PROMPT = "extract_object_attributes_prompt"  # the prompt whose output follows the format below
+
+# Output format of the attribute extraction prompt, one field per line:
+#
+#   Category: <text>
+#   Description: <text>
+#   Material: <text>
+#   Dimensions: <number> * <number> * <number>
+#   Mass: <number>
+#   Placement: <placement>[, <placement>...]
+FIELDS = ("Category", "Description", "Material", "Dimensions", "Mass", "Placement")
+TEXT_FIELDS = 3  # Category, Description and Material take free text
+DIMENSIONS, MASS, PLACEMENT = 3, 4, 5
+PLACEMENTS = ("OnFloor", "OnObject", "OnWall", "OnCeiling", "OnTable")
+DIMENSION_SEPARATOR = " * "
+PLACEMENT_SEPARATOR = ", "
+
+START = ("header", 0, 0)
+
+
+class AttributeGrammar:
+    """
+    Character-level automaton for the attribute extraction format.
+
+    States are small hashable tuples, so callers can cache per-state work
+    (the allowed vocabulary of a state is the same every time it is reached):
+
+      ("header", field, offset)       inside the literal "<Field>: "
+      ("text", field, nonempty)       free-text value, ends at a newline
+      ("number", field, part, phase)  phase: "start", "int", "dot" or "frac"
+      ("separator", field, part, k)   inside " * " between dimensions
+      ("placement", prefix, used)     inside a placement name; each name at most once
+      ("placement_separator", used, k)  inside ", " between placements
+      ("done",)                       newline after the last placement
+
+    step() returns None for a character the format does not allow there.
+    """
+
+    @staticmethod
+    def header(field: int) -> str:
+        return FIELDS[field] + ": "
+
+    def step(self, state: Hashable, char: str) -> Optional[Hashable]:
+        kind = state[0]
+        if kind == "header":
+            _, field, offset = state
+            literal = self.header(field)
+            if char != literal[offset]:
+                return None
+            if offset + 1 < len(literal):
+                return ("header", field, offset + 1)
+            return self._value_start(field)
+        if kind == "text":
+            _, field, nonempty = state
+            if char == "\n":
+                return ("header", field + 1, 0) if nonempty else None
+            return ("text", field, nonempty or not char.isspace())
+        if kind == "number":
+            return self._step_number(state, char)
+        if kind == "separator":
+            _, field, part, k = state
+            if char != DIMENSION_SEPARATOR[k]:
+                return None
+            if k + 1 < len(DIMENSION_SEPARATOR):
+                return ("separator", field, part, k + 1)
+            return ("number", field, part + 1, "start")
+        if kind == "placement":
+            _, prefix, used = state
+            if prefix in PLACEMENTS:
+                if char == PLACEMENT_SEPARATOR[0] and len(used) + 1 < len(PLACEMENTS):
+                    return ("placement_separator", used | {prefix}, 1)
+                if char == "\n":
+                    return ("done",)
+            extended = prefix + char
+            if any(name.startswith(extended) and name not in used for name in PLACEMENTS):
+                return ("placement", extended, used)
+            return None
+        if kind == "placement_separator":
+            _, used, k = state
+            if char != PLACEMENT_SEPARATOR[k]:
+                return None
+            if k + 1 < len(PLACEMENT_SEPARATOR):
+                return ("placement_separator", used, k + 1)
+            return ("placement", "", used)
+        return None  # done: only the end of sequence may follow
+
+    @staticmethod
+    def _value_start(field: int) -> Hashable:
+        if field < TEXT_FIELDS:
+            return ("text", field, False)
+        if field == PLACEMENT:
+            return ("placement", "", frozenset())
+        return ("number", field, 0, "start")
+
+    @staticmethod
+    def _step_number(state: Hashable, char: str) -> Optional[Hashable]:
+        _, field, part, phase = state
+        if char.isdigit() and char.isascii():
+            return ("number", field, part, "frac" if phase in ("dot", "frac") else "int")
+        if char == "." and phase == "int":
+            return ("number", field, part, "dot")
+        if phase not in ("int", "frac"):
+            return None
+        # A complete number: separator or end of line
+        if field == DIMENSIONS and part < 2:
+            return ("separator", field, part, 1) if char == DIMENSION_SEPARATOR[0] else None
+        if char == "\n":
+            return ("header", field + 1, 0)
+        return None
+
+    def advance(self, state: Optional[Hashable], text: str) -> Optional[Hashable]:
+        """Feed a string character by character; None once it leaves the format."""
+        for char in text:
+            if state is None:
+                return None
+            state = self.step(state, char)
+        return state
+
+    @staticmethod
+    def accepting(state: Optional[Hashable]) -> bool:
+        """True where generation may end: after a complete placement list."""
+        if state is None:
+            return False
+        return state[0] == "done" or (state[0] == "placement" and state[1] in PLACEMENTS)
+
+
+class TokenMasks:
+    """
+    Allowed vocabulary per grammar state.
+
+    token_strings holds the decoded text of every token id (None for special
+    tokens, which are never allowed); eos_ids may only follow an accepting
+    state. Results are cached per state. Free-text states accept any token
+    without a newline, so only newline tokens are checked there; elsewhere
+    only tokens whose first character the state accepts are simulated.
+    """
+
+    def __init__(self, token_strings: Sequence[Optional[str]], eos_ids: Sequence[int],
+                 grammar: Optional[AttributeGrammar] = None):
+        self.grammar = grammar or AttributeGrammar()
+        self.token_strings = list(token_strings)
+        self.eos_ids = list(eos_ids)
+        self.by_first_char: Dict[str, List[int]] = {}
+        self.without_newline: List[int] = []
+        self.with_newline: List[int] = []
+        for token_id, text in enumerate(self.token_strings):
+            if not text or token_id in self.eos_ids:
+                continue
+            self.by_first_char.setdefault(text[0], []).append(token_id)
+            (self.with_newline if "\n" in text else self.without_newline).append(token_id)
+        self._cache: Dict[Hashable, List[int]] = {}
+
+    def allowed(self, state: Hashable) -> List[int]:
+        """Token ids that keep the output inside the format from state."""
+        cached = self._cache.get(state)
+        if cached is not None:
+            return cached
+        if state[0] == "text":
+            candidates = self.with_newline
+            allowed = list(self.without_newline)
+        else:
+            candidates = [
+                token_id
+                for char, ids in self.by_first_char.items()
+                if self.grammar.step(state, char) is not None
+                for token_id in ids
+            ]
+            allowed = []
+        allowed.extend(t for t in candidates if self.grammar.advance(state, self.token_strings[t]) is not None)
+        if self.grammar.accepting(state):
+            allowed.extend(self.eos_ids)
+        allowed.sort()
+        self._cache[state] = allowed
+        return allowed
+
+    def advance(self, state: Optional[Hashable], token_id: int) -> Optional[Hashable]:
+        """State after emitting token_id; None for end of sequence or a token outside the format."""
+        if state is None or token_id in self.eos_ids:
+            return None
+        text = self.token_strings[token_id] if token_id < len(self.token_strings) else None
+        if not text:
+            return None
+        return self.grammar.advance(state, text)
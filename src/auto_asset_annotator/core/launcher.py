@@ -0,0 +1,219 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from .engine import create_engine
+from .pipeline import AnnotationPipeline
+from .runner import StagedRunner
+from .scheduler import MicroBatcher
+from ..config.settings import Config, ModelConfig
+from ..utils.generation_log import GenerationLog
+from ..utils.listing import LISTING_FILENAME, AssetListing, set_asset_listing
+from ..utils.result_cache import open_result_cache
+
+_WORKER_DONE = "__worker_done__"
+_CHUNK_REQUEST = "__chunk_request__"
+_POLL_SECONDS = 5  # how long the parent waits for a message before checking for dead workers
+
+
+def default_engine_factory(model_config: ModelConfig):
+    return create_engine(model_config)  # backend modules are imported lazily, in the worker
+
+
+def visible_devices() -> List[str]:
+    """CUDA devices available to this process, as CUDA_VISIBLE_DEVICES entries."""
+    env = os.environ.get("CUDA_VISIBLE_DEVICES")
+    if env is not None:
+        return [d.strip() for d in env.split(",") if d.strip()]
+    try:
+        import torch
+        return [str(i) for i in range(torch.cuda.device_count())]
+    except ImportError:
+        return []
+
+
+def assign_devices(devices: List[str], num_workers: int) -> List[Optional[str]]:
+    """
+    Split devices across workers, the first len(devices) % num_workers workers
+    taking one extra; with fewer devices than workers, workers share devices
+    round-robin. None means the worker runs on CPU.
+    """
+    if not devices:
+        return [None] * num_workers
+    if len(devices) < num_workers:
+        return [devices[i % len(devices)] for i in range(num_workers)]
+    per_worker, extra = divmod(len(devices), num_workers)
+    groups, start = [], 0
+    for i in range(num_workers):
+        size = per_worker + (1 if i < extra else 0)
+        groups.append(",".join(devices[start:start + size]))
+        start += size
+    return groups
+
+
+def _worker_main(rank: int, device: Optional[str], cfg: Config, prompt_type: Union[str, List[str]],
+                 engine_factory: Callable, tasks, results) -> None:
+    """
+    Worker process: one engine replica. Chunks are requested from the parent
+    through the results queue and arrive on this worker's own tasks queue.
+    """
+    if device is not None:
+        # Must happen before CUDA is initialised in this process
+        os.environ["CUDA_VISIBLE_DEVICES"] = device
+    stats = {"rank": rank, "device": device, "assets": 0, "annotated": 0, "failed": 0, "seconds": 0.0}
+    start = time.time()
+    generation_log = None
+    result_cache = None
+    try:
+        if cfg.data.listing_cache:
+            # The parent refreshed the listing just before spawning: load it as is
+            listing = AssetListing(cfg.data.input_dir, os.path.join(cfg.data.output_dir, LISTING_FILENAME),
+                                   cfg.data.thumbnails_dir_name if cfg.data.use_thumbnails_dir else None)
+            if listing.load():
+                set_asset_listing(listing)
+        engine = engine_factory(cfg.model)
+        # Each worker appends to its own log segment
+        generation_log = GenerationLog(cfg.data.output_dir, cfg.model) if cfg.data.generation_log else None
+        result_cache = open_result_cache(cfg.processing)  # workers share the cache database
+        pipeline = AnnotationPipeline(cfg, engine, generation_log, result_cache)
+        batcher = MicroBatcher(cfg, prompt_type)
+        runner = StagedRunner(pipeline, cfg.processing)
+        start = time.time()  # throughput excludes model loading
+
+        def claimed_batches():
+            while True:
+                results.put((_CHUNK_REQUEST, rank))
+                chunk = tasks.get()
+                if chunk is None:
+                    return
+                yield from batcher.batches(chunk)
+
+        def on_result(asset_name, result):
+            stats["assets"] += 1
+            stats["annotated" if result else "failed"] += 1
+            results.put((asset_name, result))
+
+        runner.run(claimed_batches(), prompt_type, on_result)
+    except Exception as e:
+        print(f"[ERROR] Worker {rank} stopped: {e}")
+        stats["error"] = str(e)
+    if generation_log is not None:
+        generation_log.close()
+    if result_cache is not None:
+        result_cache.close()
+    stats["seconds"] = time.time() - start
+    results.put((_WORKER_DONE, stats))
+
+
+def launch_workers(
+    cfg: Config,
+    asset_names: List[str],
+    on_result: Callable[[str, Any], None],
+    num_workers: int,
+    prompt_type: Union[str, List[str], None] = None,
+    engine_factory: Callable = default_engine_factory,
+    chunk_size: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Annotate asset_names with num_workers engine replicas, one per device
+    group (or per CPU process when no GPU is visible).
+
+    The parent process hands out small chunks of assets to workers as they
+    ask for them, so fast replicas take more work, and receives every result
+    back for a single writer: on_result(asset_name, result) is called in this
+    process. When a worker stops (exception or killed), the assets of its
+    chunks without a result are handed to the remaining workers.
+    Returns per-worker stats and the assets left unprocessed because every
+    worker stopped.
+    """
+    prompt_type = prompt_type or cfg.prompts.default_type
+    chunk_size = chunk_size or cfg.processing.queue_batch_size
+    ctx = mp.get_context("spawn")  # CUDA cannot be used in forked children
+    results = ctx.Queue()
+    chunks = deque()  # (chunk_id, assets) not handed out yet
+    remaining = {}  # chunk_id -> assets of the chunk without a result
+    chunk_of = {}  # asset -> chunk_id
+    for chunk_id, start in enumerate(range(0, len(asset_names), chunk_size)):
+        chunk = asset_names[start:start + chunk_size]
+        chunks.append((chunk_id, chunk))
+        remaining[chunk_id] = set(chunk)
+        chunk_of.update((name, chunk_id) for name in chunk)
+
+    devices = assign_devices(visible_devices(), num_workers)
+    workers = []
+    worker_tasks = []
+    for rank in range(num_workers):
+        print(f"[INFO] Starting worker {rank} on {'CUDA device(s) ' + devices[rank] if devices[rank] else 'CPU'}")
+        tasks = ctx.Queue()
+        process = ctx.Process(
+            target=_worker_main,
+            args=(rank, devices[rank], cfg, prompt_type, engine_factory, tasks, results),
+            name=f"annotator-worker-{rank}",
+        )
+        process.start()
+        workers.append(process)
+        worker_tasks.append(tasks)
+
+    held = {rank: set() for rank in range(num_workers)}  # chunks handed to each running worker
+    waiting = deque()  # workers asking for a chunk while none is available
+
+    def dispatch():
+        while waiting and chunks:
+            rank = waiting.popleft()
+            chunk_id, chunk = chunks.popleft()
+            held[rank].add(chunk_id)
+            worker_tasks[rank].put(chunk)
+        if not chunks and not any(held.values()):
+            # Nothing left that a stopped worker could hand back: idle workers exit
+            while waiting:
+                worker_tasks[waiting.popleft()].put(None)
+
+    def release(rank):
+        # Hand the unfinished part of a stopped worker's chunks to the others
+        requeued = 0
+        for chunk_id in sorted(held.pop(rank)):
+            chunk = [name for name in asset_names[chunk_id * chunk_size:(chunk_id + 1) * chunk_size]
+                     if name in remaining[chunk_id]]
+            chunks.appendleft((chunk_id, chunk))
+            requeued += len(chunk)
+        if rank in waiting:
+            waiting.remove(rank)
+        if requeued:
+            print(f"[WARN] Worker {rank} left {requeued} assets unfinished; handing them to the other workers")
+        dispatch()
+
+    worker_stats = {}
+    while len(worker_stats) < num_workers:
+        try:
+            message, payload = results.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            # A worker killed hard (e.g. OOM killer) never reports; don't wait for it forever
+            for rank, process in enumerate(workers):
+                if rank not in worker_stats and not process.is_alive() and results.empty():
+                    print(f"[ERROR] Worker {rank} exited with code {process.exitcode} without finishing")
+                    worker_stats[rank] = {"rank": rank, "device": devices[rank], "assets": 0, "annotated": 0,
+                                          "failed": 0, "seconds": 0.0, "error": f"exit code {process.exitcode}"}
+                    release(rank)
+            continue
+        if message == _CHUNK_REQUEST:
+            waiting.append(payload)
+            dispatch()
+        elif message == _WORKER_DONE:
+            worker_stats[payload["rank"]] = payload
+            release(payload["rank"])
+        else:
+            on_result(message, payload)
+            chunk_id = chunk_of[message]
+            remaining[chunk_id].discard(message)
+            if not remaining[chunk_id]:
+                del remaining[chunk_id]
+                for chunk_ids in held.values():
+                    chunk_ids.discard(chunk_id)
+                dispatch()
+
+    for process in workers:
+        process.join()
+    unprocessed = [name for name in asset_names if chunk_of[name] in remaining and name in remaining[chunk_of[name]]]
+    return [worker_stats[rank] for rank in range(num_workers)], unprocessed
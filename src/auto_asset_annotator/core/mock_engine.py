@@ -0,0 +1,77 @@
+import os
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from .engine import InferenceEngine
+from .stopping import GenerationLimits
+
+MATERIALS = ["wood", "metal", "plastic", "fabric", "ceramic", "glass"]
+PLACEMENTS = ["OnFloor", "OnTable", "OnObject", "OnWall", "OnCeiling"]
+SHAPES = ["rectangular", "round", "cylindrical", "L-shaped", "irregular"]
+COLORS = ["white", "black", "brown", "gray", "beige", "blue"]
+CHARS_PER_TOKEN = 4  # rough estimate, no tokenizer is loaded
+
+
+class MockEngine(InferenceEngine):
+    """
+    Deterministic stand-in for the model (model.backend: mock).
+
+    Returns canned structured text derived from a hash of the prompt and image
+    file names, so repeated runs produce identical outputs, and sleeps
+    model.mock_latency seconds per generate call to emulate the device.
+    Images are not decoded. Useful to benchmark and test the pipeline, the
+    scheduler and the writers on machines without a GPU.
+    """
+
+    def load(self) -> None:
+        print(f"[INFO] Using mock backend (latency {self.config.mock_latency}s per batch)")
+
+    def prepare_inputs(self, batch_messages: List[List[Dict[str, Any]]]) -> List[Tuple[str, List[str]]]:
+        inputs = []
+        for messages in batch_messages:
+            texts, images = [], []
+            for message in messages:
+                for item in message["content"]:
+                    if item.get("type") == "text":
+                        texts.append(item["text"])
+                    elif "image" in item:
+                        images.append(os.path.basename(str(item["image"])))
+            inputs.append(("\n".join(texts), images))
+        return inputs
+
+    def generate(self, inputs: List[Tuple[str, List[str]]], limits: Optional[List[GenerationLimits]] = None) -> List[str]:
+        if self.config.mock_latency > 0:
+            time.sleep(self.config.mock_latency)
+        texts = [self.mock_response(prompt, images) for prompt, images in inputs]
+        if limits:
+            # Emulate the token budget with the same rough chars-per-token estimate
+            texts = [text[:limit.max_new_tokens * CHARS_PER_TOKEN] for text, limit in zip(texts, limits)]
+        return texts
+
+    def count_tokens(self, text: str) -> int:
+        return len(text) // CHARS_PER_TOKEN
+
+    def mock_response(self, prompt: str, images: List[str]) -> str:
+        """Canned output for one conversation; config.mock_response overrides it."""
+        if self.config.mock_response is not None:
+            return self.config.mock_response
+        seed = zlib.crc32("\n".join([prompt] + images).encode("utf-8"))
+
+        def pick(options, salt):
+            return options[(seed >> salt) % len(options)]
+
+        length = 0.2 + (seed % 180) / 100
+        width = 0.1 + ((seed >> 8) % 90) / 100
+        height = 0.1 + ((seed >> 16) % 200) / 100
+        mass = 0.5 + (seed % 400) / 10
+        first = (seed >> 13) % len(PLACEMENTS)
+        second = (first + 1 + (seed >> 17) % (len(PLACEMENTS) - 1)) % len(PLACEMENTS)
+        return (
+            "Category: object\n"
+            f"Description: A {pick(COLORS, 3)} {pick(SHAPES, 5)} object shown in {len(images)} views. "
+            f"It has a {pick(MATERIALS, 7)} body and a smooth finish.\n"
+            f"Material: {pick(MATERIALS, 7)} body, {pick(MATERIALS, 11)} legs\n"
+            f"Dimensions: {length:.2f} * {width:.2f} * {height:.2f}\n"
+            f"Mass: {mass:.1f}\n"
+            f"Placement: {PLACEMENTS[first]}, {PLACEMENTS[second]}"
+        )
@@ -1,12 +1,20 @@
+import copy  # 导入 copy 模块，用于复制缓存的前缀 KV 状态
+import inspect  # 导入 inspect 模块，用于检测模型是否支持预计算的视觉特征
 import torch  # 导入 PyTorch 库
-from transformers import AutoProcessor, AutoModel  # 从 transformers 库导入 AutoProcessor 和 AutoModel
+from transformers import AutoProcessor, AutoModel, LogitsProcessor, LogitsProcessorList, StoppingCriteria, StoppingCriteriaList  # 从 transformers 库导入 AutoProcessor、AutoModel、logits 处理器和停止条件
 from qwen_vl_utils import process_vision_info  # 导入 qwen_vl_utils，用于处理视觉信息
+from qwen_vl_utils.vision_process import extract_vision_info, fetch_image  # 按对话顺序列出所有图片项；解码并缩放单张图片
 from ..config.settings import ModelConfig  # 从配置模块导入 ModelConfig 类
-from typing import List, Dict, Any  # 导入类型提示
+from .engine import InferenceEngine  # 导入推理后端接口
+from .grammar import START, TokenMasks  # 导入属性提取格式的语法约束
+from .prefix_cache import PrefixKVCache  # 导入共享提示前缀的 KV 缓存
+from .stopping import GenerationLimits, find_repetition, structured_output_complete, trim_repetition  # 导入提前停止逻辑
+from ..utils.pixel_cache import open_pixel_cache  # 导入已缩放图片数组的磁盘缓存
+from typing import List, Dict, Any, Optional  # 导入类型提示
 
-class ModelEngine:  # 定义 ModelEngine 类，用于封装模型操作
-    def __init__(self, config: ModelConfig):  # 初始化方法，接收模型配置
-        self.config = config  # 保存配置对象
+class ModelEngine(InferenceEngine):  # 定义 ModelEngine 类，HuggingFace 后端（model.backend: hf）
+    def load(self) -> None:  # 加载模型和处理器，由 InferenceEngine.__init__ 调用
+        config = self.config  # 模型配置对象
         print(f"[INFO] Loading model: {config.name}")  # 打印正在加载的模型名称
         
         # Try to import specific class if needed, otherwise use AutoModel
@@ -41,43 +49,240 @@ class ModelEngine:  # 定义 ModelEngine 类，用于封装模型操作
             trust_remote_code=True  # 允许执行远程代码
         )
         self.processor = AutoProcessor.from_pretrained(config.name, trust_remote_code=True)  # 加载对应的处理器
+        # Decoder-only generation needs left padding so every row ends at the generation position
+        self.processor.tokenizer.padding_side = "left"  # 批量生成时使用左填充
+        self.prefix_cache = PrefixKVCache(config.prefix_cache_size) if config.prefix_cache else None  # 共享提示前缀的 KV 缓存
+        self.token_masks = None  # 语法约束解码的词表掩码，首次使用时构建
+        self.mask_tensors = {}  # 语法状态 -> 设备上的允许 token 掩码，跨批次复用
+        self.pixel_cache = open_pixel_cache(config)  # 已解码、缩放的图片数组缓存，未配置时为 None
         print("[INFO] Model loaded successfully.")  # 打印模型加载成功信息
 
-    def inference(self, inputs_messages: List[Dict[str, Any]]) -> str:  # 定义推理方法
+    def count_tokens(self, text: str) -> int:  # 使用模型分词器统计 token 数
+        return len(self.processor.tokenizer(text, add_special_tokens=False).input_ids)
+
+    def prepare_inputs(self, batch_messages: List[List[Dict[str, Any]]]) -> Any:  # CPU 预处理阶段
         """
-        Run inference on a single message structure.
+        CPU-side preprocessing: chat template, image decoding/resizing and tokenization.
+        Safe to run in a worker thread while another batch is generating.
         """
         # Prepare text input
-        text = self.processor.apply_chat_template(  # 应用聊天模板，将消息转换为文本
-            inputs_messages, tokenize=False, add_generation_prompt=True  # 不进行分词，添加生成提示
-        )
-        
-        # Prepare vision input
-        image_inputs, video_inputs = process_vision_info(inputs_messages)  # 处理视觉信息（图像和视频）
-        
+        texts = [  # 对每个对话应用聊天模板，将消息转换为文本
+            self.processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            for messages in batch_messages
+        ]
+
+        # Prepare vision input (images of all conversations, in conversation order).
+        # Conversations of the same asset (multi-prompt mode) reference the same views:
+        # each distinct image is decoded and resized once.
+        vision_items = extract_vision_info(batch_messages)  # 按对话顺序列出所有图片项
+        image_sources = []  # 每个图片位置对应的去重图片编号
+        unique_index = {}  # (图片路径, 缩放参数) -> 去重编号
+        unique_items = []  # 去重后的图片项
+        for item in vision_items:
+            key = (str(item.get("image", item.get("image_url"))), item.get("min_pixels"), item.get("max_pixels"))
+            if key not in unique_index:
+                unique_index[key] = len(unique_items)
+                unique_items.append(item)
+            image_sources.append(unique_index[key])
+        has_video = any("video" in item for item in vision_items)
+        shared = len(unique_items) < len(image_sources) and not has_video
+        if self.pixel_cache is not None and unique_items and not has_video:
+            decoded = self.pixel_cache.fetch_many(unique_items, fetch_image)  # 命中时直接内存映射已缩放的数组，跳过 PNG 解码和缩放
+            image_inputs, video_inputs = [decoded[j] for j in image_sources], None
+        elif shared:
+            decoded, _ = process_vision_info([{"role": "user", "content": unique_items}])  # 只解码去重后的图片
+            image_inputs, video_inputs = [decoded[j] for j in image_sources], None
+        else:
+            image_inputs, video_inputs = process_vision_info(batch_messages)  # 处理整个批次的视觉信息
+
         # Process inputs
         inputs = self.processor(  # 使用处理器处理文本和视觉输入
-            text=[text],  # 文本输入列表
+            text=texts,  # 文本输入列表
             images=image_inputs,  # 图像输入
             videos=video_inputs,  # 视频输入
-            padding=True,  # 启用填充
+            padding=True,  # 启用填充（左填充，见 __init__）
             return_tensors="pt",  # 返回 PyTorch 张量
         )
+        if shared:
+            inputs["image_sources"] = image_sources  # generate 据此只对去重后的图片运行视觉编码器
+        return inputs
+
+    def generate(self, inputs: Any, limits: Optional[List[GenerationLimits]] = None) -> List[str]:  # 设备端生成阶段
+        """
+        Run generation on inputs produced by prepare_inputs and decode the new tokens.
+        limits optionally gives each row its own token budget and early-stopping rules.
+        """
+        image_sources = inputs.pop("image_sources", None)  # 由 prepare_inputs 记录的重复图片映射
         inputs = inputs.to(self.model.device)  # 将输入移动到模型所在的设备（GPU/CPU）
+        generate_kwargs = dict(inputs)
+        if image_sources is not None and "mm_encoder_outputs" in inspect.signature(self.model.forward).parameters:
+            # Encode each distinct image once and hand the features to every row using it
+            generate_kwargs.pop("pixel_values")
+            generate_kwargs["mm_encoder_outputs"] = {"image": self._encode_shared_images(inputs, image_sources)}
+        if self.prefix_cache is not None and inputs["input_ids"].shape[0] == 1:
+            # Single-row batches only: left padding shifts the prefix differently in every row
+            past_key_values = self._prefix_state(inputs["input_ids"][0])
+            if past_key_values is not None:
+                generate_kwargs["past_key_values"] = past_key_values
+
+        max_new_tokens = self.config.max_new_tokens  # 默认最大生成 token 数
+        stopping = None
+        if limits:
+            max_new_tokens = max(limit.max_new_tokens for limit in limits)  # 批次按最大预算生成，各行单独停止
+            stopping = RowStopping(self.processor.tokenizer, inputs["input_ids"].shape[1], limits)
+            generate_kwargs["stopping_criteria"] = StoppingCriteriaList([stopping])
+            if any(limit.constrained for limit in limits):
+                constraint = GrammarConstraint(self._token_masks(), inputs["input_ids"].shape[1], limits, self.mask_tensors)
+                generate_kwargs["logits_processor"] = LogitsProcessorList([constraint])
 
         # Generate
         generated_ids = self.model.generate(  # 调用模型生成方法
-            **inputs,  # 解包输入参数
-            max_new_tokens=self.config.max_new_tokens,  # 设置最大生成 token 数
+            **generate_kwargs,  # 解包输入参数
+            max_new_tokens=max_new_tokens,  # 设置最大生成 token 数
             temperature=self.config.temperature  # 设置采样温度
         )
-        
+
+        # With left padding all rows share the same prompt length, so trimming is uniform
         generated_ids_trimmed = [  # 裁剪生成的 ID，去除输入部分的 token
             out_ids[len(in_ids) :] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
         ]
-        
+
         output_text = self.processor.batch_decode(  # 解码生成的 ID 为文本
             generated_ids_trimmed, skip_special_tokens=True, clean_up_tokenization_spaces=False  # 跳过特殊 token，不清理分词空格
         )
-        
-        return output_text[0]  # 返回生成的文本（取第一个结果）
+        if stopping is not None:
+            # Rows stopped in a loop keep a single copy of the repeated unit
+            output_text = [trim_repetition(text) if row in stopping.looping else text for row, text in enumerate(output_text)]
+
+        return output_text  # 返回与输入顺序一致的文本列表
+
+    def _token_masks(self) -> TokenMasks:  # 构建（或取出）语法约束解码所需的词表表示
+        """
+        Decoded text of every vocabulary entry, built once per engine. Added
+        and special tokens are excluded; the generation config's EOS ids end
+        a constrained row.
+        """
+        if self.token_masks is None:
+            tokenizer = self.processor.tokenizer
+            special = set(tokenizer.added_tokens_decoder)
+            strings = tokenizer.batch_decode([[i] for i in range(len(tokenizer))], clean_up_tokenization_spaces=False)
+            strings = [None if i in special else text for i, text in enumerate(strings)]
+            eos_ids = self.model.generation_config.eos_token_id
+            if eos_ids is None:
+                eos_ids = tokenizer.eos_token_id
+            eos_ids = eos_ids if isinstance(eos_ids, list) else [eos_ids]
+            self.token_masks = TokenMasks(strings, eos_ids)
+        return self.token_masks
+
+    @torch.no_grad()
+    def _encode_shared_images(self, inputs: Any, image_sources: List[int]) -> Any:  # 对去重后的图片运行一次视觉编码器
+        """
+        Run the vision encoder on each distinct image of the batch once and
+        return encoder outputs with one feature block per image position.
+        """
+        grid_thw = inputs["image_grid_thw"]
+        patch_counts = grid_thw.prod(-1).tolist()  # 每张图片在 pixel_values 中占用的行数
+        offsets = [sum(patch_counts[:k]) for k in range(len(patch_counts))]
+        first_position = {}  # 去重编号 -> 首次出现的位置
+        for position, source in enumerate(image_sources):
+            first_position.setdefault(source, position)
+        positions = list(first_position.values())
+        pixel_values = torch.cat([inputs["pixel_values"][offsets[k]:offsets[k] + patch_counts[k]] for k in positions])
+        outputs = self.model.get_image_features(pixel_values, grid_thw[positions], return_dict=True)
+        features = dict(zip(first_position, outputs.pooler_output))
+        outputs.pooler_output = tuple(features[source] for source in image_sources)
+        return outputs
+
+    @torch.no_grad()
+    def _prefix_state(self, input_ids: Any) -> Any:  # 取出（或建立）共享前缀的 KV 缓存
+        """
+        KV cache covering the longest cached prefix of input_ids, learning a
+        new prefix from the text shared with the previous request. Returns a
+        copy the generate call may extend, or None.
+        """
+        ids = input_ids.tolist()
+        length, state = self.prefix_cache.lookup(ids)
+        if state is None:
+            vision_start = getattr(self.model.config, "vision_start_token_id", None)
+            text_end = ids.index(vision_start) if vision_start in ids else len(ids)
+            length = self.prefix_cache.observe(ids[:text_end])  # 只在第一张图片之前的纯文本中寻找公共前缀
+            if not length:
+                return None
+            state = self.model.base_model(input_ids=input_ids[None, :length], use_cache=True).past_key_values
+            self.prefix_cache.store(ids[:length], state)
+            print(f"[INFO] Cached a shared prompt prefix of {length} tokens")
+        # Positions of the whole prompt (including M-RoPE offsets after images) are recomputed
+        # from input_ids only when no rope offsets are left over from the previous request
+        if hasattr(self.model.base_model, "rope_deltas"):
+            self.model.base_model.rope_deltas = None
+        return copy.deepcopy(state)
+
+
+class RowStopping(StoppingCriteria):  # 按行判断是否停止生成
+    """
+    Per-row stopping for a batched generate call: each row stops at its own
+    token budget, once its structured fields are complete, or when it falls
+    into a repetition loop. Text is re-decoded every CHECK_INTERVAL steps.
+    """
+
+    CHECK_INTERVAL = 4  # 每隔多少步解码检查一次
+
+    def __init__(self, tokenizer: Any, prompt_length: int, limits: List[GenerationLimits]):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.limits = limits
+        self.done = [False] * len(limits)
+        self.looping = set()  # 因重复而停止的行
+
+    def __call__(self, input_ids: Any, scores: Any, **kwargs) -> Any:
+        new_tokens = input_ids.shape[1] - self.prompt_length
+        check_text = new_tokens % self.CHECK_INTERVAL == 0
+        for row, limit in enumerate(self.limits):
+            if self.done[row]:
+                continue
+            if new_tokens >= limit.max_new_tokens:
+                self.done[row] = True
+            elif check_text and (limit.structured or limit.stop_on_repetition):
+                text = self.tokenizer.decode(input_ids[row, self.prompt_length:], skip_special_tokens=True)
+                if limit.structured and structured_output_complete(text):
+                    self.done[row] = True
+                elif limit.stop_on_repetition and find_repetition(text) is not None:
+                    self.done[row] = True
+                    self.looping.add(row)
+        return torch.tensor(self.done, dtype=torch.bool, device=input_ids.device)
+
+
+class GrammarConstraint(LogitsProcessor):  # 按行施加属性提取格式的语法约束
+    """
+    Masks the logits of constrained rows to the tokens the attribute
+    extraction grammar allows next. Each row's grammar state advances with
+    the token it sampled at the previous step; a row leaves the constraint
+    when it ends its sequence. Unconstrained rows are left untouched.
+    """
+
+    def __init__(self, masks: TokenMasks, prompt_length: int, limits: List[GenerationLimits],
+                 tensors: Optional[Dict[Any, torch.Tensor]] = None):
+        self.masks = masks
+        self.prompt_length = prompt_length
+        self.states = [START if limit.constrained else None for limit in limits]
+        self._tensors = {} if tensors is None else tensors  # 语法状态 -> 允许 token 的布尔掩码
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        started = input_ids.shape[1] > self.prompt_length
+        for row, state in enumerate(self.states):
+            if state is None:
+                continue
+            if started:
+                state = self.states[row] = self.masks.advance(state, int(input_ids[row, -1]))
+                if state is None:
+                    continue
+            scores[row] = scores[row].masked_fill(~self._mask(state, scores), float("-inf"))
+        return scores
+
+    def _mask(self, state: Any, scores: torch.FloatTensor) -> torch.Tensor:
+        mask = self._tensors.get(state)
+        if mask is None:
+            mask = torch.zeros(scores.shape[-1], dtype=torch.bool)
+            mask[[i for i in self.masks.allowed(state) if i < scores.shape[-1]]] = True
+            mask = self._tensors[state] = mask.to(scores.device)
+        return mask
@@ -0,0 +1,141 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+STRUCTURED_KEYS = ("category", "description", "material", "dimensions", "mass", "placement")
+
+# A header line: optional markdown bullets/emphasis, a known key and a colon
+HEADER_PATTERN = re.compile(
+    r"(?:^|\n)[\*#\-]*\s*(Category|Description|Material|Dimensions|Mass|Placement)\s*:", re.IGNORECASE
+)
+WHITESPACE = re.compile(r"\s*")
+VALUE_PREFIX = re.compile(r"^[\*#\-]*\s*")  # "** " left over from "**Key:**"
+
+ADD_CRITERION = re.compile(r"\s*addCriterion:?\s*", re.IGNORECASE)
+ADD_CRITERION_WORD = re.compile(r"addCriterion", re.IGNORECASE)  # cheap pre-check
+IMAGE_ONLY_LINE = re.compile(r"^\*\*Image\s*$", re.MULTILINE)
+REPEATED_WORD = re.compile(r"(\b\w+\b)(\s+\1){3,}")
+
+MULTI_OBJECT = re.compile(r"(?:^|\n)[\*#\-]*\s*Object\s+\d+", re.IGNORECASE)
+FIRST_OBJECT = re.compile(
+    r"(?:^|\n)[\*#\-]*[ \t]*\*?[ \t]*Object[ \t]*1:?[ \t]*[^\n]*\n([\s\S]*?)"
+    r"(?=(?:^|\n)[\*#\-]*[ \t]*\*?[ \t]*Object[ \t]*2:|\Z)",
+    re.IGNORECASE,
+)
+
+NUMBER = re.compile(r"(\d+\.?\d*)")
+DIMENSION_SPLIT = re.compile(r"\s*\*\s*")
+
+
+def header_lines(text: str) -> List[Tuple[int, int, str]]:
+    """
+    (start, end, key) of every header, as HEADER_PATTERN.finditer would find
+    them. Headers only start at the beginning of text or at a newline, so the
+    pattern is anchored at those positions instead of tried at every character.
+    """
+    headers = []
+    last_end = 0
+    position = 0
+    while position != -1:
+        if position >= last_end:
+            match = HEADER_PATTERN.match(text, position)
+            if match:
+                headers.append((match.start(), match.end(), match.group(1).lower()))
+                last_end = match.end()
+        position = text.find("\n", position + 1)
+    return headers
+
+
+def parse_fields(text: str) -> Dict[str, Optional[str]]:
+    """
+    Split structured text into the six fields in one scan over its header lines.
+
+    A field's value runs from its first header to the next header of any key
+    (or the end of text); whitespace after the colon is skipped first, so an
+    empty value swallows the following header line. Missing fields are None;
+    an empty dict means no header was found at all.
+    """
+    headers = header_lines(text)
+    result = dict.fromkeys(STRUCTURED_KEYS)
+    for index, (_, end, key) in enumerate(headers):
+        if result[key] is not None:
+            continue  # only the first occurrence of a key counts
+        value_start = WHITESPACE.match(text, end).end()
+        if index + 1 == len(headers):
+            value_end = len(text)
+        elif headers[index + 1][0] >= value_start:
+            value_end = headers[index + 1][0]
+        else:
+            # The next header began inside the skipped whitespace; the value ends at
+            # the first header line starting at or after value_start instead
+            following = HEADER_PATTERN.search(text, value_start)
+            value_end = following.start() if following else len(text)
+        result[key] = VALUE_PREFIX.sub("", text[value_start:value_end].strip())
+    if not headers:
+        return {}
+    return result
+
+
+def clean_artifacts(text: str) -> str:
+    """
+    Remove model artifacts: "addCriterion" corruption, "**Image" lines
+    without content and words repeated four or more times in a row.
+    """
+    if not text:
+        return text
+    if ADD_CRITERION_WORD.search(text):
+        text = ADD_CRITERION.sub(" ", text)
+    text = IMAGE_ONLY_LINE.sub("", text)
+    # A word repeated four times implies two equal consecutive whitespace-separated
+    # tokens; most outputs have none, which skips the backtracking regex
+    words = text.split()
+    if any(a == b for a, b in zip(words, words[1:])):
+        text = REPEATED_WORD.sub(r"\1", text)
+    return text.strip()
+
+
+def is_multi_object_output(text: str) -> bool:
+    """True if the output describes several objects ("Object 1:", "**Object 2:**", ...)."""
+    return bool(text) and MULTI_OBJECT.search(text) is not None
+
+
+def extract_first_object(text: str) -> str:
+    """Text of "Object 1" up to "Object 2" (or the end); text itself if there is no Object 1 header."""
+    if not text:
+        return text
+    match = FIRST_OBJECT.search(text)
+    return match.group(1).strip() if match else text
+
+
+def parse_annotation(text: str) -> Dict[str, Optional[str]]:
+    """
+    Clean artifacts, keep the first object of a multi-object output and
+    parse the fields. Returns an empty dict if nothing can be extracted.
+    """
+    if not text or not text.strip():
+        return {}
+    cleaned = clean_artifacts(text)
+    if not cleaned:
+        return {}
+    if is_multi_object_output(cleaned):
+        cleaned = extract_first_object(cleaned)
+    return parse_fields(cleaned)
+
+
+def normalize_dimensions(value: str) -> Optional[str]:
+    """Strip units: "0.5m * 0.5m * 1.0 m" -> "0.5 * 0.5 * 1.0"."""
+    if not value or value == "null":
+        return None
+    if "*" in value:
+        parts = [NUMBER.search(part) for part in DIMENSION_SPLIT.split(value)]
+        clean_parts = [match.group(1) for match in parts if match]
+        return " * ".join(clean_parts) if clean_parts else value
+    match = NUMBER.search(value)
+    return match.group(1) if match else value
+
+
+def normalize_mass(value: str) -> Optional[str]:
+    """Strip units: "Estimated mass is 0.1 kg." -> "0.1"."""
+    if not value or value == "null":
+        return None
+    match = NUMBER.search(value)
+    return match.group(1) if match else value
@@ -1,30 +1,217 @@
 import os  # 导入 os 模块，用于处理文件系统路径
-import re
 import time  # 导入 time 模块，用于计时
-from typing import Dict, Any, List  # 导入类型提示
-from .model import ModelEngine  # 导入 ModelEngine 类，用于模型推理
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple, Union  # 导入类型提示
+from .engine import InferenceEngine  # 导入推理后端接口（HF 或 mock）
+from .parser import (  # 导入结构化输出解析（预编译正则，单次扫描）
+    clean_artifacts, extract_first_object, is_multi_object_output, normalize_dimensions, normalize_mass,
+    parse_annotation, parse_fields,
+)
 from .prompt import PromptFactory  # 导入 PromptFactory 类，用于生成提示词
+from .stopping import GenerationLimits  # 导入逐请求的生成限制（token 预算、提前停止）
+from .grammar import GRAMMAR_PROMPT  # 语法约束解码适用的提示词类型
 from ..config.settings import Config  # 导入 Config 类，用于获取配置
+from ..utils.generation_log import GenerationLog, config_hash  # 导入原始生成文本的追加式日志
+from ..utils.result_cache import ResultCache  # 导入按内容寻址的推理结果缓存
 from ..utils.file import get_asset_images  # 导入 get_asset_images 函数，用于获取资产图片
 from ..utils.image import concatenate_images  # 导入 concatenate_images 函数，用于拼接图片（暂未启用）
 
+@dataclass
+class PreparedBatch:
+    """A batch of assets after the CPU preprocessing stage."""
+    asset_paths: List[str]
+    prompt_type: Union[str, List[str]]  # a list selects multi-prompt mode
+    requests: List[Tuple[int, List[Dict[str, Any]]]] = field(default_factory=list)  # (index into asset_paths, messages)
+    request_prompts: List[str] = field(default_factory=list)  # prompt type of each request
+    cache_keys: List[Optional[str]] = field(default_factory=list)  # result cache key of each request
+    cached: List[Tuple[int, str, str]] = field(default_factory=list)  # (index into asset_paths, prompt type, text) served by the result cache
+    inputs: Any = None  # engine.prepare_inputs output; None if preprocessing failed
+    elapsed: float = 0.0  # generation wall time
+
 class AnnotationPipeline:  # 定义 AnnotationPipeline 类，用于管理标注流程
-    def __init__(self, config: Config, engine: ModelEngine):  # 初始化方法
+    def __init__(self, config: Config, engine: InferenceEngine, generation_log: Optional[GenerationLog] = None,
+                 result_cache: Optional[ResultCache] = None):  # 初始化方法
         self.config = config  # 保存配置对象
         self.engine = engine  # 保存模型引擎对象
+        self.generation_log = generation_log  # 原始生成文本日志，None 表示不记录
+        self.result_cache = result_cache  # 推理结果缓存，None 表示每次都调用模型
+        if result_cache is not None:
+            self.cache_settings = f"{config.model.name}\0{config_hash(config.model)}"  # 模型名称 + 影响生成结果的参数
 
     def process_asset(self, asset_path: str, prompt_type: str = None) -> Dict[str, Any]:  # 处理单个资产的方法
         """
         Process a single asset.
         """
+        return self.process_batch([asset_path], prompt_type)[0]  # 单个资产即大小为 1 的批次
+
+    def process_batch(self, asset_paths: List[str], prompt_type: Union[str, List[str], None] = None, images_maps: Optional[List[Optional[Dict[str, str]]]] = None) -> List[Optional[Dict[str, Any]]]:  # 批量处理资产的方法
+        """
+        Process a group of assets with a single batched generate call.
+        images_maps optionally carries views already discovered by the scheduler.
+        Returns one result per input path (None for skipped or failed assets).
+
+        With a list of prompt types (multi-prompt mode) every asset gets one
+        request per prompt type in the same batch, sharing its decoded views,
+        and each result is a dict {prompt_type: result}.
+        """
+        batch = self.prepare_batch(asset_paths, prompt_type, images_maps)
+        return self.finish_batch(batch, self.generate_batch(batch))
+
+    def process_multi(self, asset_path: str, prompt_types: List[str]) -> Optional[Dict[str, Any]]:  # 对单个资产运行多种提示词
+        """
+        Run several prompt types over one asset, preprocessing its views once.
+        """
+        return self.process_batch([asset_path], list(prompt_types))[0]
+
+    def prepare_batch(self, asset_paths: List[str], prompt_type: Union[str, List[str], None] = None, images_maps: Optional[List[Optional[Dict[str, str]]]] = None) -> PreparedBatch:  # CPU 阶段：查找图片、生成提示词、预处理输入
+        """
+        CPU stage: image discovery, prompt composition and engine preprocessing.
+        """
         if prompt_type is None:  # 如果未指定提示词类型
             prompt_type = self.config.prompts.default_type  # 使用配置中的默认类型
-            
+        prompt_types = prompt_type if isinstance(prompt_type, list) else [prompt_type]
+
+        batch = PreparedBatch(asset_paths, prompt_type)
+        for i, asset_path in enumerate(asset_paths):
+            images_map = images_maps[i] if images_maps else None
+            if images_map is None and len(prompt_types) > 1:
+                images_map = get_asset_images(asset_path, self.config.data)  # 多提示词模式下只查找一次图片
+            for request_prompt in prompt_types:
+                messages = self.prepare_request(asset_path, request_prompt, images_map)
+                if messages is None:  # 没有图片时所有提示词都跳过
+                    break
+                batch.requests.append((i, messages))
+                batch.request_prompts.append(request_prompt)
+
+        if self.result_cache is not None and batch.requests:
+            self.lookup_cached(batch)  # 命中缓存的请求不再送入模型
+        if batch.requests:
+            try:
+                batch.inputs = self.engine.prepare_inputs([messages for _, messages in batch.requests])
+            except Exception as e:
+                # Leave inputs empty; generate_batch retries the assets one by one
+                print(f"[WARN] Preprocessing failed for a batch of {len(batch.requests)} assets: {e}")
+        return batch
+
+    def lookup_cached(self, batch: PreparedBatch) -> None:  # 查询结果缓存，移出已命中的请求
+        """
+        Look up every request of the batch in the result cache. Hits move to
+        batch.cached; the remaining requests keep their keys in batch.cache_keys
+        so finish_batch can store their texts.
+        """
+        keys = []
+        for _, messages in batch.requests:
+            try:
+                keys.append(self.result_cache.request_key(messages, self.cache_settings))
+            except OSError:
+                keys.append(None)  # 图片无法读取：不缓存，交给模型阶段报错
+        found = self.result_cache.get_many([key for key in keys if key is not None])
+        requests, request_prompts = [], []
+        for request, request_prompt, key in zip(batch.requests, batch.request_prompts, keys):
+            if key in found:
+                batch.cached.append((request[0], request_prompt, found[key]))
+            else:
+                requests.append(request)
+                request_prompts.append(request_prompt)
+                batch.cache_keys.append(key)
+        batch.requests, batch.request_prompts = requests, request_prompts
+
+    def generate_batch(self, batch: PreparedBatch) -> List[Optional[str]]:  # 设备阶段：批量生成
+        """
+        Accelerator stage: one generate call for the whole batch.
+        Returns one text per request (None where inference failed).
+        """
+        if not batch.requests:
+            return []
+
+        # 4. Inference
+        start_time = time.time()  # 记录开始时间
+        limits = [self.generation_limits(prompt_type) for prompt_type in batch.request_prompts]
+        if batch.inputs is not None:
+            try:  # 尝试进行批量推理
+                texts = self.engine.generate(batch.inputs, limits)
+                batch.elapsed = time.time() - start_time
+                return texts
+            except Exception as e:
+                if len(batch.requests) == 1:  # 单个资产失败时与原逻辑一致，直接放弃
+                    asset_id = os.path.basename(batch.asset_paths[batch.requests[0][0]])
+                    print(f"[ERROR] Inference failed for {asset_id}: {e}")  # 打印错误信息
+                    return [None]
+                # A failed batch (e.g. OOM on an unusually large group) falls back to one-by-one
+                print(f"[WARN] Batched inference failed for {len(batch.requests)} assets: {e}. Retrying one by one.")
+
+        texts = []
+        for (i, messages), limit in zip(batch.requests, limits):
+            try:
+                texts.append(self.engine.inference(messages, limit))
+            except Exception as e:
+                print(f"[ERROR] Inference failed for {os.path.basename(batch.asset_paths[i])}: {e}")  # 打印错误信息
+                texts.append(None)
+        batch.elapsed = time.time() - start_time
+        return texts
+
+    def finish_batch(self, batch: PreparedBatch, texts: List[Optional[str]]) -> List[Optional[Dict[str, Any]]]:  # CPU 阶段：解析输出
+        """
+        CPU stage: parse generated texts into per-asset results, in input order.
+        """
+        multi_prompt = isinstance(batch.prompt_type, list)
+        results = [None] * len(batch.asset_paths)  # 预先占位，保证输出顺序与输入一致
+        if self.generation_log is not None:
+            self.log_generations(batch, texts)  # 解析前先保存原始文本
+        if self.result_cache is not None:
+            self.result_cache.put_many({key: text for key, text in zip(batch.cache_keys, texts) if key is not None and text is not None})
+        generated = [(i, request_prompt, text, f"in {batch.elapsed:.2f}s (batch of {len(batch.requests)})")
+                     for (i, _), request_prompt, text in zip(batch.requests, batch.request_prompts, texts)]
+        cached = [(i, request_prompt, text, "from result cache") for i, request_prompt, text in batch.cached]
+        prompt_order = {prompt: n for n, prompt in enumerate(batch.prompt_type)} if multi_prompt else {}
+        for i, request_prompt, result_text, timing in sorted(generated + cached, key=lambda item: (item[0], prompt_order.get(item[1], 0))):
+            if result_text is None:
+                continue
+            result = self.parse_result(batch.asset_paths[i], request_prompt, result_text)
+            if multi_prompt:  # 多提示词模式：按提示词类型收集结果
+                results[i] = results[i] or {}
+                results[i][request_prompt] = result
+                print(f"[INFO] Finished {os.path.basename(batch.asset_paths[i])} ({request_prompt}) {timing}")
+            else:
+                results[i] = result
+                print(f"[INFO] Finished {os.path.basename(batch.asset_paths[i])} {timing}")  # 打印处理完成及耗时信息
+        return results  # 返回处理结果
+
+    def log_generations(self, batch: PreparedBatch, texts: List[Optional[str]]) -> None:  # 追加原始生成文本到日志
+        """
+        Append every generated text of the batch to the generation log, so
+        parser or normalization changes can be applied without re-inference.
+        """
+        try:
+            prompt_tokens = batch.inputs["attention_mask"].sum(-1).tolist()  # 左填充，每行有效 token 数即提示长度
+        except (TypeError, KeyError, IndexError, AttributeError):
+            prompt_tokens = [None] * len(batch.requests)  # 后端没有提供 attention_mask（如 mock）
+        if len(prompt_tokens) != len(batch.requests):
+            prompt_tokens = [None] * len(batch.requests)
+        for (i, _), request_prompt, text, tokens in zip(batch.requests, batch.request_prompts, texts, prompt_tokens):
+            if text is None:
+                continue
+            self.generation_log.append(
+                os.path.relpath(batch.asset_paths[i], self.config.data.input_dir),
+                request_prompt,
+                text,
+                prompt_tokens=tokens,
+                output_tokens=self.engine.count_tokens(text),
+                seconds=round(batch.elapsed, 4),
+                batch_size=len(batch.requests),
+            )
+
+    def prepare_request(self, asset_path: str, prompt_type: str, images_map: Optional[Dict[str, str]] = None) -> Optional[List[Dict[str, Any]]]:  # 准备单个资产的模型输入
+        """
+        Discover the images of an asset and build its chat messages.
+        Returns None if the asset has no images.
+        """
         asset_id = os.path.basename(asset_path)  # 从路径中获取资产 ID（文件夹名）
         print(f"[INFO] Processing asset: {asset_id}")  # 打印正在处理的资产信息
 
         # 1. Find Images
-        images_map = get_asset_images(asset_path, self.config.data)  # 根据配置查找资产的所有图片
+        if images_map is None:  # 调度器未提供时再查找
+            images_map = get_asset_images(asset_path, self.config.data)  # 根据配置查找资产的所有图片
         if not images_map:  # 如果没有找到图片
             print(f"[WARN] No images found for {asset_id}. Skipping.")  # 打印警告并跳过
             return None  # 返回 None
@@ -47,57 +234,79 @@ class AnnotationPipeline:  # 定义 AnnotationPipeline 类，用于管理标注
             image_number=len(image_paths),  # 图片数量
             prompt_type=prompt_type,  # 提示词类型
             image_merge=False, # Make configurable if needed  # 是否合并图片（目前设为 False，可配置）
-            object_additional_info=object_info  # 对象的额外信息
+            object_additional_info=object_info,  # 对象的额外信息
+            instructions_first=getattr(self.config.model, "prefix_cache", False)  # 启用前缀缓存时固定指令在前
         )
 
         # 3. Prepare Inputs (Text + Images)
         # This logic mimics _prepare_inputs_text_and_image
-        messages = self._prepare_messages(user_prompt, image_paths)  # 准备模型输入的完整消息结构
+        return self._prepare_messages(user_prompt, image_paths)  # 准备模型输入的完整消息结构
 
-        # 4. Inference
-        start_time = time.time()  # 记录开始时间
-        try:  # 尝试进行推理
-            result_text = self.engine.inference(messages)
-            
-            # Parse structured text if expected
-            if "json" in prompt_type.lower() or "extract" in prompt_type.lower():  # 如果提示词类型暗示需要结构化输出
-                try:
-                    result = self.parse_structured_text_enhanced(result_text)
-                    if not result:
-                        print(f"[WARN] No structured data found for {asset_id}. Saving raw text.")
-                        result = {"raw_output": result_text}
-                    else:
-                        # Extract category from directory path and override
-                        asset_relative_path = os.path.relpath(asset_path, self.config.data.input_dir)
-                        category_from_dir = asset_relative_path.split(os.sep)[0]
-
-                        # Override category with directory name
-                        result['category'] = category_from_dir
-
-                        # Normalize dimensions and mass
-                        if result.get('dimensions'):
-                            result['dimensions'] = self._normalize_dimensions(result['dimensions'])
-                        if result.get('mass'):
-                            result['mass'] = self._normalize_mass(result['mass'])
-                except Exception as e:
-                    print(f"[WARN] Failed to parse structured text for {asset_id}: {e}. Saving raw text.")
-                    result = {"raw_output": result_text}
-            else:  # 如果不需要结构化输出
-                result = result_text  # 直接使用文本结果
+    def generation_limits(self, prompt_type: str) -> GenerationLimits:  # 根据提示词类型确定生成限制
+        """
+        Token budget and stopping rules for one request: model.max_new_tokens_by_prompt
+        overrides model.max_new_tokens, and structured prompts stop once all
+        six fields are complete (model.early_stopping). With
+        model.constrained_decoding the attribute extraction prompt is decoded
+        under its output grammar.
+        """
+        model_config = self.config.model
+        return GenerationLimits(
+            max_new_tokens=model_config.max_new_tokens_by_prompt.get(prompt_type, model_config.max_new_tokens),
+            structured=model_config.early_stopping and self._expects_structured(prompt_type),
+            stop_on_repetition=model_config.early_stopping,
+            constrained=model_config.constrained_decoding and prompt_type == GRAMMAR_PROMPT,
+        )
 
-        except Exception as e:  # 捕获推理过程中的异常
-            print(f"[ERROR] Inference failed for {asset_id}: {e}")  # 打印错误信息
-            return None  # 返回 None
-            
-        print(f"[INFO] Finished {asset_id} in {time.time() - start_time:.2f}s")  # 打印处理完成及耗时信息
-        return result  # 返回处理结果
+    @staticmethod
+    def _expects_structured(prompt_type: str) -> bool:  # 该提示词类型的输出是否为结构化文本
+        return "json" in prompt_type.lower() or "extract" in prompt_type.lower()
+
+    def parse_result(self, asset_path: str, prompt_type: str, result_text: str) -> Any:  # 解析模型输出
+        """
+        Turn raw model output into the result stored for an asset.
+        """
+        asset_id = os.path.basename(asset_path)
+        # Parse structured text if expected
+        if self._expects_structured(prompt_type):  # 如果提示词类型暗示需要结构化输出
+            try:
+                result = self.parse_structured_text_enhanced(result_text)
+                if not result:
+                    print(f"[WARN] No structured data found for {asset_id}. Saving raw text.")
+                    result = {"raw_output": result_text}
+                else:
+                    # Extract category from directory path and override
+                    asset_relative_path = os.path.relpath(asset_path, self.config.data.input_dir)
+                    category_from_dir = asset_relative_path.split(os.sep)[0]
+
+                    # Override category with directory name
+                    result['category'] = category_from_dir
+
+                    # Normalize dimensions and mass
+                    if result.get('dimensions'):
+                        result['dimensions'] = self._normalize_dimensions(result['dimensions'])
+                    if result.get('mass'):
+                        result['mass'] = self._normalize_mass(result['mass'])
+            except Exception as e:
+                print(f"[WARN] Failed to parse structured text for {asset_id}: {e}. Saving raw text.")
+                result = {"raw_output": result_text}
+        else:  # 如果不需要结构化输出
+            result = result_text  # 直接使用文本结果
+        return result
 
     def _prepare_messages(self, user_prompt: str, image_paths: List[str]) -> List[Dict[str, Any]]:  # 内部方法，准备消息列表
         content = []  # 初始化内容列表
         content.append({"type": "text", "text": user_prompt})  # 添加文本提示词
         
+        model_config = self.config.model
         for img_path in image_paths:  # 遍历所有图片路径
-            content.append({"type": "image_url", "image": img_path})  # 添加图片 URL（路径）
+            image_item = {"type": "image_url", "image": img_path}  # 添加图片 URL（路径）
+            # Optional resize bounds, read by qwen_vl_utils.fetch_image
+            if model_config.min_pixels:
+                image_item["min_pixels"] = model_config.min_pixels
+            if model_config.max_pixels:
+                image_item["max_pixels"] = model_config.max_pixels
+            content.append(image_item)
             
         return [{  # 返回消息列表
             "role": "user",  # 角色为用户
@@ -106,58 +315,10 @@ class AnnotationPipeline:  # 定义 AnnotationPipeline 类，用于管理标注
 
     def parse_structured_text(self, text: str) -> Dict[str, str]:
         """
-        Parses structured text using regex to find key-value pairs.
+        Parses structured text into the six fields (see core/parser.py).
         Robustly handles multi-object outputs by only taking the first occurrence of keys.
         """
-        result = {}
-        # Define expected keys in order of likelihood
-        keys = ["Category", "Description", "Material", "Dimensions", "Mass", "Placement"]
-        
-        # Remove markdown bold/italic markers from keys if present in text for easier matching
-        # But we'll just use a flexible regex.
-        
-        for key in keys:
-            # Pattern: 
-            # 1. Key (case insensitive), optional markdown (**Key** or Key:)
-            # 2. Colon
-            # 3. Content (lazy match)
-            # 4. Lookahead for next key or end of string
-            
-            # Simplified approach: Find the key, capture until next known key or double newline or end
-            # Using a specific regex for each key is safer to isolate its value.
-            
-            # Regex explanation:
-            # (?:^|\n)      -> Start of string or new line
-            # [\*#\-]*      -> Optional markdown bullets/headers
-            # \s*           -> Optional whitespace
-            # ({key})       -> The Key itself
-            # \s*:\s*       -> Colon and whitespace
-            # ([\s\S]*?)    -> Capture content (lazy)
-            # (?=           -> Lookahead (stop when...)
-            #   (?:^|\n)[\*#\-]*\s*(?:Category|Description|Material|Dimensions|Mass|Placement)\s*:  -> Next key starts
-            #   | $         -> Or end of string
-            # )
-            
-            pattern = r"(?:^|\n)[\*#\-]*\s*(" + key + r")\s*:\s*([\s\S]*?)(?=(?:^|\n)[\*#\-]*\s*(?:Category|Description|Material|Dimensions|Mass|Placement)\s*:|$)"
-            
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                # Store the value, stripped of whitespace
-                value = match.group(2).strip()
-                # Clean up value: remove leading "** " if present (common artifact)
-                value = re.sub(r'^[\*#\-]*\s*', '', value)
-                # Normalize key to lowercase for consistency
-                result[key.lower()] = value
-            else:
-                # If key missing, set to None/null
-                result[key.lower()] = None
-                
-        # If we found absolutely nothing, return empty dict to trigger raw_output fallback
-        # But if we found at least one field (even if others are None), we consider it a success.
-        if all(v is None for v in result.values()):
-            return {}
-
-        return result
+        return parse_fields(text)
 
     def _clean_artifacts(self, text: str) -> str:
         """
@@ -168,19 +329,7 @@ class AnnotationPipeline:  # 定义 AnnotationPipeline 类，用于管理标注
         - "**Image" with only whitespace
         - Repetition patterns (word repeated 3+ times)
         """
-        if not text:
-            return text
-
-        # Remove addCriterion artifacts
-        text = re.sub(r'\s*addCriterion:?\s*', ' ', text, flags=re.IGNORECASE)
-
-        # Remove **Image prefix that's not followed by actual content
-        text = re.sub(r'^\*\*Image\s*$', '', text, flags=re.MULTILINE)
-
-        # Remove repetition patterns (same word repeated 3+ times)
-        text = re.sub(r'(\b\w+\b)(\s+\1){3,}', r'\1', text)
-
-        return text.strip()
+        return clean_artifacts(text)
 
     def _is_multi_object_output(self, text: str) -> bool:
         """
@@ -190,14 +339,7 @@ class AnnotationPipeline:  # 定义 AnnotationPipeline 类，用于管理标注
         - "Object 1:", "Object 2:", etc.
         - "**Object 1:**" markdown format
         """
-        if not text:
-            return False
-
-        return bool(re.search(
-            r'(?:^|\n)[\*#\-]*\s*Object\s+\d+',
-            text,
-            re.IGNORECASE
-        ))
+        return is_multi_object_output(text)
 
     def _extract_first_object(self, text: str) -> str:
         """
@@ -207,22 +349,7 @@ class AnnotationPipeline:  # 定义 AnnotationPipeline 类，用于管理标注
         - "Object 2:" or
         - End of text
         """
-        if not text:
-            return text
-
-        # Pattern 1: Match Object 1 header line and capture everything after until Object 2 or end
-        # Handles both "Object 1:" and "**Object 1: Name**" formats
-        # The [^\n]* matches any text on the same line as Object 1
-        # The \n matches the end of that line
-        # The ([\s\S]*?) captures everything until Object 2 (non-greedy but with lookahead)
-        # Note: Using [ \t]* instead of \s* to avoid matching newlines
-        pattern = r'(?:^|\n)[\*#\-]*[ \t]*\*?[ \t]*Object[ \t]*1:?[ \t]*[^\n]*\n([\s\S]*?)(?=(?:^|\n)[\*#\-]*[ \t]*\*?[ \t]*Object[ \t]*2:|\Z)'
-        match = re.search(pattern, text, re.IGNORECASE)
-
-        if match:
-            return match.group(1).strip()
-
-        return text
+        return extract_first_object(text)
 
     def parse_structured_text_enhanced(self, text: str) -> Dict[str, str]:
         """
@@ -231,25 +358,11 @@ class AnnotationPipeline:  # 定义 AnnotationPipeline 类，用于管理标注
         This method:
         1. Cleans model artifacts from text
         2. Detects multi-object output and extracts first object
-        3. Parses with original parse_structured_text logic
+        3. Parses with parse_structured_text logic
 
         Returns empty dict if no structured data can be extracted.
         """
-        if not text or not text.strip():
-            return {}
-
-        # Step 1: Clean artifacts
-        cleaned_text = self._clean_artifacts(text)
-
-        if not cleaned_text:
-            return {}
-
-        # Step 2: Handle multi-object output
-        if self._is_multi_object_output(cleaned_text):
-            cleaned_text = self._extract_first_object(cleaned_text)
-
-        # Step 3: Parse with original logic
-        return self.parse_structured_text(cleaned_text)
+        return parse_annotation(text)
 
     def _normalize_dimensions(self, value: str) -> str:
         """
@@ -257,22 +370,7 @@ class AnnotationPipeline:  # 定义 AnnotationPipeline 类，用于管理标注
         Input: "0.30 * 0.30 * 0.05 meters" or "0.5 * 0.15 * 0.01 m"
         Output: "0.30 * 0.30 * 0.05" or "0.5 * 0.15 * 0.01"
         """
-        if not value or value == "null":
-            return None
-
-        # Handle multiplication pattern
-        if '*' in value:
-            parts = re.split(r'\s*\*\s*', value)
-            clean_parts = []
-            for part in parts:
-                match = re.search(r'(\d+\.?\d*)', part)
-                if match:
-                    clean_parts.append(match.group(1))
-            return ' * '.join(clean_parts) if clean_parts else value
-
-        # Single value
-        match = re.search(r'(\d+\.?\d*)', value)
-        return match.group(1) if match else value
+        return normalize_dimensions(value)
 
     def _normalize_mass(self, value: str) -> str:
         """
@@ -280,8 +378,4 @@ class AnnotationPipeline:  # 定义 AnnotationPipeline 类，用于管理标注
         Input: "0.5 kg", "0.05 kilograms", "Estimated mass is 0.1 kg."
         Output: "0.5", "0.05", "0.1"
         """
-        if not value or value == "null":
-            return None
-
-        match = re.search(r'(\d+\.?\d*)', value)
-        return match.group(1) if match else value
+        return normalize_mass(value)
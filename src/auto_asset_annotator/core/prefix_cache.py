@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Any, Optional, Sequence, Tuple
+
+
+class PrefixKVCache:
+    """
+    Keeps the KV state of prompt prefixes shared between requests.
+
+    Prefixes are learned rather than declared: the text tokens before the
+    first image of each request are compared with those of the previous
+    request, and a common prefix of at least min_tokens (chat template plus
+    the fixed instruction block) becomes a cache entry. Entries are keyed by
+    token ids, so a lookup only matches when the tokens are identical, and
+    evicted least recently used beyond max_entries.
+
+    Values are opaque to this class (the engine stores model caches).
+    """
+
+    def __init__(self, max_entries: int = 4, min_tokens: int = 32):
+        self.max_entries = max(1, max_entries)
+        self.min_tokens = min_tokens
+        self._entries = OrderedDict()  # token tuple -> cached state
+        self._previous: Optional[Tuple[int, ...]] = None
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+
+    def lookup(self, tokens: Sequence[int]) -> Tuple[int, Any]:
+        """Return (length, state) of the longest cached prefix of tokens, or (0, None)."""
+        tokens = tuple(tokens)
+        best = None
+        for key in self._entries:
+            # A strict prefix: at least one token must remain for the model to process
+            if len(key) < len(tokens) and tokens[:len(key)] == key and (best is None or len(key) > len(best)):
+                best = key
+        if best is None:
+            self.misses += 1
+            return 0, None
+        self._entries.move_to_end(best)
+        self.hits += 1
+        self.reused_tokens += len(best)
+        return len(best), self._entries[best]
+
+    def observe(self, tokens: Sequence[int]) -> int:
+        """
+        Record a request's prefix tokens. Returns the length of a new shared
+        prefix worth caching (common with the previous request), or 0.
+        """
+        tokens = tuple(tokens)
+        previous, self._previous = self._previous, tokens
+        if previous is None:
+            return 0
+        common = 0
+        for a, b in zip(previous, tokens):
+            if a != b:
+                break
+            common += 1
+        if common < self.min_tokens or tokens[:common] in self._entries:
+            return 0
+        return common
+
+    def store(self, tokens: Sequence[int], state: Any) -> None:
+        self._entries[tuple(tokens)] = state
+        self._entries.move_to_end(tuple(tokens))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
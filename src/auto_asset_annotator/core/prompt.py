@@ -18,7 +18,8 @@ class PromptFactory:  # 定义 PromptFactory 类，用于生成提示词
         image_number: int,  # 图片数量
         prompt_type: str,  # 提示词类型
         image_merge: bool = False,  # 是否合并图片，默认为 False
-        object_additional_info: Optional[List[str]] = None  # 对象的额外信息，可选
+        object_additional_info: Optional[List[str]] = None,  # 对象的额外信息，可选
+        instructions_first: bool = False  # 是否把固定指令放在对象相关描述之前（便于复用前缀 KV 缓存）
     ) -> Union[str, List[str]]:  # 返回字符串或字符串列表
         
         if prompt_type not in SUPPORTED_PROMPT_TYPES:  # 检查提示词类型是否受支持
@@ -76,6 +77,8 @@ class PromptFactory:  # 定义 PromptFactory 类，用于生成提示词
                 "3. For 'Material', describe all materials and their corresponding parts comprehensively.\n"
                 "4. For 'Placement', provide one or more options ordered by likelihood."
             )
+            if instructions_first:  # 固定指令在前，各资产的提示词共享同一前缀
+                return f"{attribute_query}\n\n{object_query.strip()}"
             return f"{object_query} {attribute_query}"  # 拼接并返回完整提示词
         
         # ... Implement other prompts if needed, but for now focusing on the main ones used in the script.
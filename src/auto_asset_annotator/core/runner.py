@@ -0,0 +1,92 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Union
+from .pipeline import AnnotationPipeline, PreparedBatch
+from .scheduler import ScheduledAsset
+from ..config.settings import ProcessingConfig
+
+_DONE = object()
+
+
+class StagedRunner:
+    """
+    Runs the annotation pipeline as three overlapping stages:
+
+        prefetch workers -> engine (caller thread) -> post-process workers
+
+    Prefetch workers do image discovery, decoding and tokenization
+    (AnnotationPipeline.prepare_batch) for upcoming batches while the current
+    batch generates; post-process workers parse outputs and hand them to the
+    result callback (e.g. JSON writing). Each hand-off is bounded by
+    processing.queue_size batches. With prefetch_workers = 0 every stage runs
+    inline, one batch at a time.
+    """
+
+    def __init__(self, pipeline: AnnotationPipeline, config: ProcessingConfig):
+        self.pipeline = pipeline
+        self.prefetch_workers = max(0, config.prefetch_workers)
+        self.postprocess_workers = max(1, config.postprocess_workers)
+        self.queue_size = max(1, config.queue_size)
+
+    def run(
+        self,
+        batches: Iterable[List[ScheduledAsset]],
+        prompt_type: Union[str, List[str]],
+        on_result: Callable[[str, Any], None],
+    ) -> None:
+        """
+        Annotate every scheduled asset. on_result(asset_name, result) is called
+        once per asset (result is None for skipped or failed assets), from a
+        post-process worker thread.
+        """
+        input_dir = self.pipeline.config.data.input_dir
+
+        def prepare(batch: List[ScheduledAsset]):
+            paths = [os.path.join(input_dir, asset.name) for asset in batch]
+            return batch, self.pipeline.prepare_batch(paths, prompt_type, [asset.images for asset in batch])
+
+        def finish(batch: List[ScheduledAsset], prepared: PreparedBatch, texts: List[Optional[str]]):
+            results = self.pipeline.finish_batch(prepared, texts)
+            for asset, result in zip(batch, results):
+                on_result(asset.name, result)
+
+        if self.prefetch_workers == 0:
+            for batch in batches:
+                batch, prepared = prepare(batch)
+                finish(batch, prepared, self.pipeline.generate_batch(prepared))
+            return
+
+        with ThreadPoolExecutor(self.prefetch_workers, thread_name_prefix="prefetch") as prefetch_pool, \
+                ThreadPoolExecutor(self.postprocess_workers, thread_name_prefix="postprocess") as post_pool:
+            # Prefetch futures in submission order. A feeder thread consumes the
+            # batch stream so the engine never waits on the stream (which may
+            # block, e.g. polling a work queue) while prepared batches are ready.
+            ready = queue.Queue(maxsize=self.queue_size)
+            finishing = deque()
+
+            def feed():
+                try:
+                    for batch in batches:
+                        ready.put(prefetch_pool.submit(prepare, batch))
+                except BaseException as e:  # surfaced in the engine thread
+                    ready.put(e)
+                ready.put(_DONE)
+
+            threading.Thread(target=feed, name="batch-feeder", daemon=True).start()
+            while True:
+                item = ready.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                batch, prepared = item.result()
+                texts = self.pipeline.generate_batch(prepared)
+                finishing.append(post_pool.submit(finish, batch, prepared, texts))
+                # Bound the post-process backlog and surface worker exceptions early
+                while len(finishing) > self.queue_size:
+                    finishing.popleft().result()
+            while finishing:
+                finishing.popleft().result()
@@ -0,0 +1,146 @@
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from PIL import Image
+from .prompt import PromptFactory
+from ..config.settings import Config
+from ..utils.file import get_asset_images
+
+# Qwen2.5-VL: 14px patches merged 2x2, so one vision token covers a 28x28 area
+PATCH_FACTOR = 28
+DEFAULT_MIN_PIXELS = 4 * PATCH_FACTOR * PATCH_FACTOR
+DEFAULT_MAX_PIXELS = 16384 * PATCH_FACTOR * PATCH_FACTOR
+
+# Rough text cost: characters per token, plus chat template / per-image marker overhead
+CHARS_PER_TOKEN = 4
+TEMPLATE_TOKENS = 32
+TOKENS_PER_IMAGE_MARKERS = 2
+
+
+@dataclass
+class ScheduledAsset:
+    """An asset with its discovered views and estimated prompt length in tokens."""
+    name: str
+    images: Optional[Dict[str, str]] = None
+    tokens: int = 0
+
+
+@dataclass
+class _Batch:
+    assets: List[ScheduledAsset] = field(default_factory=list)
+    max_tokens: int = 0
+
+    def padded_tokens_with(self, asset: ScheduledAsset) -> int:
+        return (len(self.assets) + 1) * max(self.max_tokens, asset.tokens)
+
+    def add(self, asset: ScheduledAsset) -> None:
+        self.assets.append(asset)
+        self.max_tokens = max(self.max_tokens, asset.tokens)
+
+
+def estimate_image_tokens(image_path: str, min_pixels: Optional[int] = None, max_pixels: Optional[int] = None) -> int:
+    """
+    Estimate the number of vision tokens an image expands to, mirroring
+    qwen_vl_utils.smart_resize. Only the image header is read.
+    """
+    min_pixels = min_pixels or DEFAULT_MIN_PIXELS
+    max_pixels = max_pixels or DEFAULT_MAX_PIXELS
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+    except Exception:
+        return max_pixels // (PATCH_FACTOR * PATCH_FACTOR)  # 读不到尺寸时按最坏情况估计
+
+    h_bar = max(PATCH_FACTOR, round(height / PATCH_FACTOR) * PATCH_FACTOR)
+    w_bar = max(PATCH_FACTOR, round(width / PATCH_FACTOR) * PATCH_FACTOR)
+    if h_bar * w_bar > max_pixels:
+        beta = math.sqrt((height * width) / max_pixels)
+        h_bar = math.floor(height / beta / PATCH_FACTOR) * PATCH_FACTOR
+        w_bar = math.floor(width / beta / PATCH_FACTOR) * PATCH_FACTOR
+    elif h_bar * w_bar < min_pixels:
+        beta = math.sqrt(min_pixels / (height * width))
+        h_bar = math.ceil(height * beta / PATCH_FACTOR) * PATCH_FACTOR
+        w_bar = math.ceil(width * beta / PATCH_FACTOR) * PATCH_FACTOR
+    return (h_bar // PATCH_FACTOR) * (w_bar // PATCH_FACTOR)
+
+
+class MicroBatcher:
+    """
+    Groups pending assets into generate batches.
+
+    With processing.max_batch_tokens set, assets are read in windows of
+    processing.batch_window, sorted by estimated prompt length (vision tokens
+    plus text), and packed so that the padded batch (batch rows * longest
+    prompt) stays under the token budget and at most batch_size assets.
+    Without a budget it falls back to fixed batches of batch_size.
+    """
+
+    def __init__(self, config: Config, prompt_type: Union[str, List[str], None] = None):
+        self.config = config
+        # A list of prompt types (multi-prompt mode) puts one batch row per prompt for every asset
+        self.prompt_types = list(prompt_type) if isinstance(prompt_type, (list, tuple)) else [prompt_type or config.prompts.default_type]
+        self.batch_size = max(1, config.processing.batch_size)
+        self.max_batch_tokens = config.processing.max_batch_tokens
+        self.window = max(self.batch_size, config.processing.batch_window)
+
+    def schedule(self, asset_name: str) -> ScheduledAsset:
+        """Discover an asset's views and estimate its prompt length."""
+        asset_path = os.path.join(self.config.data.input_dir, asset_name)
+        images = get_asset_images(asset_path, self.config.data)
+        if not images:
+            return ScheduledAsset(asset_name, images, 0)
+
+        vision_tokens = sum(
+            estimate_image_tokens(path, self.config.model.min_pixels, self.config.model.max_pixels)
+            for path in images.values()
+        )
+        object_info = os.path.basename(asset_path).split('-')[:-1] or ["object", os.path.basename(asset_path)]
+        prompt_chars = max(
+            len(PromptFactory.compose_user_prompt(
+                image_number=len(images),
+                prompt_type=prompt_type,
+                image_merge=False,
+                object_additional_info=object_info,
+            ))
+            for prompt_type in self.prompt_types
+        )
+        text_tokens = prompt_chars // CHARS_PER_TOKEN + TEMPLATE_TOKENS + TOKENS_PER_IMAGE_MARKERS * len(images)
+        # Each prompt type is its own row, padded to the longest
+        return ScheduledAsset(asset_name, images, (vision_tokens + text_tokens) * len(self.prompt_types))
+
+    def batches(self, asset_names: Iterable[str]) -> Iterator[List[ScheduledAsset]]:
+        """Yield batches of scheduled assets from a (possibly streaming) iterable of names."""
+        if not self.max_batch_tokens:
+            batch = []
+            for name in asset_names:
+                batch.append(ScheduledAsset(name))
+                if len(batch) == self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+            return
+
+        window = []
+        for name in asset_names:
+            window.append(self.schedule(name))
+            if len(window) >= self.window:
+                yield from self._pack(window)
+                window = []
+        if window:
+            yield from self._pack(window)
+
+    def _pack(self, window: List[ScheduledAsset]) -> Iterator[List[ScheduledAsset]]:
+        batch = _Batch()
+        for asset in sorted(window, key=lambda a: a.tokens):
+            if batch.assets and (
+                len(batch.assets) >= self.batch_size
+                or batch.padded_tokens_with(asset) > self.max_batch_tokens
+            ):
+                yield batch.assets
+                batch = _Batch()
+            # An asset larger than the budget on its own still runs, alone
+            batch.add(asset)
+        if batch.assets:
+            yield batch.assets
@@ -0,0 +1,90 @@
+import re
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from .parser import HEADER_PATTERN, STRUCTURED_KEYS
+
+BULLET_PATTERN = re.compile(r"[\*\-\d]")
+
+# Repetition loop: the tail is one unit of up to MAX_PERIOD characters repeated
+# at least MIN_REPEATS times and spanning at least MIN_SPAN characters
+MAX_PERIOD = 256
+MIN_REPEATS = 4
+MIN_SPAN = 64
+
+
+@dataclass
+class GenerationLimits:
+    """Per-request decoding limits."""
+    max_new_tokens: int
+    structured: bool = False  # stop once all six structured fields are complete
+    stop_on_repetition: bool = True
+    constrained: bool = False  # decode under the attribute extraction grammar (core/grammar.py)
+
+
+def structured_output_complete(text: str) -> bool:
+    """
+    True once text contains all six headers parsed by parse_fields
+    and the Placement value has been terminated. Placement is the last field
+    of the requested format, so anything after it is a second object or
+    rambling that the parser discards anyway.
+    """
+    seen = {}
+    for match in HEADER_PATTERN.finditer(text):
+        seen.setdefault(match.group(1).lower(), match.end())
+    if len(seen) < len(STRUCTURED_KEYS):
+        return False
+
+    value = text[seen["placement"]:]
+    first_line, newline, rest = value.partition("\n")
+    if first_line.strip(" \t*"):
+        # Inline value: done at the end of its line
+        return bool(newline)
+    # Value on the following lines: a plain line ends at its newline, a bullet
+    # list at a blank line or at the first line that does not continue it
+    lines = rest.split("\n")
+    in_list = False
+    for line in lines[:-1]:
+        stripped = line.strip()
+        if not stripped:
+            if in_list:
+                return True
+            continue
+        if not BULLET_PATTERN.match(stripped):
+            return True
+        in_list = True
+    partial = lines[-1].strip()
+    return bool(in_list and partial and not BULLET_PATTERN.match(partial))
+
+
+def find_repetition(text: str) -> Optional[Tuple[int, int]]:
+    """
+    Detect a degenerate loop at the end of text. Returns (start, period):
+    text[start:] is a repetition of text[start:start + period], or None.
+    """
+    length = len(text)
+    for period in range(1, min(MAX_PERIOD, length // MIN_REPEATS) + 1):
+        unit = text[length - period:]
+        if text[length - 2 * period:length - period] != unit:
+            continue
+        repeats = max(MIN_REPEATS, -(-MIN_SPAN // period))
+        span = period * repeats
+        if span > length or text[length - span:] != unit * repeats:
+            continue
+        if not unit.strip():
+            continue  # runs of whitespace are left to the length limit
+        # Extend backwards over further whole repeats
+        start = length - span
+        while start >= period and text[start - period:start] == unit:
+            start -= period
+        return start, period
+    return None
+
+
+def trim_repetition(text: str) -> str:
+    """Collapse a trailing repetition loop to a single occurrence of its unit."""
+    found = find_repetition(text)
+    if found is None:
+        return text
+    start, period = found
+    return text[:start + period]
@@ -0,0 +1,67 @@
+"""
+Convert an output directory between storage formats.
+
+Reads the latest result of every asset from --output_dir (per-asset files or
+JSONL shards, detected automatically) and writes them to --to in --format:
+"files" recreates the <asset>_annotation.json layout for tools that expect
+it, "jsonl" packs a per-file tree (or compacts re-annotated shards) into a
+few shard files, "parquet" writes one columnar file for analysis (needs
+pyarrow). The status index is carried over, so the annotator can resume
+from the exported directory.
+
+Usage:
+    auto-annotator export --output_dir ./output --to ./output_files --format files
+    auto-annotator export --output_dir ./output_files --to ./output --format jsonl
+"""
+
+import argparse
+import os
+from typing import List, Optional
+
+from .utils.category_stats import CategoryStats
+from .utils.manifest import AnnotationManifest, classify_result
+from .utils.output_store import EXPORT_FORMATS, export_results, open_output_store
+
+
+def export_output_dir(output_dir: str, target_dir: str, output_format: str) -> int:
+    """
+    Export every asset of output_dir to target_dir in output_format and index
+    it there (status index and category statistics); returns the count.
+    """
+    if os.path.abspath(output_dir) == os.path.abspath(target_dir):
+        raise ValueError("Export target must differ from the source directory")
+    source = open_output_store(output_dir)
+    target = open_output_store(target_dir, output_format)
+    statuses = {}
+    stats = CategoryStats(target_dir) if output_format != "parquet" else None
+
+    def index_batch(batch):
+        statuses.update((asset_name, classify_result(result)) for asset_name, result in batch)
+        if stats is not None:
+            stats.record_results(batch)
+
+    exported = export_results(source, target, on_written=index_batch)
+    source.close()
+    if stats is not None:
+        manifest = AnnotationManifest(target_dir)
+        manifest.record_statuses(statuses)
+        manifest.sync_from_results([])  # mark the index synced: it covers every exported asset
+        manifest.close()
+        stats.sync_from_results([])  # likewise the statistics
+        stats.close()
+    return exported
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="auto-annotator export", description="Convert an output directory between storage formats")
+    parser.add_argument("--output_dir", required=True, help="Output directory (one prompt type) to read")
+    parser.add_argument("--to", required=True, help="Directory to write the exported annotations to")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="files", help="Target format (default: files)")
+    args = parser.parse_args(argv)
+
+    exported = export_output_dir(args.output_dir, args.to, args.format)
+    print(f"Exported {exported} annotations from {args.output_dir} to {args.to} ({args.format}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,117 @@
 import argparse  # 导入 argparse 模块，用于解析命令行参数
 import os  # 导入 os 模块，用于处理文件系统路径和操作系统功能
-import json  # 导入 json 模块，用于处理 JSON 数据的序列化和反序列化
+import sys
+import threading
 from tqdm import tqdm  # 从 tqdm 库导入 tqdm，用于显示进度条
 from .config import load_config  # 从当前包的 config 模块导入 load_config 函数，用于加载配置
-from .core.model import ModelEngine  # 从当前包的 core.model 模块导入 ModelEngine 类，用于模型推理
+from .core.engine import create_engine  # 导入推理后端工厂函数
+from .core.launcher import launch_workers  # 导入多进程启动器，每个设备一个模型副本
 from .core.pipeline import AnnotationPipeline  # 从当前包的 core.pipeline 模块导入 AnnotationPipeline 类，用于执行标注流程
-from .utils.file import list_assets  # 从当前包的 utils.file 模块导入 list_assets 函数，用于列出资产目录
+from .core.scheduler import MicroBatcher  # 导入 MicroBatcher，用于按图片数量和提示长度动态分批
+from .core.runner import StagedRunner  # 导入 StagedRunner，用于让 CPU 预处理/后处理与 GPU 生成重叠执行
+from .utils.file import asset_chunk, list_assets, scan_assets, stream_assets  # 从当前包的 utils.file 模块导入 list_assets 函数，用于列出资产目录
+from .utils.listing import LISTING_FILENAME  # 输入目录清单缓存文件名
+from .utils.dedup import fan_out_result, find_duplicate_assets  # 导入基于感知哈希的近重复资产聚类
+from .utils.generation_log import GenerationLog  # 导入原始生成文本日志
+from .utils.result_cache import open_result_cache  # 导入推理结果缓存
+from .utils.category_stats import CategoryStats  # 导入按类别增量统计（fill_defaults 的默认值来源）
+from .utils.manifest import AnnotationManifest, STATUS_FAILED, STATUS_INCOMPLETE  # 导入标注状态索引
+from .utils.output_store import OUTPUT_FORMATS, open_output_store  # 导入标注结果存储（逐资产 JSON 文件或分片 JSONL）
+from .utils.result_writer import ResultWriter  # 导入后台批量结果写入线程
+from .utils.work_queue import LeaseQueue  # 导入共享文件系统上的工作队列，用于多机动态分配任务
+
+STREAM_BLOCK = 256  # 流式扫描时每次查询状态索引的资产数
+
+def load_asset_names(cfg, rescan: bool = False) -> list:  # 读取资产列表文件或扫描输入目录
+    asset_names = None
+    # List Assets
+    if hasattr(cfg.data, "asset_list_file") and cfg.data.asset_list_file:
+        print(f"[INFO] Loading asset list from {cfg.data.asset_list_file}")
+        with open(cfg.data.asset_list_file, 'r') as f:
+            asset_names = [line.strip() for line in f if line.strip()]
+        print(f"[INFO] Loaded {len(asset_names)} assets from list.")
+        if not cfg.data.listing_cache:
+            return asset_names
+    else:
+        print(f"Scanning for assets in {cfg.data.input_dir}...")  # 打印正在扫描资产目录的信息
+    if not cfg.data.listing_cache:
+        all_assets = list_assets(cfg.data.input_dir, cfg.data.scan_workers)  # 调用 list_assets 函数获取所有资产列表
+        print(f"Found {len(all_assets)} total assets.")  # 打印找到的资产总数
+        return all_assets
+
+    # One scandir per directory; unchanged directories are reused from the cached listing
+    cache_path = listing_cache_path(cfg, rescan)
+    thumbnails_dir_name = cfg.data.thumbnails_dir_name if cfg.data.use_thumbnails_dir else None
+    all_assets, listing = scan_assets(cfg.data.input_dir, cache_path, thumbnails_dir_name, asset_names, cfg.data.scan_workers)
+    print(f"[INFO] Listed {listing.scanned} directories, reused {listing.reused} unchanged ones from {cache_path}.")
+    if asset_names is None:
+        print(f"Found {len(all_assets)} total assets.")  # 打印找到的资产总数
+    return all_assets
+
+
+def listing_cache_path(cfg, rescan: bool = False) -> str:  # 输入目录清单缓存路径，--rescan 时先删除
+    cache_path = os.path.join(cfg.data.output_dir, LISTING_FILENAME)
+    if rescan and os.path.exists(cache_path):
+        os.remove(cache_path)
+    return cache_path
+
+
+def stream_asset_names(cfg, rescan: bool = False):  # 边扫描边产出资产名
+    print(f"Scanning for assets in {cfg.data.input_dir} ({cfg.data.scan_workers} threads); annotation starts as assets are found...")
+    thumbnails_dir_name = cfg.data.thumbnails_dir_name if cfg.data.use_thumbnails_dir else None
+    cache_path = listing_cache_path(cfg, rescan) if cfg.data.listing_cache else None
+    found = 0
+    for asset_name in stream_assets(cfg.data.input_dir, cache_path, thumbnails_dir_name, cfg.data.scan_workers, cfg.data.listing_cache):
+        found += 1
+        yield asset_name
+    print(f"[INFO] Scan finished: found {found} total assets.")
+
+
+def pending_in_any(manifests, asset_names, force=False, retry_incomplete=False) -> list:  # 任一提示词类型待标注的资产
+    if len(manifests) == 1:
+        return next(iter(manifests.values())).pending(asset_names, force, retry_incomplete)
+    pending = set()
+    for manifest in manifests.values():
+        pending.update(manifest.pending(asset_names, force, retry_incomplete))
+    return [name for name in asset_names if name in pending]
+
 
 def main():  # 定义主函数
+    if len(sys.argv) > 1 and sys.argv[1] == "reparse":  # 子命令：离线重新解析已保存的原始输出
+        from .reparse import main as reparse_main
+        return reparse_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "export":  # 子命令：在逐文件 / JSONL / Parquet 存储格式之间转换
+        from .export import main as export_main
+        return export_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "audit":  # 子命令：一次扫描输出目录，统计失败 / 不完整资产并生成重试列表
+        from .audit import main as audit_main
+        return audit_main(sys.argv[2:])
+
     parser = argparse.ArgumentParser(description="Auto Asset Annotator using Qwen3-VL")  # 创建 ArgumentParser 对象，设置描述信息
     parser.add_argument("--config", default="config/config.yaml", help="Path to configuration file")  # 添加 --config 参数，指定配置文件路径，默认为 config/config.yaml
     parser.add_argument("--input_dir", help="Override input directory")  # 添加 --input_dir 参数，用于覆盖配置文件中的输入目录
     parser.add_argument("--output_dir", help="Override output directory")  # 添加 --output_dir 参数，用于覆盖配置文件中的输出目录
     parser.add_argument("--model_path", help="Override model path")  # 添加 --model_path 参数，用于覆盖模型路径
+    parser.add_argument("--backend", help="Override inference backend (hf, mock)")
     parser.add_argument("--prompt_type", help="Override prompt type")  # 添加 --prompt_type 参数，用于覆盖提示词类型
+    parser.add_argument("--prompt_types", help="Comma-separated prompt types run together on each asset (views preprocessed once); outputs go to <output_dir>/<prompt_type>/")
     parser.add_argument("--asset_list_file", help="Override asset list file")
     parser.add_argument("--force", action="store_true", help="Force re-annotation even if file exists and is valid")
     parser.add_argument("--retry_incomplete", action="store_true", help="Re-annotate assets with empty physical property fields")
+    parser.add_argument("--rebuild_index", action="store_true", help="Re-probe existing output files into the status index (after external edits)")
+    parser.add_argument("--rescan", action="store_true", help="Ignore the cached input listing and list every directory again")
+    parser.add_argument("--scan_workers", type=int, help="Threads listing input directories concurrently")
+    parser.add_argument("--batch_size", type=int, help="Override number of assets per generate call")
+    parser.add_argument("--max_batch_tokens", type=int, help="Token budget per batch (rows x longest prompt); 0 uses fixed batch_size")
+    parser.add_argument("--output_format", choices=OUTPUT_FORMATS, help="Write one JSON file per asset (files) or append to a few JSONL shards (jsonl)")
+    parser.add_argument("--dedup", action="store_true", help="Annotate one representative per cluster of near-identical assets (perceptual hashes of the views)")
     
     # Chunking args for batch jobs
     parser.add_argument("--num_chunks", type=int, help="Total number of chunks")  # 添加 --num_chunks 参数，指定总的分块数量，用于批处理任务
     parser.add_argument("--chunk_index", type=int, help="Current chunk index (0-based)")  # 添加 --chunk_index 参数，指定当前处理的分块索引（从 0 开始）
+    parser.add_argument("--work_queue", help="Shared queue directory; workers claim small asset batches dynamically instead of fixed chunks")
+    parser.add_argument("--worker_id", help="Worker name recorded in queue leases (default: hostname-pid)")
+    parser.add_argument("--num_workers", type=int, help="Engine processes in this command, one per GPU (or group of GPUs)")
 
     args = parser.parse_args()  # 解析命令行参数
 
@@ -38,99 +129,239 @@ def main():  # 定义主函数
         cfg.data.output_dir = args.output_dir  # 覆盖配置中的输出目录
     if args.model_path:  # 如果命令行参数指定了模型路径
         cfg.model.name = args.model_path  # 覆盖配置中的模型名称/路径
+    if args.backend:
+        cfg.model.backend = args.backend
     if args.prompt_type:  # 如果命令行参数指定了提示词类型
         cfg.prompts.default_type = args.prompt_type  # 覆盖配置中的默认提示词类型
+    if args.prompt_types:
+        cfg.prompts.types = [t.strip() for t in args.prompt_types.split(",") if t.strip()]
     if args.asset_list_file:
         cfg.data.asset_list_file = args.asset_list_file
+    if args.scan_workers is not None:
+        cfg.data.scan_workers = args.scan_workers
+    if args.output_format:
+        cfg.data.output_format = args.output_format
     
+    if args.batch_size is not None:
+        cfg.processing.batch_size = args.batch_size
+    if args.max_batch_tokens is not None:
+        cfg.processing.max_batch_tokens = args.max_batch_tokens
+    if args.dedup:
+        cfg.processing.dedup = True
+
     if args.num_chunks is not None:  # 如果命令行参数指定了分块数量
         cfg.processing.num_chunks = args.num_chunks  # 覆盖配置中的分块数量
     if args.chunk_index is not None:  # 如果命令行参数指定了分块索引
         cfg.processing.chunk_index = args.chunk_index  # 覆盖配置中的分块索引
+    if args.work_queue:
+        cfg.processing.queue_dir = args.work_queue
+    if args.num_workers is not None:
+        cfg.processing.num_workers = args.num_workers
+    if cfg.processing.num_workers > 1 and cfg.processing.queue_dir:
+        print("--num_workers cannot be combined with --work_queue; start one queue worker per GPU instead.")
+        return
+    if cfg.processing.dedup and cfg.processing.queue_dir:
+        print("--dedup cannot be combined with --work_queue; clusters span the tasks of several workers.")
+        return
 
-    # Initialize Engine
-    print(f"Initializing Model Engine with model: {cfg.model.name}")  # 打印正在初始化的模型名称
-    try:  # 尝试初始化模型引擎
-        engine = ModelEngine(cfg.model)  # 创建 ModelEngine 实例
-    except Exception as e:  # 捕获初始化过程中的异常
-        print(f"Failed to load model: {e}")  # 打印模型加载失败的错误信息
-        return  # 退出程序
+    os.makedirs(cfg.data.output_dir, exist_ok=True)  # 创建输出目录，如果已存在则忽略
 
-    pipeline = AnnotationPipeline(cfg, engine)  # 创建 AnnotationPipeline 实例，传入配置和引擎
+    # Multi-prompt mode: every prompt type gets its own output subdirectory and status index
+    prompt_selection = list(cfg.prompts.types) if cfg.prompts.types else cfg.prompts.default_type
+    if cfg.prompts.types:
+        output_dirs = {prompt_type: os.path.join(cfg.data.output_dir, prompt_type) for prompt_type in cfg.prompts.types}
+        print(f"[INFO] Multi-prompt mode: {', '.join(cfg.prompts.types)}")
+    else:
+        output_dirs = {cfg.prompts.default_type: cfg.data.output_dir}
+    manifests = {}  # prompt_type -> 输出目录中的状态索引，替代逐个读取 JSON 文件
+    stores = {}  # prompt_type -> 标注结果存储
+    for prompt_type, output_dir in output_dirs.items():
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = manifests[prompt_type] = AnnotationManifest(output_dir)
+        store = stores[prompt_type] = open_output_store(output_dir, cfg.data.output_format)
+        if args.rebuild_index:
+            manifest.clear()
+        if not args.force and not manifest.synced:
+            # One-time import of outputs written before the index existed
+            print(f"[INFO] Indexing existing outputs in {output_dir}...")
+            if store.format == "files":
+                added = manifest.sync_from_files()
+            else:
+                added = manifest.sync_from_results(store.iter_results())
+            print(f"[INFO] Indexed {added} existing annotations.")
 
-    # List Assets
-    if hasattr(cfg.data, "asset_list_file") and cfg.data.asset_list_file:
-        print(f"[INFO] Loading asset list from {cfg.data.asset_list_file}")
-        with open(cfg.data.asset_list_file, 'r') as f:
-            all_assets = [line.strip() for line in f if line.strip()]
-        print(f"[INFO] Loaded {len(all_assets)} assets from list.")
+    batcher = MicroBatcher(cfg, prompt_selection)  # 按 token 预算（或固定 batch_size）分批
+
+    def in_chunk(asset_name):  # 当前进程是否负责该资产（--num_chunks/--chunk_index）
+        return cfg.processing.num_chunks <= 1 or asset_chunk(asset_name, cfg.processing.num_chunks) == cfg.processing.chunk_index
+    work_queue = None
+    task_lock = threading.Lock()
+    open_tasks = {}  # task_id -> [task, assets still in flight]
+    asset_tasks = {}  # asset_name -> task_id
+    duplicates = {}  # 代表资产 -> 共享其标注结果的近重复资产
+
+    if cfg.processing.queue_dir:
+        # Dynamic mode: workers claim small tasks from a shared lease queue
+        work_queue = LeaseQueue(cfg.processing.queue_dir, args.worker_id,
+                                cfg.processing.lease_timeout, cfg.processing.heartbeat_interval)
+        if work_queue.initialize(lambda: load_asset_names(cfg, args.rescan), cfg.processing.queue_batch_size):
+            print(f"[INFO] Created work queue in {cfg.processing.queue_dir}")
+        total_pending = None
+        print(f"[INFO] Worker {work_queue.worker_id} joining work queue ({work_queue.total_assets} assets, {work_queue.progress()})")
+
+        def pending_batches():
+            # Each task is packed on its own: a batch never waits on the next claim,
+            # which would block until this worker's own in-flight tasks complete
+            for task in work_queue.tasks():
+                task_pending = pending_in_any(manifests, task.assets, args.force, args.retry_incomplete)
+                if not task_pending:
+                    work_queue.complete(task)
+                    continue
+                with task_lock:
+                    open_tasks[task.task_id] = [task, len(task_pending)]
+                    for asset_name in task_pending:
+                        asset_tasks[asset_name] = task.task_id
+                yield from batcher.batches(task_pending)
+    elif cfg.processing.num_workers <= 1 and not cfg.processing.dedup and not getattr(cfg.data, "asset_list_file", None):
+        # Streaming mode: batches start while the scan is still walking the tree
+        total_pending = None
+        if cfg.processing.num_chunks > 1:
+            print(f"Processing chunk {cfg.processing.chunk_index}/{cfg.processing.num_chunks}: assets whose name hashes to it")
+
+        def pending_batches():
+            def pending_stream():
+                block = []
+                for asset_name in stream_asset_names(cfg, args.rescan):
+                    if not in_chunk(asset_name):
+                        continue
+                    block.append(asset_name)
+                    if len(block) >= STREAM_BLOCK:
+                        yield from pending_in_any(manifests, block, args.force, args.retry_incomplete)
+                        block = []
+                yield from pending_in_any(manifests, block, args.force, args.retry_incomplete)
+            return batcher.batches(pending_stream())
     else:
-        print(f"Scanning for assets in {cfg.data.input_dir}...")  # 打印正在扫描资产目录的信息
-        all_assets = list_assets(cfg.data.input_dir)  # 调用 list_assets 函数获取所有资产列表
-        print(f"Found {len(all_assets)} total assets.")  # 打印找到的资产总数
+        all_assets = load_asset_names(cfg, args.rescan)
+
+        # Chunking logic
+        if cfg.processing.num_chunks > 1:  # 如果分块数量大于 1，则执行分块逻辑
+            assets_to_process = [name for name in all_assets if in_chunk(name)]  # 按资产名哈希分配，与扫描顺序无关
+            print(f"Processing chunk {cfg.processing.chunk_index}/{cfg.processing.num_chunks}: {len(assets_to_process)} of {len(all_assets)} assets")  # 打印当前分块的处理信息
+        else:  # 如果不分块
+            assets_to_process = all_assets  # 处理所有资产
+
+        pending_assets = pending_in_any(manifests, assets_to_process, args.force, args.retry_incomplete)  # 过滤出需要（重新）标注的资产
+        if not args.force:
+            for prompt_type, manifest in manifests.items():
+                statuses = manifest.lookup(pending_assets)
+                retry_failed = sum(1 for status in statuses.values() if status == STATUS_FAILED)
+                retry_incomplete = sum(1 for status in statuses.values() if status == STATUS_INCOMPLETE)
+                label = f" ({prompt_type})" if cfg.prompts.types else ""
+                print(f"[INFO] Retrying {retry_failed} previously failed and {retry_incomplete} incomplete assets{label}.")
+        print(f"[INFO] {len(pending_assets)} assets need annotation (batch size {cfg.processing.batch_size}).")
+        total_pending = len(pending_assets)
+        if cfg.processing.dedup and pending_assets:
+            # Annotate one representative per cluster of near-identical assets
+            duplicates = find_duplicate_assets(cfg.data.input_dir, pending_assets, cfg.data, cfg.processing.dedup_max_distance)
+            skipped = {name for members in duplicates.values() for name in members}
+            pending_assets = [name for name in pending_assets if name not in skipped]
+            print(f"[INFO] Dedup: {len(skipped)} near-duplicate assets reuse the annotations of {len(duplicates)} representatives.")
 
-    # Chunking logic
-    total_assets = len(all_assets)  # 获取资产总数
-    if cfg.processing.num_chunks > 1:  # 如果分块数量大于 1，则执行分块逻辑
-        chunk_size = (total_assets + cfg.processing.num_chunks - 1) // cfg.processing.num_chunks  # 计算每个分块的大小（向上取整）
-        start_idx = cfg.processing.chunk_index * chunk_size  # 计算当前分块的起始索引
-        end_idx = min((cfg.processing.chunk_index + 1) * chunk_size, total_assets)  # 计算当前分块的结束索引（防止越界）
-        assets_to_process = all_assets[start_idx:end_idx]  # 获取当前分块需要处理的资产列表
-        print(f"Processing chunk {cfg.processing.chunk_index}/{cfg.processing.num_chunks}: {len(assets_to_process)} assets ({start_idx} to {end_idx})")  # 打印当前分块的处理信息
-    else:  # 如果不分块
-        assets_to_process = all_assets  # 处理所有资产
+        def pending_batches():
+            return batcher.batches(pending_assets)
 
+    generation_log = None
+    result_cache = None
+    if cfg.processing.num_workers <= 1:
+        # Initialize Engine
+        print(f"Initializing Model Engine ({cfg.model.backend}) with model: {cfg.model.name}")  # 打印正在初始化的模型名称
+        try:  # 尝试初始化模型引擎
+            engine = create_engine(cfg.model)  # 按 model.backend 创建推理后端（hf / mock）
+        except Exception as e:  # 捕获初始化过程中的异常
+            print(f"Failed to load model: {e}")  # 打印模型加载失败的错误信息
+            for manifest in manifests.values():
+                manifest.close()
+            for store in stores.values():
+                store.close()
+            return  # 退出程序
+        if cfg.data.generation_log:
+            generation_log = GenerationLog(cfg.data.output_dir, cfg.model)  # 原始生成文本写入 output_dir/.generations
+        result_cache = open_result_cache(cfg.processing)  # 未配置 result_cache_dir 时为 None
+        pipeline = AnnotationPipeline(cfg, engine, generation_log, result_cache)  # 创建 AnnotationPipeline 实例，传入配置和引擎
+
+    unprocessed = []  # --num_workers 模式下所有 worker 停止后仍未处理的资产
     # Process Loop
-    os.makedirs(cfg.data.output_dir, exist_ok=True)  # 创建输出目录，如果已存在则忽略
-    
-    for asset_name in tqdm(assets_to_process, desc="Annotating"):  # 使用 tqdm 遍历需要处理的资产，显示进度条
-        asset_path = os.path.join(cfg.data.input_dir, asset_name)  # 构造资产的完整路径
-        output_file = os.path.join(cfg.data.output_dir, f"{asset_name}_annotation.json")  # 构造输出文件的路径
-        
-        # Ensure subdirectories exist for output_file
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        
-        # Check if exists
-        should_process = True
-        if os.path.exists(output_file) and not args.force:
-            try:
-                with open(output_file, 'r', encoding='utf-8') as f:
-                    content = json.load(f)
-                    # Check if it's a "failed" file (has raw_output)
-                    if isinstance(content, dict) and len(content) == 1 and isinstance(list(content.values())[0], dict) and "raw_output" in list(content.values())[0]:
-                        should_process = True
-                        print(f"[INFO] Retrying previously failed asset: {asset_name}")
-                    elif args.retry_incomplete:
-                        val = list(content.values())[0]
-                        if isinstance(val, dict):
-                            for field in ["material", "dimensions", "mass", "placement"]:
-                                fv = val.get(field)
-                                if fv is None or (isinstance(fv, str) and fv.strip() == "") or (isinstance(fv, list) and len(fv) == 0):
-                                    should_process = True
-                                    print(f"[INFO] Retrying asset with empty fields: {asset_name}")
-                                    break
-                            else:
-                                should_process = False
-                        else:
-                            should_process = False
-                    else:
-                        should_process = False
-            except Exception:
-                # If file is corrupted or empty, reprocess
-                should_process = True
-        
-        if not should_process:
-             continue
-
-        result = pipeline.process_asset(asset_path, cfg.prompts.default_type)  # 调用 pipeline 处理资产，获取结果
-        
-        if result:  # 如果处理成功并返回结果
-            # Save result
-            final_output = {asset_name: result} # Wrap like original script? Or just result? Original: attributes_results[object_id] = attributes[0]  # 将结果包装在字典中，以资产名称为键
-            
-            with open(output_file, 'w', encoding='utf-8') as f:  # 以写模式打开输出文件，指定编码为 utf-8
-                json.dump(final_output, f, indent=4)  # 将结果写入 JSON 文件，缩进为 4 个空格
+    with tqdm(total=total_pending, desc="Annotating") as progress:  # 使用 tqdm 显示进度条
+        # 后台线程批量写入结果和状态索引，推理与后处理线程不等待文件系统
+        category_stats = {prompt_type: CategoryStats(output_dir) for prompt_type, output_dir in output_dirs.items()}  # 随写入增量更新的类别统计
+        writer = ResultWriter(stores, manifests, cfg.processing.write_batch_size, cfg.processing.write_flush_interval,
+                              stats=category_stats)
+
+        def result_entries(asset_name, result):
+            # Multi-prompt results are {prompt_type: result}
+            per_prompt = (result or {}).items() if cfg.prompts.types else [(cfg.prompts.default_type, result)]
+            return [(prompt_type, asset_name, prompt_result) for prompt_type, prompt_result in per_prompt if prompt_result]  # 只写入处理成功并返回的结果
+
+        def on_written(asset_name, count):  # 结果落盘后调用（写入线程）
+            progress.update(count)
+            if work_queue is not None:
+                # A task is done once every one of its pending assets has been written
+                with task_lock:
+                    entry = open_tasks[asset_tasks.pop(asset_name)]
+                    entry[1] -= 1
+                    finished = entry[0] if entry[1] == 0 else None
+                    if finished is not None:
+                        del open_tasks[finished.task_id]
+                if finished is not None:
+                    work_queue.complete(finished)
+
+        def on_result(asset_name, result):
+            entries = result_entries(asset_name, result)
+            members = duplicates.get(asset_name, ())
+            for duplicate in members:  # 近重复资产复用代表资产的结果，类别取自各自目录
+                entries += result_entries(duplicate, fan_out_result(result, duplicate, bool(cfg.prompts.types)) if result else None)
+            writer.submit(entries, lambda: on_written(asset_name, 1 + len(members)))
+
+        try:
+            if cfg.processing.num_workers > 1:
+                # Worker processes generate; this process is the only writer of outputs and the index
+                worker_stats, unprocessed = launch_workers(cfg, pending_assets, on_result, cfg.processing.num_workers, prompt_selection)
+            else:
+                runner = StagedRunner(pipeline, cfg.processing)  # 预取 -> 生成 -> 后处理/写入 三阶段流水线
+                runner.run(pending_batches(), prompt_selection, on_result)
+        finally:
+            writer.close()  # 写完已提交的结果（包括中断时）
+            for category_stat in category_stats.values():
+                category_stat.close()
 
+    if cfg.processing.num_workers > 1:
+        for stats in worker_stats:
+            rate = stats["assets"] / stats["seconds"] if stats["seconds"] else 0.0
+            error = f", error: {stats['error']}" if "error" in stats else ""
+            print(f"[INFO] Worker {stats['rank']} ({stats['device'] or 'cpu'}): {stats['annotated']} annotated, "
+                  f"{stats['failed']} failed, {rate:.2f} assets/s{error}")
+        total_seconds = max(stats["seconds"] for stats in worker_stats)  # worker 并行运行，按最慢的计
+        total_assets = sum(stats["assets"] for stats in worker_stats)
+        print(f"[INFO] All workers: {sum(stats['annotated'] for stats in worker_stats)} annotated, "
+              f"{sum(stats['failed'] for stats in worker_stats)} failed, "
+              f"{total_assets / total_seconds if total_seconds else 0.0:.2f} assets/s")
+    if generation_log is not None:
+        generation_log.close()
+    if result_cache is not None:
+        print(f"[INFO] Result cache: {result_cache.hits} hits, {result_cache.misses} misses.")
+        result_cache.close()
+    for store in stores.values():
+        store.close()
+    for manifest in manifests.values():
+        manifest.close()
+    if unprocessed:
+        # Every worker stopped before the end: list what is left and fail the command
+        unprocessed += [duplicate for name in unprocessed for duplicate in duplicates.get(name, ())]
+        unprocessed_file = os.path.join(cfg.data.output_dir, "unprocessed_assets.txt")
+        with open(unprocessed_file, 'w', encoding='utf-8') as f:
+            f.writelines(f"{name}\n" for name in unprocessed)
+        print(f"[ERROR] All workers stopped; {len(unprocessed)} assets were not processed (listed in {unprocessed_file}).")
+        sys.exit(1)
     print("Processing complete.")  # 打印处理完成信息
 
 if __name__ == "__main__":  # 如果是直接运行脚本
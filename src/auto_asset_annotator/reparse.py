@@ -0,0 +1,280 @@
+"""
+Offline re-parse of stored annotations.
+
+Streams every stored raw_output through the current parser (and, with
+--renormalize, re-normalizes already parsed records) across a process pool.
+With --from_log, every asset's latest raw generation from the generation log
+is re-parsed instead, successful ones included. Without --apply it only
+reports what would change.
+
+Usage:
+    auto-annotator reparse --output_dir ./output                  # dry run
+    auto-annotator reparse --output_dir ./output --apply --workers 16
+    auto-annotator reparse --output_dir ./output --from_log --apply
+"""
+
+import argparse
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from .core.parser import STRUCTURED_KEYS, normalize_dimensions, normalize_mass, parse_annotation
+from .utils.category_stats import CategoryStats
+from .utils.generation_log import latest_generations
+from .utils.manifest import ANNOTATION_SUFFIX, AnnotationManifest, classify_result
+from .utils.output_store import detect_output_format, open_output_store
+
+# Outcomes of one file
+RECOVERED = "recovered"  # raw_output that now parses
+STILL_FAILED = "still_failed"  # raw_output that still does not parse
+NORMALIZED = "normalized"  # parsed record changed by re-normalization
+REPARSED = "reparsed"  # parsed record changed by re-parsing its logged generation
+RESTORED = "restored"  # missing output file rebuilt from its logged generation
+UNCHANGED = "unchanged"
+UNREADABLE = "unreadable"  # missing, corrupted or not an annotation record
+OUTCOMES = (RECOVERED, STILL_FAILED, NORMALIZED, REPARSED, RESTORED, UNCHANGED, UNREADABLE)
+
+
+def reparse_record(asset_name: str, record: Any, renormalize: bool = False) -> Tuple[str, Any]:
+    """
+    Re-parse one stored result the way AnnotationPipeline.parse_result would.
+    Returns (outcome, new record); the record is unchanged unless the outcome
+    is RECOVERED or NORMALIZED.
+    """
+    if not isinstance(record, dict):
+        return UNCHANGED, record  # free-text prompt types
+    category = asset_name.split("/")[0]
+    if "raw_output" in record:
+        parsed = parse_annotation(record["raw_output"]) if isinstance(record["raw_output"], str) else {}
+        if not parsed:
+            return STILL_FAILED, record
+        return RECOVERED, normalize_record(parsed, category)
+    if not renormalize:
+        return UNCHANGED, record
+    updated = normalize_record(dict(record), category)
+    return (NORMALIZED, updated) if updated != record else (UNCHANGED, record)
+
+
+def reparse_generation(asset_name: str, record: Any, text: str) -> Tuple[str, Any]:
+    """
+    Re-parse a logged raw generation against the stored record (None if the
+    output file is missing). A parsed record is never replaced by a failure.
+    """
+    parsed = parse_annotation(text)
+    new_record = normalize_record(parsed, asset_name.split("/")[0]) if parsed else {"raw_output": text}
+    if record is None:
+        return RESTORED, new_record
+    if new_record == record:
+        return UNCHANGED, record
+    if "raw_output" in new_record:
+        return STILL_FAILED, record
+    if isinstance(record, dict) and "raw_output" in record:
+        return RECOVERED, new_record
+    return REPARSED, new_record
+
+
+def normalize_record(record: Dict[str, Any], category: str) -> Dict[str, Any]:
+    """Category from the asset directory, units stripped from dimensions and mass."""
+    record["category"] = category
+    if record.get("dimensions"):
+        record["dimensions"] = normalize_dimensions(record["dimensions"])
+    if record.get("mass"):
+        record["mass"] = normalize_mass(record["mass"])
+    return record
+
+
+def changed_fields(old: Any, new: Any) -> List[str]:
+    """Structured fields whose value differs between two records."""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return []
+    if "raw_output" in old:
+        return [key for key in STRUCTURED_KEYS if new.get(key) is not None]
+    return [key for key in STRUCTURED_KEYS if old.get(key) != new.get(key)]
+
+
+def write_atomic(path: str, content: Dict[str, Any]) -> None:
+    """Write JSON through a temporary file so a crash never leaves a truncated output."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(content, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def reparse_files(output_dir: str, items: List[Tuple[str, Optional[str]]], renormalize: bool = False,
+                  apply: bool = False) -> List[Tuple[str, str, List[str], Optional[str]]]:
+    """
+    Worker task: re-parse a chunk of (annotation file, logged text or None)
+    items. Returns (asset_name, outcome, changed fields, new index status) per file.
+    """
+    outcomes = []
+    for rel_path, text in items:
+        asset_name = rel_path[:-len(ANNOTATION_SUFFIX)].replace(os.sep, "/")
+        path = os.path.join(output_dir, rel_path)
+        key, record = asset_name, None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            if isinstance(content, dict) and len(content) == 1:
+                key, record = next(iter(content.items()))
+        except (OSError, ValueError):
+            pass  # missing or corrupted: only a logged generation can rebuild it
+        if text is not None:
+            outcome, new_record = reparse_generation(asset_name, record, text)
+        elif record is None:
+            outcomes.append((asset_name, UNREADABLE, [], None))
+            continue
+        else:
+            outcome, new_record = reparse_record(asset_name, record, renormalize)
+        if outcome in (RECOVERED, NORMALIZED, REPARSED, RESTORED):
+            fields = changed_fields(record if record is not None else {"raw_output": None}, new_record)
+            status = classify_result(new_record)
+            if apply:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                write_atomic(path, {key: new_record})
+        else:
+            fields, status = [], None
+        outcomes.append((asset_name, outcome, fields, status))
+    return outcomes
+
+
+def reparse_store(output_dir: str, texts: Dict[str, str], renormalize: bool = False, apply: bool = False,
+                  show_progress: bool = True) -> Tuple[Counter, Counter, Dict[str, str], int]:
+    """
+    reparse_files for a sharded output directory (data.output_format: jsonl):
+    one sequential read of the shards, re-parsed in this process; changed
+    records are appended as newer records. texts maps asset names to logged
+    generations. Returns (outcomes, changed fields, new statuses, records).
+    """
+    store = open_output_store(output_dir)
+    records = store.load_all()
+    asset_names = list(records) + sorted(set(texts) - set(records))
+    outcomes, fields, statuses, changed = Counter(), Counter(), {}, []
+    for asset_name in tqdm(asset_names, desc="Re-parsing", disable=not show_progress):
+        record = records.get(asset_name)
+        if asset_name in texts:
+            outcome, new_record = reparse_generation(asset_name, record, texts[asset_name])
+        elif record is None:
+            outcome, new_record = UNREADABLE, None
+        else:
+            outcome, new_record = reparse_record(asset_name, record, renormalize)
+        outcomes[outcome] += 1
+        if outcome in (RECOVERED, NORMALIZED, REPARSED, RESTORED):
+            fields.update(changed_fields(record if record is not None else {"raw_output": None}, new_record))
+            statuses[asset_name] = classify_result(new_record)
+            changed.append((asset_name, new_record))
+    if apply:
+        store.write_many(changed)
+    store.close()
+    return outcomes, fields, statuses, len(asset_names)
+
+
+def find_annotation_files(output_dir: str) -> List[str]:
+    """Relative paths of all *_annotation.json files under output_dir."""
+    rel_paths = []
+    for root, _, files in os.walk(output_dir):
+        rel_dir = os.path.relpath(root, output_dir)
+        for name in files:
+            if name.endswith(ANNOTATION_SUFFIX):
+                rel_paths.append(name if rel_dir == "." else os.path.join(rel_dir, name))
+    return rel_paths
+
+
+def reparse_output_dir(output_dir: str, workers: int = 0, renormalize: bool = False, apply: bool = False,
+                       chunk_size: int = 256, show_progress: bool = True, log_dir: Optional[str] = None,
+                       prompt_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Re-parse every annotation file of output_dir across a process pool
+    (workers=0 uses all CPUs, 1 runs in this process). With log_dir, the
+    latest logged generation of each asset (of prompt_type) is re-parsed in
+    place of the stored record. Applied changes are recorded in the status
+    index when output_dir has one. Sharded output directories are re-parsed
+    by reparse_store. Returns counts of outcomes and changed fields.
+    """
+    logged = {}
+    if log_dir is not None:
+        logged = {asset_name: record["text"] for asset_name, record in latest_generations(log_dir, prompt_type).items()}
+    if detect_output_format(output_dir) != "files":
+        outcomes, fields, statuses, total = reparse_store(output_dir, logged, renormalize, apply, show_progress)
+        record_reparsed(output_dir, statuses if apply else {})
+        return {"files": total, "outcomes": dict(outcomes), "fields": dict(fields), "changed": len(statuses)}
+
+    texts = {os.path.join(*asset_name.split("/")) + ANNOTATION_SUFFIX: text for asset_name, text in logged.items()}
+    rel_paths = find_annotation_files(output_dir)
+    rel_paths += sorted(set(texts) - set(rel_paths))
+    items = [(rel_path, texts.get(rel_path)) for rel_path in rel_paths]
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    outcomes = Counter()
+    fields = Counter()
+    statuses = {}
+    with tqdm(total=len(rel_paths), desc="Re-parsing", disable=not show_progress) as progress:
+        if workers <= 1:
+            results = (reparse_files(output_dir, chunk, renormalize, apply) for chunk in chunks)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = executor.map(reparse_files, [output_dir] * len(chunks), chunks,
+                                   [renormalize] * len(chunks), [apply] * len(chunks))
+        try:
+            for chunk_outcomes in results:
+                for asset_name, outcome, changed, status in chunk_outcomes:
+                    outcomes[outcome] += 1
+                    fields.update(changed)
+                    if status is not None:
+                        statuses[asset_name] = status
+                progress.update(len(chunk_outcomes))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    record_reparsed(output_dir, statuses if apply else {})
+    return {"files": len(rel_paths), "outcomes": dict(outcomes), "fields": dict(fields), "changed": len(statuses)}
+
+
+def record_reparsed(output_dir: str, statuses: Dict[str, str]) -> None:
+    """Record applied changes in the status index and category statistics of output_dir, where they exist."""
+    if statuses and os.path.exists(os.path.join(output_dir, AnnotationManifest.FILENAME)):
+        manifest = AnnotationManifest(output_dir)
+        manifest.record_statuses(statuses)
+        manifest.close()
+    if statuses and os.path.exists(os.path.join(output_dir, CategoryStats.FILENAME)):
+        # Only the changed assets are re-read
+        stats = CategoryStats(output_dir)
+        stats.record_results(open_output_store(output_dir).get_many(list(statuses)).items())
+        stats.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="auto-annotator reparse", description="Re-parse stored raw outputs with the current parser")
+    parser.add_argument("--output_dir", required=True, help="Output directory (one prompt type) to re-parse")
+    parser.add_argument("--workers", type=int, default=0, help="Parser processes (0: all CPUs)")
+    parser.add_argument("--renormalize", action="store_true", help="Also re-normalize category, dimensions and mass of parsed records")
+    parser.add_argument("--apply", action="store_true", help="Rewrite changed files (default: dry run)")
+    parser.add_argument("--chunk_size", type=int, default=256, help="Files per worker task")
+    parser.add_argument("--from_log", action="store_true", help="Re-parse every asset's latest logged raw generation")
+    parser.add_argument("--log_dir", help="Directory holding the generation log (default: --output_dir; "
+                                          "in multi-prompt mode the parent of the per-prompt directories)")
+    parser.add_argument("--prompt_type", default="extract_object_attributes_prompt", help="Prompt type of the logged generations to use")
+    args = parser.parse_args(argv)
+
+    log_dir = (args.log_dir or args.output_dir) if args.from_log else None
+    summary = reparse_output_dir(args.output_dir, args.workers, args.renormalize, args.apply, args.chunk_size,
+                                 log_dir=log_dir, prompt_type=args.prompt_type)
+    outcomes = summary["outcomes"]
+    print(f"Scanned {summary['files']} annotations in {args.output_dir}")
+    for outcome in OUTCOMES:
+        print(f"  {outcome:<13} {outcomes.get(outcome, 0)}")
+    if summary["fields"]:
+        print("Changed fields: " + ", ".join(f"{key} {count}" for key, count in sorted(summary["fields"].items())))
+    if args.apply:
+        print(f"Rewrote {summary['changed']} annotations.")
+    else:
+        print(f"Dry run: {summary['changed']} annotations would change. Re-run with --apply to write them.")
+
+
+if __name__ == "__main__":
+    main()
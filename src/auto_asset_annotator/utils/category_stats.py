@@ -0,0 +1,290 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Numeric formats counted by the statistics (same as the audit's validity checks)
+DIMENSIONS_PATTERN = re.compile(r'^(\d+\.?\d*)\s*\*\s*(\d+\.?\d*)\s*\*\s*(\d+\.?\d*)$')
+MASS_PATTERN = re.compile(r'^\d+\.?\d*$')
+
+MODE_FIELDS = ["material", "placement"]  # most common value per category
+SKETCH_FIELDS = ["mass", "width", "depth", "height"]  # median per category (dimensions: one per axis)
+DEFAULT_FIELDS = ["material", "mass", "dimensions", "placement"]
+
+
+def parse_mass(value: Any) -> Optional[float]:
+    """Mass in kg if value is a positive plain number, else None."""
+    if not isinstance(value, str) or not MASS_PATTERN.match(value.strip()):
+        return None
+    mass = float(value)
+    return mass if mass > 0 else None
+
+
+def parse_dimensions(value: Any) -> Optional[Tuple[float, float, float]]:
+    """(W, D, H) in meters if value is "W * D * H" with positive numbers, else None."""
+    match = DIMENSIONS_PATTERN.match(value.strip()) if isinstance(value, str) else None
+    if match is None:
+        return None
+    sizes = tuple(float(size) for size in match.groups())
+    return sizes if all(size > 0 for size in sizes) else None
+
+
+def format_number(value: float, accuracy: float = 0.0) -> str:
+    """
+    Shortest plain decimal within accuracy (relative) of value: a sketch
+    median of 0.0991 with accuracy 0.01 prints as 0.1, like the annotations.
+    """
+    for digits in range(1, 7):
+        rounded = float(f"{value:.{digits}g}")
+        if abs(rounded - value) <= accuracy * value:
+            break
+    text = f"{rounded:.6f}".rstrip("0")
+    return text + "0" if text.endswith(".") else text
+
+
+def mode_key(value: Any) -> Optional[str]:
+    """Counter key of a material / placement: case and whitespace insensitive."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return " ".join(value.split()).casefold()
+
+
+class QuantileSketch:
+    """
+    Quantile sketch with relative error (DDSketch-style log buckets): a
+    positive value v falls into bucket ceil(log_gamma(v)) with
+    gamma = (1 + accuracy) / (1 - accuracy), and every quantile is returned
+    within accuracy of the true value. Adding and removing a value are O(1)
+    and sketches merge by adding bucket counts, so the buckets can live in a
+    database and be updated one asset at a time.
+    """
+
+    def __init__(self, accuracy: float = 0.01, counts: Optional[Dict[int, int]] = None):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts: Dict[int, int] = Counter(counts or {})
+
+    def bucket(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def value(self, bucket: int) -> float:
+        """Representative value of a bucket (relative error <= accuracy for all its values)."""
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        self.counts[self.bucket(value)] += count
+
+    def remove(self, value: float, count: int = 1) -> None:
+        self.add(value, -count)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.counts.update(other.counts)
+
+    @property
+    def count(self) -> int:
+        return sum(n for n in self.counts.values() if n > 0)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (lower median for q=0.5), or None when empty."""
+        buckets = sorted((bucket, n) for bucket, n in self.counts.items() if n > 0)
+        total = sum(n for _, n in buckets)
+        if total == 0:
+            return None
+        rank = int(q * (total - 1))
+        seen = 0
+        for bucket, n in buckets:
+            seen += n
+            if seen > rank:
+                return self.value(bucket)
+        return self.value(buckets[-1][0])
+
+
+class CategoryStats:
+    """
+    Per-category statistics of the parsed annotations of an output directory,
+    stored as SQLite next to the status index: material / placement counters
+    (mode) and quantile sketch buckets of mass and of each dimension axis
+    (median). The source of scripts/fill_defaults.py's category defaults.
+
+    record_results() is called with every written batch (ResultWriter,
+    reparse, export). Each asset's contribution is kept, so a re-annotated
+    asset replaces its old values instead of being counted twice, and an
+    update costs O(assets in the batch) however large the directory is.
+    Reading the defaults of a category only touches its counters and
+    buckets. Outputs written before the statistics existed are imported
+    once with sync_from_results().
+    """
+
+    FILENAME = ".category_stats.sqlite"
+    LOOKUP_CHUNK = 500  # stay below SQLite's bound-parameter limit
+
+    def __init__(self, output_dir: str, accuracy: float = 0.01):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, self.FILENAME)
+        self.sketch = QuantileSketch(accuracy)  # bucket mapping shared by every field
+        os.makedirs(output_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS contributions ("
+            "asset TEXT PRIMARY KEY, category TEXT NOT NULL, material TEXT, placement TEXT,"
+            "mass INTEGER, width INTEGER, depth INTEGER, height INTEGER);"
+            "CREATE TABLE IF NOT EXISTS modes ("
+            "category TEXT NOT NULL, field TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, n INTEGER NOT NULL,"
+            "PRIMARY KEY (category, field, key));"
+            "CREATE TABLE IF NOT EXISTS sketches ("
+            "category TEXT NOT NULL, field TEXT NOT NULL, bucket INTEGER NOT NULL, n INTEGER NOT NULL,"
+            "PRIMARY KEY (category, field, bucket));"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def contribution(self, asset_name: str, result: Any) -> Optional[Tuple[Any, ...]]:
+        """Row of the contributions table for a result; None if it has no usable field."""
+        if not isinstance(result, dict) or "raw_output" in result:
+            return None
+        mass = parse_mass(result.get("mass"))
+        dimensions = parse_dimensions(result.get("dimensions")) or (None, None, None)
+        row = (
+            asset_name,
+            asset_name.split("/")[0] if "/" in asset_name else "unknown",
+            result["material"].strip() if mode_key(result.get("material")) else None,
+            result["placement"].strip() if mode_key(result.get("placement")) else None,
+            self.sketch.bucket(mass) if mass is not None else None,
+            *(self.sketch.bucket(size) if size is not None else None for size in dimensions),
+        )
+        return row if any(value is not None for value in row[2:]) else None
+
+    def record_results(self, results: Iterable[Tuple[str, Any]]) -> int:
+        """
+        Update the statistics with freshly written (asset, result) pairs,
+        replacing earlier contributions of the same assets. Returns the
+        number of assets now contributing.
+        """
+        rows = {asset_name: self.contribution(asset_name, result) for asset_name, result in results}
+        if not rows:
+            return 0
+        modes: Counter = Counter()
+        values: Dict[Tuple[str, str, str], str] = {}
+        sketches: Counter = Counter()
+
+        def count(row, sign):
+            category = row[1]
+            for field, value in zip(MODE_FIELDS, row[2:4]):
+                if value is not None:
+                    key = (category, field, mode_key(value))
+                    modes[key] += sign
+                    if sign > 0:
+                        values[key] = value
+            for field, bucket in zip(SKETCH_FIELDS, row[4:]):
+                if bucket is not None:
+                    sketches[(category, field, bucket)] += sign
+
+        with self._lock:
+            asset_names = list(rows)
+            for start in range(0, len(asset_names), self.LOOKUP_CHUNK):
+                chunk = asset_names[start:start + self.LOOKUP_CHUNK]
+                for old in self._conn.execute(
+                        f"SELECT * FROM contributions WHERE asset IN ({','.join('?' * len(chunk))})", chunk):
+                    count(old, -1)
+            for row in rows.values():
+                if row is not None:
+                    count(row, 1)
+            self._conn.executemany(
+                "INSERT INTO modes (category, field, key, value, n) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (category, field, key) DO UPDATE SET n = n + excluded.n, "
+                "value = CASE WHEN excluded.value = '' THEN value ELSE excluded.value END",
+                [(*key, values.get(key, ""), n) for key, n in modes.items() if n],
+            )
+            self._conn.executemany(
+                "INSERT INTO sketches (category, field, bucket, n) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (category, field, bucket) DO UPDATE SET n = n + excluded.n",
+                [(*key, n) for key, n in sketches.items() if n],
+            )
+            self._conn.executemany("DELETE FROM contributions WHERE asset = ?",
+                                   [(asset_name,) for asset_name, row in rows.items() if row is None])
+            self._conn.executemany("INSERT OR REPLACE INTO contributions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [row for row in rows.values() if row is not None])
+            self._conn.commit()
+        return sum(row is not None for row in rows.values())
+
+    def clear(self) -> None:
+        """Drop all statistics so the next sync_from_results recounts every output."""
+        with self._lock:
+            for table in ("contributions", "modes", "sketches"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute("DELETE FROM meta WHERE key = 'synced'")
+            self._conn.commit()
+
+    @property
+    def synced(self) -> bool:
+        """Whether outputs written before the statistics existed have been imported."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'synced'").fetchone()
+        return row is not None
+
+    def sync_from_results(self, results: Iterable[Tuple[str, Any]], batch_size: int = 4096) -> int:
+        """
+        Import (asset, result) pairs (OutputStore.iter_results) of assets not
+        counted yet, in batches. Returns the number of contributing assets added.
+        """
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT asset FROM contributions")}
+        added = 0
+        batch: List[Tuple[str, Any]] = []
+        for asset_name, result in results:
+            if asset_name not in known:
+                batch.append((asset_name, result))
+            if len(batch) >= batch_size:
+                added += self.record_results(batch)
+                batch = []
+        added += self.record_results(batch)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('synced', ?)", (str(time.time()),))
+            self._conn.commit()
+        return added
+
+    def categories(self) -> Dict[str, int]:
+        """{category: number of contributing assets}."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT category, COUNT(*) FROM contributions GROUP BY category").fetchall())
+
+    def defaults(self, category: Optional[str] = None, min_samples: int = 5) -> Dict[str, str]:
+        """
+        Default material / mass / dimensions / placement of category (None:
+        all categories together) from the statistics: the most common
+        material and placement and the median mass and W * D * H. Fields
+        with fewer than min_samples values are left out.
+        """
+        where, params = ("WHERE category = ?", [category]) if category is not None else ("", [])
+        with self._lock:
+            mode_rows = self._conn.execute(
+                f"SELECT field, key, MAX(value), SUM(n) FROM modes {where} GROUP BY field, key", params).fetchall()
+            sketch_rows = self._conn.execute(
+                f"SELECT field, bucket, SUM(n) FROM sketches {where} GROUP BY field, bucket", params).fetchall()
+
+        defaults = {}
+        for field in MODE_FIELDS:
+            counts = [(n, key, value) for name, key, value, n in mode_rows if name == field and n > 0]
+            if sum(n for n, _, _ in counts) >= min_samples:
+                defaults[field] = min(counts, key=lambda item: (-item[0], item[1]))[2]  # ties: first key
+        medians = {}
+        for field in SKETCH_FIELDS:
+            sketch = QuantileSketch(self.sketch.accuracy, {bucket: n for name, bucket, n in sketch_rows if name == field})
+            if sketch.count >= min_samples:
+                medians[field] = sketch.quantile(0.5)
+        accuracy = self.sketch.accuracy
+        if "mass" in medians:
+            defaults["mass"] = format_number(medians["mass"], accuracy)
+        if all(axis in medians for axis in ("width", "depth", "height")):
+            defaults["dimensions"] = " * ".join(format_number(medians[axis], accuracy) for axis in ("width", "depth", "height"))
+        return {field: defaults[field] for field in DEFAULT_FIELDS if field in defaults}
@@ -0,0 +1,137 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+from tqdm import tqdm
+
+from .file import get_asset_images
+
+HASH_SIZE = 8  # 8 x 8 gradient bits per view
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# (view names, one 64-bit difference hash per view)
+Signature = Tuple[Tuple[str, ...], Tuple[int, ...]]
+
+
+def dhash(image_path: str, hash_size: int = HASH_SIZE) -> int:
+    """
+    Difference hash of an image: downscale to (hash_size + 1) x hash_size
+    grayscale and set one bit per horizontally adjacent pair that gets brighter.
+    Robust to re-encoding and small resampling differences between renders.
+    """
+    with Image.open(image_path) as image:
+        image.draft("L", (hash_size * 8, hash_size * 8))  # JPEG: decode at reduced scale
+        pixels = image.convert("L").resize((hash_size + 1, hash_size), Image.BOX).tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col + 1] > pixels[offset + col])
+    return bits
+
+
+def asset_signature(asset_path: str, data_config: Any) -> Optional[Signature]:
+    """Hashes of every view of an asset, or None if it has no readable images."""
+    images_map = get_asset_images(asset_path, data_config)
+    if not images_map:
+        return None
+    try:
+        return tuple(images_map), tuple(dhash(path) for path in images_map.values())
+    except OSError:
+        return None
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with path halving and union by size."""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+
+def band_slices(max_distance: int) -> List[Tuple[int, int]]:
+    """
+    Split the 64 hash bits into max_distance + 1 bands: two hashes within
+    max_distance bits of each other agree exactly on at least one band.
+    """
+    bands = min(max_distance + 1, HASH_BITS)
+    bounds = [HASH_BITS * i // bands for i in range(bands + 1)]
+    return [(start, end - start) for start, end in zip(bounds, bounds[1:])]
+
+
+def cluster_signatures(signatures: List[Optional[Signature]], max_distance: int) -> List[List[int]]:
+    """
+    Group indices whose signatures have the same views and every view hash
+    within max_distance bits. Identical signatures are merged first; the rest
+    are paired through LSH buckets on the first view's bands and verified,
+    with union-find making the grouping transitive. Groups of one are omitted.
+    """
+    exact = defaultdict(list)
+    for index, signature in enumerate(signatures):
+        if signature is not None:
+            exact[signature].append(index)
+    unique = list(exact)
+    sets = UnionFind(len(unique))
+
+    if max_distance > 0:
+        buckets = defaultdict(list)
+        slices = band_slices(max_distance)
+        for u, (views, hashes) in enumerate(unique):
+            for band, (start, width) in enumerate(slices):
+                buckets[(views, band, (hashes[0] >> start) & ((1 << width) - 1))].append(u)
+        for members in buckets.values():
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    if sets.find(a) == sets.find(b):
+                        continue
+                    if all(bin(x ^ y).count("1") <= max_distance for x, y in zip(unique[a][1], unique[b][1])):
+                        sets.union(a, b)
+
+    groups = defaultdict(list)
+    for u, signature in enumerate(unique):
+        groups[sets.find(u)].extend(exact[signature])
+    return [sorted(indices) for indices in groups.values() if len(indices) > 1]
+
+
+def find_duplicate_assets(input_dir: str, asset_names: List[str], data_config: Any, max_distance: int = 3,
+                          workers: int = 0, show_progress: bool = True) -> Dict[str, List[str]]:
+    """
+    Cluster near-identical assets by the perceptual hashes of their views.
+    Returns {representative: [duplicates]}, the representative being the
+    first asset of each cluster in asset_names order; unique assets are omitted.
+    """
+    paths = [os.path.join(input_dir, name) for name in asset_names]
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        signatures = list(tqdm(executor.map(asset_signature, paths, [data_config] * len(paths)),
+                               total=len(paths), desc="Hashing views", disable=not show_progress))
+    clusters = cluster_signatures(signatures, max_distance)
+    return {asset_names[indices[0]]: [asset_names[i] for i in indices[1:]] for indices in clusters}
+
+
+def fan_out_result(result: Any, asset_name: str, multi_prompt: bool = False) -> Any:
+    """
+    Copy a representative's result for a duplicate asset, taking the category
+    from the duplicate's own directory as AnnotationPipeline.parse_result does.
+    """
+    if multi_prompt and isinstance(result, dict):
+        return {prompt_type: fan_out_result(value, asset_name) for prompt_type, value in result.items()}
+    if isinstance(result, dict) and "category" in result:
+        return dict(result, category=asset_name.split("/")[0])
+    return result
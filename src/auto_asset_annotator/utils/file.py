@@ -1,8 +1,11 @@
 import os  # 导入 os 模块，用于处理文件系统路径
 import glob  # 导入 glob 模块，用于文件模式匹配
-from typing import Dict, List, Optional  # 导入类型提示
+import fnmatch  # 导入 fnmatch 模块，用于在内存中的文件列表上匹配模式
+import zlib  # 导入 zlib 模块，用 crc32 做稳定的分块哈希
+from typing import Dict, Iterator, List, Optional, Tuple  # 导入类型提示
 from natsort import natsorted  # 导入 natsort 库，用于自然排序
 from ..config.settings import DataConfig  # 导入 DataConfig 类
+from .listing import AssetListing, IMAGE_EXTENSIONS, get_asset_listing, set_asset_listing  # 导入输入目录的内存清单（scandir + 持久化缓存）
 
 def find_file_by_patterns(directory: str, patterns: List[str]) -> Optional[str]:  # 定义根据模式查找文件的函数
     """
@@ -21,30 +24,54 @@ def find_file_by_patterns(directory: str, patterns: List[str]) -> Optional[str]:
             
     return None  # 如果都未找到，返回 None
 
+def match_listed_file(directory: str, files: List[str], patterns: List[str]) -> Optional[str]:  # 在已列出的文件名中查找，不访问文件系统
+    """
+    find_file_by_patterns over a known directory listing: exact names first,
+    then glob patterns (hidden files only match patterns starting with '.').
+    """
+    for pattern in patterns:  # 遍历所有模式
+        if os.sep in pattern or "/" in pattern:  # 模式包含子目录时回退到文件系统查找
+            found = find_file_by_patterns(directory, [pattern])
+            if found:
+                return found
+            continue
+        if pattern in files:  # 文件名完全匹配
+            return os.path.join(directory, pattern)
+        matches = [f for f in fnmatch.filter(files, pattern) if pattern.startswith(".") or not f.startswith(".")]  # 与 glob 一致：默认不匹配隐藏文件
+        if matches:  # 如果有匹配结果
+            return os.path.join(directory, matches[0])  # 返回第一个匹配结果
+    return None  # 如果都未找到，返回 None
+
 def get_asset_images(asset_path: str, config: DataConfig) -> Dict[str, str]:  # 定义获取资产图片的函数
     """
     Discover image paths for a given asset directory based on configuration.
     Returns a dictionary mapping view names (e.g. 'front') to absolute file paths.
     """
     images = {}  # 初始化图片字典
+    listing = get_asset_listing()  # 启动时扫描得到的目录清单，None 表示直接访问文件系统
     
     # Determine the search directory
     search_dir = asset_path  # 默认搜索目录为资产路径
     if config.use_thumbnails_dir:  # 如果配置了使用缩略图目录
         search_dir = os.path.join(asset_path, config.thumbnails_dir_name)  # 构造缩略图目录路径
-        if not os.path.exists(search_dir):  # 如果缩略图目录不存在
+        listed = listing.is_dir(search_dir) if listing is not None else None  # 清单中已知时无需访问文件系统
+        if not (listed if listed is not None else os.path.exists(search_dir)):  # 如果缩略图目录不存在
             # Fallback or strict? Let's try to look in root if thumbnails missing? 
             # Original code skips if thumbnails dir missing.
             # But let's check root just in case user config is mixed.
             if not os.path.exists(search_dir):  # 再次检查（逻辑有点冗余，保持原意）
                 search_dir = asset_path  # 回退到资产根目录
     
-    if not os.path.exists(search_dir):  # 如果搜索目录不存在
+    files = listing.files(search_dir) if listing is not None else None  # 清单中记录的文件名
+    if files is None and not os.path.exists(search_dir):  # 如果搜索目录不存在
         return {}  # 返回空字典
 
     # 1. Try to find specific named views from config
     for view_name, patterns in config.views.items():  # 遍历配置中的视图映射
-        found_path = find_file_by_patterns(search_dir, patterns)  # 查找匹配的文件
+        if files is not None:
+            found_path = match_listed_file(search_dir, files, patterns)  # 在内存中的文件列表上匹配
+        else:
+            found_path = find_file_by_patterns(search_dir, patterns)  # 查找匹配的文件
         if found_path:  # 如果找到了
             images[view_name] = found_path  # 添加到图片字典
             
@@ -52,8 +79,8 @@ def get_asset_images(asset_path: str, config: DataConfig) -> Dict[str, str]:  #
     # The original script took first 24 images with interval.
     # If we found nothing specific, let's grab all png/jpgs and sort them.
     if not images:  # 如果没有找到任何特定视图
-        all_files = os.listdir(search_dir)  # 列出目录下所有文件
-        image_files = [f for f in all_files if f.lower().endswith(('.png', '.jpg', '.jpeg'))]  # 筛选图片文件
+        all_files = files if files is not None else os.listdir(search_dir)  # 列出目录下所有文件
+        image_files = [f for f in all_files if f.lower().endswith(IMAGE_EXTENSIONS)]  # 筛选图片文件
         sorted_files = natsorted(image_files)  # 对图片文件进行自然排序
         
         # If we have images, we can map them to generic names or just list them
@@ -65,13 +92,54 @@ def get_asset_images(asset_path: str, config: DataConfig) -> Dict[str, str]:  #
 
     return images  # 返回图片字典
 
-def list_assets(input_dir: str) -> List[str]:
+def scan_assets(input_dir: str, cache_path: Optional[str] = None, thumbnails_dir_name: Optional[str] = None,
+                asset_names: Optional[List[str]] = None, workers: int = 1) -> Tuple[List[str], AssetListing]:  # 单次 scandir 扫描输入目录并启用内存清单
+    """
+    Build (or refresh from cache_path) the listing of input_dir and make
+    get_asset_images resolve views from it. Returns the assets list_assets
+    would find, or asset_names unchanged when given (only their directories
+    are listed then), together with the listing.
+    """
+    listing = AssetListing(input_dir, cache_path, thumbnails_dir_name)
+    listing.load()  # 没有缓存或缓存失效时从头扫描
+    assets = listing.refresh(asset_names, workers)
+    listing.save()
+    set_asset_listing(listing)
+    return assets, listing
+
+def stream_assets(input_dir: str, cache_path: Optional[str] = None, thumbnails_dir_name: Optional[str] = None,
+                  workers: int = 1, use_listing: bool = True) -> Iterator[str]:  # 边扫描边产出资产，推理无需等待扫描结束
+    """
+    Like scan_assets, but yield each asset as soon as its directory is listed
+    (discovery order, not sorted). With use_listing, get_asset_images resolves
+    views from the directories listed so far; the listing is saved to
+    cache_path once the walk completes.
+    """
+    listing = AssetListing(input_dir, cache_path, thumbnails_dir_name, retain=use_listing or cache_path is not None)
+    listing.load()
+    if use_listing:
+        set_asset_listing(listing)
+    yield from listing.iter_assets(workers)
+    listing.save()
+
+def asset_chunk(asset_name: str, num_chunks: int) -> int:  # 资产所属的分块编号
+    """
+    Deterministic chunk of an asset: a stable hash of its name modulo
+    num_chunks. Unlike slicing a sorted list, every process can decide
+    membership on its own while assets are still being discovered.
+    """
+    return zlib.crc32(asset_name.encode("utf-8")) % num_chunks
+
+def list_assets(input_dir: str, workers: int = 1) -> List[str]:
     """
     Recursively list all subdirectories in input_dir that contain images and look like assets.
-    Returns relative paths from input_dir.
+    Returns relative paths from input_dir. workers > 1 lists directories on a
+    thread pool (see AssetListing), for high-latency filesystems.
     """
     if not os.path.exists(input_dir):
         return []
+    if workers > 1:
+        return AssetListing(input_dir, retain=False).refresh(workers=workers)
     
     assets = []
     input_dir = os.path.abspath(input_dir)
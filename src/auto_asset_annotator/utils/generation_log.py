@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import zlib
+from dataclasses import asdict
+from typing import Any, Dict, Iterator, Optional
+
+LOG_DIRNAME = ".generations"
+SEGMENT_SUFFIX = ".jsonl.gz"
+
+# Model settings that do not change what the model generates
+_RUNTIME_ONLY_FIELDS = ("device_map", "mock_latency", "prefix_cache_size", "pixel_cache_dir", "pixel_cache_size_gb")
+
+
+def config_hash(model_config: Any) -> str:
+    """Short hash of the model settings that affect generated text."""
+    settings = {k: v for k, v in asdict(model_config).items() if k not in _RUNTIME_ONLY_FIELDS}
+    return hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+
+
+class GenerationLog:
+    """
+    Append-only log of raw model generations, stored in output_dir/.generations.
+
+    Every writer (process) appends to its own gzip-compressed JSON-lines
+    segment, named <start time>-<host>-<pid>-<seq>.jsonl.gz so that segments
+    sort chronologically and concurrent writers (worker processes, queue
+    workers on other machines) never share a file. A segment is rotated once
+    segment_bytes of uncompressed records have been written. Records are
+    flushed every flush_every appends, so a crash loses at most that many;
+    readers skip a truncated tail.
+
+    Each record: asset, prompt_type, model, config_hash, text, prompt_tokens,
+    output_tokens, seconds (generate wall time of the batch), batch_size, time.
+    """
+
+    def __init__(self, output_dir: str, model_config: Any, segment_bytes: int = 64 << 20, flush_every: int = 64):
+        self.log_dir = os.path.join(output_dir, LOG_DIRNAME)
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.model = model_config.name
+        self.config_hash = config_hash(model_config)
+        self.segment_bytes = segment_bytes
+        self.flush_every = flush_every
+        self._prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{socket.gethostname()}-{os.getpid()}"
+        self._sequence = 0
+        self._file = None
+        self._written = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def append(self, asset: str, prompt_type: str, text: str, prompt_tokens: Optional[int] = None,
+               output_tokens: Optional[int] = None, seconds: Optional[float] = None,
+               batch_size: Optional[int] = None) -> None:
+        record = {
+            "asset": asset, "prompt_type": prompt_type, "model": self.model, "config_hash": self.config_hash,
+            "text": text, "prompt_tokens": prompt_tokens, "output_tokens": output_tokens,
+            "seconds": seconds, "batch_size": batch_size, "time": time.time(),
+        }
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._file is None or self._written >= self.segment_bytes:
+                self._open_segment()
+            self._file.write(line)
+            self._written += len(line)
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._file.flush()  # sync flush: everything so far is readable after a crash
+                self._pending = 0
+
+    def _open_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        name = f"{self._prefix}-{self._sequence:04d}{SEGMENT_SUFFIX}"
+        self._sequence += 1
+        self._file = gzip.open(os.path.join(self.log_dir, name), "ab")
+        self._written = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_generations(output_dir: str) -> Iterator[Dict[str, Any]]:
+    """Yield logged records of output_dir segment by segment, tolerating truncated segments."""
+    log_dir = os.path.join(output_dir, LOG_DIRNAME)
+    if not os.path.isdir(log_dir):
+        return
+    for name in sorted(os.listdir(log_dir)):
+        if not name.endswith(SEGMENT_SUFFIX):
+            continue
+        try:
+            with gzip.open(os.path.join(log_dir, name), "rb") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # partial last line of an interrupted writer
+        except (EOFError, OSError, zlib.error):
+            continue  # the rest of a segment cut off mid-write
+
+
+def latest_generations(output_dir: str, prompt_type: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Most recent logged record per asset, optionally for one prompt type only."""
+    latest = {}
+    for record in read_generations(output_dir):
+        if prompt_type is not None and record.get("prompt_type") != prompt_type:
+            continue
+        previous = latest.get(record["asset"])
+        if previous is None or record.get("time", 0) >= previous.get("time", 0):
+            latest[record["asset"]] = record
+    return latest
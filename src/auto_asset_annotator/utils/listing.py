@@ -0,0 +1,227 @@
+import gzip
+import json
+import os
+import queue
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from natsort import natsorted
+
+LISTING_FILENAME = ".asset_listing.json.gz"
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+LISTING_VERSION = 1
+
+# rel dir -> (mtime_ns, file names, subdirectory names)
+DirEntry = Tuple[int, List[str], List[str]]
+
+# What a listed directory is to the walk
+TREE = "tree"  # descend until a directory holding images (an asset) is found
+ASSET = "asset"  # known asset (asset list file): list it and its thumbnails folder only
+THUMBNAILS = "thumbnails"  # thumbnails folder of an asset
+
+
+def has_images(files: Iterable[str]) -> bool:
+    return any(name.lower().endswith(IMAGE_EXTENSIONS) for name in files)
+
+
+class AssetListing:
+    """
+    In-memory listing of the input tree, built with one os.scandir per
+    directory and persisted to cache_path.
+
+    Every directory is stored with its mtime, file names and subdirectory
+    names. On refresh a directory whose mtime is unchanged since the cached
+    scan is reused after a single stat instead of being listed again (adding,
+    removing or renaming an entry updates the mtime of its directory), so a
+    warm start costs one stat per directory. get_asset_images resolves view
+    patterns against these file lists instead of probing the filesystem.
+    """
+
+    def __init__(self, input_dir: str, cache_path: Optional[str] = None, thumbnails_dir_name: Optional[str] = None,
+                 retain: bool = True):
+        self.input_dir = os.path.abspath(input_dir)
+        self._prefixes = tuple({os.path.join(input_dir, ""), os.path.join(self.input_dir, "")})  # fast path of _relative
+        self.cache_path = cache_path
+        self.thumbnails_dir_name = thumbnails_dir_name
+        self.dirs: Dict[str, DirEntry] = {}
+        self.scanned = 0  # directories listed by the last refresh
+        self.reused = 0  # directories reused from the cache by the last refresh
+        self.retain = retain  # keep directory entries; False streams assets in constant memory
+        self._changed = True  # differs from cache_path
+
+    def load(self) -> bool:
+        """Load the cached listing; False if there is none for this input_dir."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with gzip.open(self.cache_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError, EOFError, zlib.error):
+            return False  # unreadable cache: scan from scratch
+        if data.get("version") != LISTING_VERSION or data.get("input_dir") != self.input_dir:
+            return False
+        self.dirs = {rel: (entry[0], entry[1], entry[2]) for rel, entry in data["dirs"].items()}
+        self._changed = False
+        return True
+
+    def save(self) -> None:
+        """Write the listing to cache_path unless it is unchanged since load."""
+        if not self.cache_path or not self._changed:
+            return
+        content = json.dumps({"version": LISTING_VERSION, "input_dir": self.input_dir, "dirs": self.dirs})
+        tmp_path = f"{self.cache_path}.tmp.{os.getpid()}"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write(content)
+        os.replace(tmp_path, self.cache_path)
+        self._changed = False
+
+    def refresh(self, rel_dirs: Optional[List[str]] = None, workers: int = 1) -> List[str]:
+        """
+        Bring the listing up to date. Without rel_dirs, walk the whole tree
+        and return the assets list_assets would find: directories holding
+        images, not descended into further. With rel_dirs (an asset list
+        file), only those directories are refreshed and returned as given.
+        workers > 1 lists directories on that many threads.
+        """
+        if rel_dirs is None:
+            return natsorted(self.iter_assets(workers))
+        cached = self.dirs
+        self.scanned = self.reused = 0
+        tasks = [(os.path.normpath(rel), ASSET) for rel in rel_dirs]
+        for _ in self._walk(tasks, cached, workers):
+            pass
+        self._changed = self._changed or self.scanned > 0
+        return list(rel_dirs)
+
+    def iter_assets(self, workers: int = 1) -> Iterator[str]:
+        """
+        Walk the whole tree, yielding assets as soon as their directory is
+        listed (in discovery order, so callers can start on them before the
+        walk ends). With workers > 1, sibling directories are listed
+        concurrently, which hides the per-call latency of network storage.
+        """
+        cached = self.dirs
+        self.dirs = {}
+        self.scanned = self.reused = 0
+        yield from self._walk([(".", TREE)], cached, workers)
+        if self.scanned or len(self.dirs) != len(cached):
+            self._changed = True  # listed again, or directories removed
+
+    def _walk(self, tasks: List[Tuple[str, str]], cached: Dict[str, DirEntry], workers: int) -> Iterator[str]:
+        """
+        List (rel dir, kind) tasks and whatever they lead to, recording every
+        directory and yielding the assets found. Entries are recorded on the
+        consuming thread only; pool threads just stat and list.
+        """
+        if workers <= 1:
+            stack = list(reversed(tasks))
+            while stack:
+                rel, kind = stack.pop()
+                entry, listed = self._list(rel, cached.get(rel))
+                asset, children = self._record(rel, kind, entry, listed)
+                if asset is not None:
+                    yield asset
+                stack.extend(reversed(children))
+            return
+
+        completed = queue.SimpleQueue()  # (rel, kind, future) in completion order
+
+        def submit(executor, rel, kind):
+            future = executor.submit(self._list, rel, cached.get(rel))
+            future.add_done_callback(lambda f: completed.put((rel, kind, f)))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as executor:
+            for rel, kind in tasks:
+                submit(executor, rel, kind)
+            outstanding = len(tasks)
+            while outstanding:
+                rel, kind, future = completed.get()
+                outstanding -= 1
+                asset, children = self._record(rel, kind, *future.result())
+                for child, child_kind in children:
+                    submit(executor, child, child_kind)
+                outstanding += len(children)
+                if asset is not None:
+                    yield asset
+
+    def _record(self, rel: str, kind: str, entry: Optional[DirEntry], listed: bool) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+        """Store one listed directory; return (asset found or None, directories to list next)."""
+        if entry is None:
+            self.dirs.pop(rel, None)
+            return None, []
+        if self.retain:
+            self.dirs[rel] = entry
+        if listed:
+            self.scanned += 1
+        else:
+            self.reused += 1
+        _, files, subdirs = entry
+        thumbnails = []
+        if self.thumbnails_dir_name and self.thumbnails_dir_name in subdirs:
+            thumbnails = [(os.path.join(rel, self.thumbnails_dir_name), THUMBNAILS)]
+        if kind == ASSET:
+            return None, thumbnails
+        if kind == TREE and rel != "." and has_images(files):
+            # Assets are leaves; a thumbnails folder is not an asset of its own
+            return rel.replace(os.sep, "/"), thumbnails
+        if kind == TREE:
+            return None, [(os.path.join(rel, name) if rel != "." else name, TREE) for name in subdirs]
+        return None, []
+
+    def _list(self, rel: str, cached_entry: Optional[DirEntry]) -> Tuple[Optional[DirEntry], bool]:
+        """(entry, whether it was listed rather than reused); entry None if the directory is gone."""
+        path = self.input_dir if rel == "." else os.path.join(self.input_dir, rel)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None, False
+        if cached_entry is not None and cached_entry[0] == mtime:
+            return cached_entry, False
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as it:
+                for item in it:
+                    if item.is_dir(follow_symlinks=False):  # like os.walk: symlinked dirs are not descended
+                        subdirs.append(item.name)
+                    elif item.is_file():
+                        files.append(item.name)
+        except OSError:
+            return None, False
+        return (mtime, sorted(files), sorted(subdirs)), True
+
+    def _relative(self, path: str) -> Optional[str]:
+        for prefix in self._prefixes:
+            if path.startswith(prefix) and f"{os.sep}." not in path and f"{os.sep}{os.sep}" not in path:
+                return path[len(prefix):].rstrip(os.sep) or "."
+        rel = os.path.relpath(os.path.abspath(path), self.input_dir)
+        return None if rel == ".." or rel.startswith(".." + os.sep) else rel
+
+    def files(self, path: str) -> Optional[List[str]]:
+        """File names in a directory, or None if the listing does not cover it."""
+        rel = self._relative(path)
+        entry = self.dirs.get(rel) if rel is not None else None
+        return entry[1] if entry is not None else None
+
+    def is_dir(self, path: str) -> Optional[bool]:
+        """Whether path is a directory, or None if the listing does not know."""
+        rel = self._relative(path)
+        if rel is None:
+            return None
+        if rel in self.dirs:
+            return True
+        parent = self.dirs.get(os.path.dirname(rel) or ".")
+        return os.path.basename(rel) in parent[2] if parent is not None else None
+
+
+_active_listing: Optional[AssetListing] = None
+
+
+def set_asset_listing(listing: Optional[AssetListing]) -> None:
+    """Make get_asset_images resolve views from listing (None: probe the filesystem)."""
+    global _active_listing
+    _active_listing = listing
+
+
+def get_asset_listing() -> Optional[AssetListing]:
+    return _active_listing
@@ -0,0 +1,191 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Annotation status values stored in the index
+STATUS_OK = "ok"  # parsed result with all physical property fields filled
+STATUS_FAILED = "failed"  # result is {"raw_output": ...} (structured parse failed)
+STATUS_INCOMPLETE = "incomplete"  # parsed result with an empty physical property field
+
+PHYSICAL_FIELDS = ["material", "dimensions", "mass", "placement"]
+
+ANNOTATION_SUFFIX = "_annotation.json"
+
+
+def is_field_empty(value: Any) -> bool:
+    """Check if a field value is empty/null/missing."""
+    if value is None:
+        return True
+    if isinstance(value, str) and value.strip() == "":
+        return True
+    if isinstance(value, list) and len(value) == 0:
+        return True
+    return False
+
+
+def classify_result(result: Any) -> str:
+    """Map a stored annotation result to its index status."""
+    if isinstance(result, dict):
+        if "raw_output" in result:
+            return STATUS_FAILED
+        if any(is_field_empty(result.get(field)) for field in PHYSICAL_FIELDS):
+            return STATUS_INCOMPLETE
+    # Free-text prompt types have no fields to check
+    return STATUS_OK
+
+
+def probe_output_file(output_file: str) -> Optional[str]:
+    """
+    Classify an existing per-asset JSON file.
+    Returns None if the file is missing, empty or corrupted (i.e. must be redone).
+    """
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            content = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(content, dict) or len(content) == 0:
+        return None
+    return classify_result(list(content.values())[0])
+
+
+class AnnotationManifest:
+    """
+    Persistent status index of annotated assets, stored as SQLite in output_dir.
+
+    Replaces opening every *_annotation.json to decide what to (re)process:
+    statuses are recorded as results are written, and resume / --force /
+    --retry_incomplete become lookups. Assets with an output file but no
+    index entry (outputs written before the index existed) are probed once
+    and recorded; after that first sync the index is authoritative. Rebuild
+    it (clear + sync) when files are edited by tools that do not record their
+    changes here (scripts/merge_annotations.py and fill_defaults.py do).
+    """
+
+    FILENAME = ".annotation_index.sqlite"
+    LOOKUP_CHUNK = 500  # stay below SQLite's bound-parameter limit
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, self.FILENAME)
+        os.makedirs(output_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Shared between the writer threads; access is serialized by _lock
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS annotations ("
+            "asset TEXT PRIMARY KEY, status TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS annotations_status ON annotations(status)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def record(self, asset_name: str, result: Any) -> str:
+        """Record the status of a freshly written result. Returns the status."""
+        status = classify_result(result)
+        self.record_statuses({asset_name: status})
+        return status
+
+    def record_statuses(self, statuses: Dict[str, str]) -> None:
+        if not statuses:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO annotations (asset, status, updated) VALUES (?, ?, ?)",
+                [(asset, status, now) for asset, status in statuses.items()],
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Drop all entries so the next sync_from_files re-probes every output file."""
+        with self._lock:
+            self._conn.execute("DELETE FROM annotations")
+            self._conn.execute("DELETE FROM meta WHERE key = 'synced'")
+            self._conn.commit()
+
+    @property
+    def synced(self) -> bool:
+        """Whether existing output files have already been imported into the index."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'synced'").fetchone()
+        return row is not None
+
+    def statuses(self, status: Optional[str] = None) -> Dict[str, str]:
+        """Return {asset: status}, optionally restricted to one status."""
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute("SELECT asset, status FROM annotations")
+            else:
+                rows = self._conn.execute("SELECT asset, status FROM annotations WHERE status = ?", (status,))
+            return dict(rows.fetchall())
+
+    def sync_from_files(self) -> int:
+        """
+        Import existing *_annotation.json files of output_dir that are missing
+        from the index (one walk of the output tree). Returns the number of
+        assets added.
+        """
+        known = self.statuses()
+        found = {}
+        for root, _, files in os.walk(self.output_dir):
+            for file in files:
+                if not file.endswith(ANNOTATION_SUFFIX):
+                    continue
+                rel_dir = os.path.relpath(root, self.output_dir)
+                asset_name = file[:-len(ANNOTATION_SUFFIX)]
+                if rel_dir != ".":
+                    asset_name = os.path.join(rel_dir, asset_name)
+                if asset_name in known:
+                    continue
+                status = probe_output_file(os.path.join(root, file))
+                if status is not None:
+                    found[asset_name] = status
+        self.record_statuses(found)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('synced', ?)", (str(time.time()),))
+            self._conn.commit()
+        return len(found)
+
+    def sync_from_results(self, results: Iterable[Tuple[str, Any]]) -> int:
+        """
+        sync_from_files for sharded output stores: import (asset, result)
+        pairs (OutputStore.iter_results) missing from the index. Returns the
+        number of assets added.
+        """
+        known = self.statuses()
+        found = {asset: classify_result(result) for asset, result in results
+                 if asset not in known and result is not None}
+        self.record_statuses(found)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('synced', ?)", (str(time.time()),))
+            self._conn.commit()
+        return len(found)
+
+    def lookup(self, asset_names: List[str]) -> Dict[str, str]:
+        """Return {asset: status} for the given assets that are in the index."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(asset_names), self.LOOKUP_CHUNK):
+                chunk = asset_names[start:start + self.LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT asset, status FROM annotations WHERE asset IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update(rows.fetchall())
+        return found
+
+    def pending(self, asset_names: Iterable[str], force: bool = False, retry_incomplete: bool = False) -> List[str]:
+        """Filter asset_names down to those needing (re)annotation, preserving order."""
+        asset_names = list(asset_names)
+        if force:
+            return asset_names
+        done = {STATUS_OK} if retry_incomplete else {STATUS_OK, STATUS_INCOMPLETE}
+        statuses = self.lookup(asset_names)
+        return [asset for asset in asset_names if statuses.get(asset) not in done]
@@ -0,0 +1,325 @@
+import json
+import os
+from abc import ABC, abstractmethod
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .manifest import ANNOTATION_SUFFIX
+
+SHARD_DIRNAME = ".shards"
+JSONL_SUFFIX = ".jsonl"
+PARQUET_SUFFIX = ".parquet"
+
+# data.output_format values; parquet is an export target only (see ParquetOutputStore)
+OUTPUT_FORMATS = ("files", "jsonl")
+EXPORT_FORMATS = ("files", "jsonl", "parquet")
+
+
+class OutputStore(ABC):
+    """
+    Where the annotation results of one output directory (one prompt type)
+    are kept. write / write_many store results, iter_results reads back the
+    latest result of every asset.
+    """
+
+    format = None
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, asset_name: str, result: Any) -> None:
+        self.write_many([(asset_name, result)])
+
+    @abstractmethod
+    def write_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        """Store (asset_name, result) pairs; a later result of an asset replaces the earlier one."""
+
+    @abstractmethod
+    def iter_results(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield (asset_name, result) once per stored asset, latest result only.
+        result is None for an entry that exists but cannot be read (a
+        corrupted per-asset file), so callers can schedule it for a retry.
+        """
+
+    def load_all(self) -> Dict[str, Any]:
+        return dict(self.iter_results())
+
+    def get_many(self, asset_names: Iterable[str]) -> Dict[str, Any]:
+        """Latest results of the given assets that are stored (None if unreadable)."""
+        wanted = set(asset_names)
+        return {asset_name: result for asset_name, result in self.iter_results() if asset_name in wanted}
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class FileOutputStore(OutputStore):
+    """
+    The original layout: output_dir/<asset_name>_annotation.json, one
+    {asset_name: result} object per asset. Files are written to a temporary
+    name and renamed into place, so a crash never leaves a truncated output.
+    """
+
+    format = "files"
+
+    def path(self, asset_name: str) -> str:
+        return os.path.join(self.output_dir, f"{asset_name}{ANNOTATION_SUFFIX}")
+
+    def write_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        for asset_name, result in items:
+            output_file = self.path(asset_name)
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            tmp_path = f"{output_file}.tmp.{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({asset_name: result}, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, output_file)
+
+    def get_many(self, asset_names: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        for asset_name in asset_names:
+            if os.path.exists(self.path(asset_name)):
+                found[asset_name] = read_annotation_file(self.path(asset_name))
+        return found
+
+    def iter_results(self) -> Iterator[Tuple[str, Any]]:
+        for root, dirs, files in os.walk(self.output_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))  # skip .shards, .generations, ...
+            rel_dir = os.path.relpath(root, self.output_dir)
+            for name in sorted(files):
+                if not name.endswith(ANNOTATION_SUFFIX):
+                    continue
+                asset_name = name[:-len(ANNOTATION_SUFFIX)]
+                if rel_dir != ".":
+                    asset_name = f"{rel_dir.replace(os.sep, '/')}/{asset_name}"
+                yield asset_name, read_annotation_file(os.path.join(root, name))
+
+
+class JsonlOutputStore(OutputStore):
+    """
+    Results appended as JSON lines to a few shard files in output_dir/.shards.
+
+    Like the generation log, every writer (process) appends to its own shard,
+    named <start time>-<host>-<pid>-<seq>.jsonl so that shards sort
+    chronologically and concurrent writers never share a file; a shard is
+    rotated after shard_bytes. Writes go through one open, buffered file
+    instead of creating a file per asset, and are flushed to the OS every
+    flush_every results (1: at the end of every write_many call, so a result
+    recorded in the status index is never lost). Re-annotating an asset
+    appends a newer record; readers keep the latest record of each asset and
+    skip a truncated last line.
+
+    Each record: {"asset": ..., "result": ..., "time": ...}.
+    """
+
+    format = "jsonl"
+
+    def __init__(self, output_dir: str, shard_bytes: int = 256 << 20, flush_every: int = 1):
+        super().__init__(output_dir)
+        self.shard_dir = os.path.join(output_dir, SHARD_DIRNAME)
+        self.shard_bytes = shard_bytes
+        self.flush_every = flush_every
+        self._prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{socket.gethostname()}-{os.getpid()}"
+        self._sequence = 0
+        self._file = None
+        self._written = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def write_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        now = time.time()
+        lines = [json.dumps({"asset": asset_name, "result": result, "time": now}, ensure_ascii=False) + "\n"
+                 for asset_name, result in items]
+        with self._lock:
+            for line in lines:
+                if self._file is None or self._written >= self.shard_bytes:
+                    self._open_shard()
+                self._file.write(line)
+                self._written += len(line)
+            self._pending += len(lines)
+            if self._pending >= self.flush_every:
+                self._file.flush()
+                self._pending = 0
+
+    def _open_shard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.shard_dir, exist_ok=True)
+        name = f"{self._prefix}-{self._sequence:04d}{JSONL_SUFFIX}"
+        self._sequence += 1
+        self._file = open(os.path.join(self.shard_dir, name), "a", encoding="utf-8", buffering=1 << 20)
+        self._written = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def read_records(self) -> Iterator[Dict[str, Any]]:
+        """Every record of every shard, shard by shard (including superseded ones)."""
+        for name in shard_names(self.shard_dir, JSONL_SUFFIX):
+            with open(os.path.join(self.shard_dir, name), "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            try:
+                # One decode of the whole shard as a JSON array is much cheaper
+                # than a json.loads call per line
+                records = json.loads("[" + ",".join(lines) + "]") if lines else []
+            except ValueError:
+                records = []
+                for line in lines:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue  # partial last line of an interrupted writer
+            for record in records:
+                if isinstance(record, dict) and "asset" in record:
+                    yield record
+
+    def iter_results(self) -> Iterator[Tuple[str, Any]]:
+        for asset_name, record in latest_records(self.read_records()).items():
+            yield asset_name, record["result"]
+
+
+class ParquetOutputStore(OutputStore):
+    """
+    Columnar export of an output directory: part files in output_dir/.shards
+    with columns asset, result (the result as JSON text) and time, for
+    analysis with pandas / pyarrow / DuckDB. Parquet files cannot be appended
+    to, so every write_many call writes one part file; use it as an export
+    target (write_many with all results at once), not as data.output_format.
+    Requires pyarrow.
+    """
+
+    format = "parquet"
+
+    def __init__(self, output_dir: str):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("The parquet output format requires pyarrow (pip install pyarrow)") from e
+        super().__init__(output_dir)
+        self.shard_dir = os.path.join(output_dir, SHARD_DIRNAME)
+        self._prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{socket.gethostname()}-{os.getpid()}"
+        self._sequence = 0
+
+    def write_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        items = list(items)
+        if not items:
+            return
+        os.makedirs(self.shard_dir, exist_ok=True)
+        table = pa.table({
+            "asset": [asset_name for asset_name, _ in items],
+            "result": [json.dumps(result, ensure_ascii=False) for _, result in items],
+            "time": [time.time()] * len(items),
+        })
+        path = os.path.join(self.shard_dir, f"{self._prefix}-{self._sequence:04d}{PARQUET_SUFFIX}")
+        self._sequence += 1
+        pq.write_table(table, f"{path}.tmp", compression="zstd")
+        os.replace(f"{path}.tmp", path)
+
+    def iter_results(self) -> Iterator[Tuple[str, Any]]:
+        import pyarrow.parquet as pq
+
+        def records():
+            for name in shard_names(self.shard_dir, PARQUET_SUFFIX):
+                table = pq.read_table(os.path.join(self.shard_dir, name), columns=["asset", "result", "time"])
+                for asset_name, result, written in zip(*(table.column(c).to_pylist() for c in ("asset", "result", "time"))):
+                    yield {"asset": asset_name, "result": result, "time": written}
+
+        for asset_name, record in latest_records(records()).items():
+            yield asset_name, json.loads(record["result"])
+
+
+STORE_CLASSES = {"files": FileOutputStore, "jsonl": JsonlOutputStore, "parquet": ParquetOutputStore}
+
+
+def read_annotation_file(path: str) -> Any:
+    """The result stored in a per-asset file, or None if it is missing, empty or corrupted."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(content, dict) or len(content) == 0:
+        return None
+    return next(iter(content.values()))
+
+
+def shard_names(shard_dir: str, suffix: str) -> List[str]:
+    if not os.path.isdir(shard_dir):
+        return []
+    return sorted(name for name in os.listdir(shard_dir) if name.endswith(suffix))
+
+
+def latest_records(records: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Most recent record per asset; on equal times the one read last wins."""
+    latest = {}
+    for record in records:
+        previous = latest.get(record["asset"])
+        if previous is None or record.get("time", 0) >= previous.get("time", 0):
+            latest[record["asset"]] = record
+    return latest
+
+
+def detect_output_format(output_dir: str) -> str:
+    """Format of an existing output directory: the shard files it holds, else per-asset files."""
+    shard_dir = os.path.join(output_dir, SHARD_DIRNAME)
+    if shard_names(shard_dir, JSONL_SUFFIX):
+        return "jsonl"
+    if shard_names(shard_dir, PARQUET_SUFFIX):
+        return "parquet"
+    return "files"
+
+
+def open_output_store(output_dir: str, output_format: Optional[str] = None, **kwargs) -> OutputStore:
+    """
+    Store for output_dir in output_format ("files", "jsonl" or "parquet");
+    None detects the format of an existing directory (scripts reading results).
+    """
+    output_format = output_format or detect_output_format(output_dir)
+    if output_format not in STORE_CLASSES:
+        raise ValueError(f"Unknown output format: {output_format}. Supported: {sorted(STORE_CLASSES)}")
+    return STORE_CLASSES[output_format](output_dir, **kwargs)
+
+
+def export_results(source: OutputStore, target: OutputStore, batch_size: int = 4096,
+                   on_written: Optional[Callable[[List[Tuple[str, Any]]], None]] = None) -> int:
+    """
+    Copy the latest result of every asset from source to target, calling
+    on_written with every batch written. Returns the number of assets.
+    """
+    exported = 0
+    batch = []
+    for asset_name, result in source.iter_results():
+        if result is None:
+            continue  # unreadable per-asset file
+        batch.append((asset_name, result))
+        if len(batch) >= batch_size and target.format != "parquet":  # parquet: all results in a single part file
+            exported += write_batch(target, batch, on_written)
+            batch = []
+    exported += write_batch(target, batch, on_written)
+    target.close()
+    return exported
+
+
+def write_batch(target: OutputStore, batch: List[Tuple[str, Any]], on_written: Optional[Callable] = None) -> int:
+    target.write_many(batch)
+    if on_written is not None:
+        on_written(batch)
+    return len(batch)
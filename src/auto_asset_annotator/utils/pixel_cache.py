@@ -0,0 +1,151 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .result_cache import file_digest
+
+ARRAY_SUFFIX = ".npy"
+
+
+class PixelCache:
+    """
+    On-disk cache of decoded and resized views, stored as .npy arrays
+    (height x width x 3, uint8) under cache_dir and loaded memory-mapped
+    (copy-on-write).
+
+    An entry is keyed on the SHA-256 of the image file plus the resize
+    settings of its chat item (min_pixels, max_pixels, resized_height,
+    resized_width), so it is shared across assets, output directories and
+    prompt types. File digests are remembered per (path, size, mtime), so a
+    hit does not read the original image at all. Arrays are evicted least
+    recently used once their total size exceeds max_bytes.
+    """
+
+    INDEX_FILENAME = "pixels.sqlite"
+    RESIZE_KEYS = ("min_pixels", "max_pixels", "resized_height", "resized_width")
+
+    def __init__(self, cache_dir: str, max_bytes: int = 64 << 30):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, self.INDEX_FILENAME), timeout=60, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, digest TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS arrays (key TEXT PRIMARY KEY, size INTEGER NOT NULL, used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS arrays_used ON arrays(used)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def fetch_many(self, items: List[Dict[str, Any]], fetch: Callable[[Dict[str, Any]], Any]) -> List[Any]:
+        """
+        Resized views for chat image items: cached arrays (memory-mapped) where
+        available, otherwise fetch(item) (a PIL image), which is then stored.
+        """
+        keys = [self.item_key(item) for item in items]
+        with self._lock:
+            rows = self._lookup(keys)
+        images, stored, used = [], {}, []
+        for item, key in zip(items, keys):
+            array = self._load(key) if key in rows else None
+            if array is not None:
+                images.append(array)
+                used.append(key)
+                continue
+            image = fetch(item)
+            images.append(image)
+            stored[key] = self._store(key, image)
+        with self._lock:
+            now = time.time()
+            self._conn.executemany("UPDATE arrays SET used = ? WHERE key = ?", [(now, key) for key in used])
+            self._conn.executemany("INSERT OR REPLACE INTO arrays (key, size, used) VALUES (?, ?, ?)",
+                                   [(key, size, now) for key, size in stored.items()])
+            if stored:
+                self._evict_over_budget()
+            self._conn.commit()
+            self.hits += len(used)
+            self.misses += len(stored)
+        return images
+
+    def item_key(self, item: Dict[str, Any]) -> str:
+        path = str(item.get("image", item.get("image_url")))
+        if path.startswith("file://"):
+            path = path[7:]
+        settings = ":".join(str(item.get(name)) for name in self.RESIZE_KEYS)
+        return hashlib.sha256(f"{self.file_digest(path)}:{settings}".encode("utf-8")).hexdigest()
+
+    def file_digest(self, path: str) -> str:
+        """Content digest of an image file, reused while its size and mtime are unchanged."""
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime, digest FROM digests WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = file_digest(path)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO digests (path, size, mtime, digest) VALUES (?, ?, ?, ?)",
+                               (path, stat.st_size, stat.st_mtime_ns, digest))
+            self._conn.commit()
+        return digest
+
+    def _lookup(self, keys: List[str]) -> set:
+        unique = list(dict.fromkeys(keys))
+        rows = self._conn.execute(f"SELECT key FROM arrays WHERE key IN ({','.join('?' * len(unique))})", unique)
+        return {row[0] for row in rows}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ARRAY_SUFFIX)
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        try:
+            return np.load(self._path(key), mmap_mode="c")  # copy-on-write: pages are shared, arrays stay writable
+        except (OSError, ValueError):
+            return None  # evicted by another process or truncated: decode again
+
+    def _store(self, key: str, image: Any) -> int:
+        array = np.asarray(image.convert("RGB") if hasattr(image, "convert") else image, dtype=np.uint8)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def _evict_over_budget(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM arrays").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM arrays ORDER BY used"):
+            if total <= self.max_bytes:
+                break
+            doomed.append(key)
+            total -= size
+        for key in doomed:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        self._conn.executemany("DELETE FROM arrays WHERE key = ?", [(key,) for key in doomed])
+
+
+def open_pixel_cache(model_config: Any) -> Optional[PixelCache]:
+    """The pixel cache configured by model.pixel_cache_dir, or None."""
+    if not model_config.pixel_cache_dir:
+        return None
+    return PixelCache(model_config.pixel_cache_dir, model_config.pixel_cache_size_gb << 30)
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache of generated texts, stored as SQLite in cache_dir.
+
+    Keys hash everything that determines a generation: the model settings,
+    the prompt text and the bytes of every image (see request_key), so the
+    cache is valid across output directories, --force reruns and assets
+    moved to another category folder. Entries are evicted least recently used
+    once their total size exceeds max_bytes. Several processes may share a
+    cache directory; SQLite serializes their writes.
+    """
+
+    FILENAME = "results.sqlite"
+    LOOKUP_CHUNK = 500  # stay below SQLite's bound-parameter limit
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1 << 30):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, self.FILENAME)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._digests = {}  # (path, size, mtime) -> image digest
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_used ON results(used)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def image_digest(self, path: str) -> str:
+        """Digest of an image file, memoized while its size and mtime are unchanged."""
+        stat = os.stat(path)
+        memo_key = (path, stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            digest = self._digests[memo_key] = file_digest(path)
+        return digest
+
+    def request_key(self, messages: List[Dict[str, Any]], settings: str) -> str:
+        """
+        Key of one chat request: settings (model name and generation
+        parameters) plus every text part and image of the messages, in order.
+        """
+        digest = hashlib.sha256(settings.encode("utf-8"))
+        for message in messages:
+            digest.update(f"\0role:{message.get('role')}".encode("utf-8"))
+            for item in message.get("content", []):
+                if item.get("type") == "text":
+                    digest.update(b"\0text:" + item["text"].encode("utf-8"))
+                else:
+                    image = item.get("image", item.get("image_url"))
+                    bounds = f"{item.get('min_pixels')}:{item.get('max_pixels')}"
+                    digest.update(f"\0image:{bounds}:".encode("utf-8") + self.image_digest(str(image)).encode("ascii"))
+        return digest.hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """Return {key: text} for cached keys, marking them as recently used."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), self.LOOKUP_CHUNK):
+                chunk = unique_keys[start:start + self.LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT key, text FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update(rows.fetchall())
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE results SET used = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+            hits = sum(key in found for key in keys)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, entries: Dict[str, str]) -> None:
+        """Store texts and evict least recently used entries beyond max_bytes."""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (key, text, size, used) VALUES (?, ?, ?, ?)",
+                [(key, text, len(key) + len(text.encode("utf-8")), now) for key, text in entries.items()],
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(total - self.max_bytes)
+            self._conn.commit()
+
+    def _evict(self, excess: int) -> None:
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY used"):
+            if freed >= excess:
+                break
+            doomed.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+
+def open_result_cache(processing_config: Any) -> Optional[ResultCache]:
+    """The result cache configured by processing.result_cache_dir, or None."""
+    if not processing_config.result_cache_dir:
+        return None
+    return ResultCache(processing_config.result_cache_dir, processing_config.result_cache_size_mb << 20)
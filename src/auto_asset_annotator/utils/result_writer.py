@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .category_stats import CategoryStats
+from .manifest import AnnotationManifest, classify_result
+from .output_store import OutputStore
+
+# (prompt type, asset name, result) persisted by ResultWriter
+Entry = Tuple[str, str, Any]
+
+_STOP = object()
+
+
+class ResultWriter:
+    """
+    Background thread persisting annotation results, so the threads that
+    produce them never wait on the filesystem.
+
+    submit() only enqueues. The writer thread collects submissions until
+    batch_size entries are pending or flush_interval seconds have passed
+    since the first of them. It then writes each prompt type's results with
+    one OutputStore.write_many, records their statuses in the status index
+    (one transaction) and their values in the category statistics, if
+    given, and finally runs the callbacks of the batch. A
+    callback (progress, work queue task completion) therefore only runs
+    once its results are on disk, and the index never lists a result that
+    was not written. The queue holds at most max_pending submissions; past
+    that, submit blocks (backpressure instead of unbounded memory).
+
+    A write error stops the writer; it is re-raised by the next submit,
+    flush or close, and the callbacks of unwritten results never run.
+    """
+
+    def __init__(self, stores: Dict[str, OutputStore], manifests: Dict[str, AnnotationManifest],
+                 batch_size: int = 256, flush_interval: float = 2.0, max_pending: int = 8192,
+                 stats: Optional[Dict[str, CategoryStats]] = None):
+        self.stores = stores
+        self.manifests = manifests
+        self.stats = stats or {}
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, entries: List[Entry], callback: Optional[Callable[[], None]] = None) -> None:
+        """Queue results for writing; callback() runs on the writer thread after they are persisted."""
+        self._put((entries, callback))
+
+    def flush(self) -> None:
+        """Block until everything submitted so far is written."""
+        done = threading.Event()
+        self._put((None, done))  # a marker: forces a write and fires after it
+        while not done.wait(0.5) and self._thread.is_alive():
+            pass
+        self._raise_error()
+
+    def close(self) -> None:
+        """Write everything still pending, stop the writer thread and flush the stores."""
+        if self._thread.is_alive():
+            self._put((_STOP, None))
+            self._thread.join()
+        for store in self.stores.values():
+            store.flush()
+        self._raise_error()
+
+    def _put(self, item: Tuple[Any, Any]) -> None:
+        while True:
+            self._raise_error()
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    self._raise_error()
+                    return
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Result writer failed: {self._error}") from self._error
+
+    def _run(self) -> None:
+        pending: List[Tuple[Any, Any]] = []
+        size = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # flush_interval expired: write what is pending
+            stop = item is not None and item[0] is _STOP
+            if item is not None and not stop:
+                pending.append(item)
+                if item[0] is not None:
+                    size += len(item[0])
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    if size < self.batch_size and time.monotonic() < deadline:
+                        continue  # keep collecting
+            if pending:
+                try:
+                    self._write(pending)
+                except BaseException as e:
+                    self._error = e
+                    print(f"[ERROR] Result writer stopped: {e}")
+                    for _, callback in pending:
+                        if isinstance(callback, threading.Event):
+                            callback.set()  # release flush() callers; they re-raise the error
+                    return
+                pending, size, deadline = [], 0, None
+            if stop:
+                return
+
+    def _write(self, pending: List[Tuple[Any, Any]]) -> None:
+        by_prompt: Dict[str, Dict[str, Any]] = {}
+        for entries, _ in pending:
+            for prompt_type, asset_name, result in entries or ():
+                by_prompt.setdefault(prompt_type, {})[asset_name] = result  # a later result of an asset wins
+        for prompt_type, results in by_prompt.items():
+            self.stores[prompt_type].write_many(results.items())
+            self.manifests[prompt_type].record_statuses(
+                {asset_name: classify_result(result) for asset_name, result in results.items()})
+            if prompt_type in self.stats:
+                self.stats[prompt_type].record_results(results.items())
+        self.written += sum(len(results) for results in by_prompt.values())
+        for _, callback in pending:
+            if isinstance(callback, threading.Event):
+                callback.set()
+            elif callback is not None:
+                callback()
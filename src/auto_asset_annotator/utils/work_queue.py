@@ -0,0 +1,227 @@
+import json
+import os
+import socket
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+@dataclass
+class Task:
+    """A small batch of assets claimed from the queue."""
+    task_id: str
+    assets: List[str]
+
+
+class LeaseQueue:
+    """
+    Work-stealing queue on a shared filesystem.
+
+    Layout of queue_dir:
+        init.lock/          held by the worker creating the tasks; heartbeated like a lease
+        tasks/<id>.json     list of asset names (written once by the first worker)
+        READY               marker written after all tasks exist
+        leases/<id>.lease   claim held by a worker; its mtime is the heartbeat
+        done/<id>           completion marker
+
+    Workers claim tasks by creating the lease file with O_EXCL. Leases whose
+    heartbeat is older than lease_timeout are reclaimed: the stale lease is
+    renamed away (only one worker can win the rename) and claimed afresh.
+    Re-running a task is harmless since outputs are per asset and resume
+    skips finished ones.
+    """
+
+    def __init__(self, queue_dir: str, worker_id: Optional[str] = None,
+                 lease_timeout: float = 600.0, heartbeat_interval: float = 60.0):
+        self.queue_dir = queue_dir
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_timeout = lease_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.tasks_dir = os.path.join(queue_dir, "tasks")
+        self.leases_dir = os.path.join(queue_dir, "leases")
+        self.done_dir = os.path.join(queue_dir, "done")
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat_thread = None
+
+    # ---- setup ----
+
+    def initialize(self, list_assets: Callable[[], List[str]], batch_size: int, poll_interval: float = 5.0) -> bool:
+        """
+        Create the task files if this worker is first; otherwise wait until the
+        queue is ready. list_assets is only called by the initializing worker.
+        Returns True if this worker created the queue.
+        """
+        os.makedirs(self.queue_dir, exist_ok=True)
+        ready_file = os.path.join(self.queue_dir, "READY")
+        lock_dir = os.path.join(self.queue_dir, "init.lock")
+        while not os.path.exists(ready_file):
+            try:
+                os.mkdir(lock_dir)  # atomic, also on NFS
+            except FileExistsError:
+                # Another worker is initializing; take over if it died part-way
+                if self._is_stale(lock_dir):
+                    try:
+                        os.rename(lock_dir, f"{lock_dir}.stale.{self.worker_id}.{time.time()}")
+                    except OSError:
+                        pass
+                    continue
+                time.sleep(poll_interval)
+                continue
+
+            # Listing a large input tree can outlast lease_timeout: heartbeat the
+            # lock like a lease so other workers do not take it over meanwhile
+            with self._held_lock:
+                self._held.add(lock_dir)
+            self._start_heartbeat()
+            try:
+                for d in (self.tasks_dir, self.leases_dir, self.done_dir):
+                    os.makedirs(d, exist_ok=True)
+                assets = list(dict.fromkeys(list_assets()))  # duplicates would be annotated twice
+                batch_size = max(1, batch_size)
+                for n, start in enumerate(range(0, len(assets), batch_size)):
+                    self._write_atomic(os.path.join(self.tasks_dir, f"{n:08d}.json"), assets[start:start + batch_size])
+                self._write_atomic(ready_file, {"total_assets": len(assets), "batch_size": batch_size,
+                                                "created_by": self.worker_id, "created_at": time.time()})
+            finally:
+                with self._held_lock:
+                    self._held.discard(lock_dir)
+            return True
+        return False
+
+    @property
+    def total_assets(self) -> int:
+        with open(os.path.join(self.queue_dir, "READY"), 'r', encoding='utf-8') as f:
+            return json.load(f)["total_assets"]
+
+    def progress(self) -> Dict[str, int]:
+        """Counts of tasks by state, for reporting."""
+        total = len(self._task_ids())
+        done = len(self._done_ids())
+        leased = len([f for f in os.listdir(self.leases_dir) if f.endswith(".lease")])
+        return {"total": total, "done": done, "leased": leased, "open": total - done - leased}
+
+    # ---- claiming ----
+
+    def claim(self) -> Optional[Task]:
+        """Claim the next unfinished task, reclaiming expired leases. None when all tasks are done or held."""
+        done = self._done_ids()
+        task_ids = self._task_ids()
+        # Start at a worker-specific offset so concurrent workers rarely race for the same lease
+        offset = zlib.crc32(self.worker_id.encode()) % len(task_ids) if task_ids else 0
+        for task_id in task_ids[offset:] + task_ids[:offset]:
+            if task_id in done:
+                continue
+            lease = self._lease_path(task_id)
+            if self._try_create_lease(lease) or (self._is_stale(lease) and self._steal(lease)):
+                if os.path.exists(os.path.join(self.done_dir, task_id)):
+                    # Finished between the listing and the claim
+                    self._release(task_id)
+                    continue
+                with open(os.path.join(self.tasks_dir, f"{task_id}.json"), 'r', encoding='utf-8') as f:
+                    return Task(task_id, json.load(f))
+        return None
+
+    def complete(self, task: Task) -> None:
+        """Mark a task done and release its lease."""
+        self._write_atomic(os.path.join(self.done_dir, task.task_id),
+                           {"worker": self.worker_id, "finished_at": time.time()})
+        self._release(task.task_id)
+
+    def tasks(self, poll_interval: float = 10.0) -> Iterator[Task]:
+        """
+        Claim tasks until every task is done. When the remaining tasks are all
+        leased by live workers, wait for them to finish or expire.
+        """
+        self._start_heartbeat()
+        try:
+            while True:
+                task = self.claim()
+                if task is not None:
+                    yield task
+                    continue
+                if self._done_ids() >= set(self._task_ids()):
+                    return
+                time.sleep(poll_interval)
+        finally:
+            self._stop.set()
+
+    # ---- internals ----
+
+    def _task_ids(self) -> List[str]:
+        return sorted(f[:-len(".json")] for f in os.listdir(self.tasks_dir) if f.endswith(".json"))
+
+    def _done_ids(self) -> set:
+        return {f for f in os.listdir(self.done_dir) if ".tmp." not in f}
+
+    def _lease_path(self, task_id: str) -> str:
+        return os.path.join(self.leases_dir, f"{task_id}.lease")
+
+    def _try_create_lease(self, lease: str) -> bool:
+        try:
+            fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"worker": self.worker_id, "claimed_at": time.time()}, f)
+        with self._held_lock:
+            self._held.add(lease)
+        return True
+
+    def _steal(self, lease: str) -> bool:
+        stale = f"{lease}.stale.{self.worker_id}.{time.time()}"
+        try:
+            os.rename(lease, stale)
+        except OSError:
+            return False  # another worker reclaimed it first
+        if not self._is_stale(stale):
+            # Lost a race: the lease was re-claimed between our check and rename; hand it back
+            try:
+                os.rename(stale, lease)
+            except OSError:
+                pass
+            return False
+        print(f"[INFO] Reclaiming expired lease {os.path.basename(lease)}")
+        return self._try_create_lease(lease)
+
+    def _release(self, task_id: str) -> None:
+        lease = self._lease_path(task_id)
+        with self._held_lock:
+            self._held.discard(lease)
+        try:
+            os.remove(lease)
+        except FileNotFoundError:
+            pass
+
+    def _is_stale(self, path: str) -> bool:
+        try:
+            return time.time() - os.stat(path).st_mtime > self.lease_timeout
+        except FileNotFoundError:
+            return False
+
+    def _start_heartbeat(self) -> None:
+        if self._heartbeat_thread is not None:
+            return
+
+        def beat():
+            while not self._stop.wait(self.heartbeat_interval):
+                with self._held_lock:
+                    held = list(self._held)
+                for lease in held:
+                    try:
+                        os.utime(lease)
+                    except FileNotFoundError:
+                        pass
+
+        self._heartbeat_thread = threading.Thread(target=beat, name="lease-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    @staticmethod
+    def _write_atomic(path: str, data) -> None:
+        tmp = f"{path}.tmp.{os.getpid()}"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from src.auto_asset_annotator.audit import AnnotationTable, audit_table, categorize_failure, write_audit
+from src.auto_asset_annotator.utils.output_store import FileOutputStore, JsonlOutputStore
+
+PARSED = {"category": "cup", "description": "A cup.", "material": "ceramic",
+          "dimensions": "0.1 * 0.1 * 0.1", "mass": "0.2", "placement": "OnTable"}
+
+RESULTS = [
+    ("cup/ok", PARSED),
+    ("cup/ok2", dict(PARSED)),
+    ("cup/no_material", dict(PARSED, material="")),
+    ("cup/bad_mass", dict(PARSED, mass="0.2 kg")),
+    ("cup/image_only", {"raw_output": "  **Image  "}),
+    ("lamp/truncated", {"raw_output": "**Category:** Lamp\n**Material:"}),
+    ("lamp/multi", {"raw_output": "**Object 1**\nA lamp\n**Object 2**\nA shade"}),
+    ("lamp/other", {"raw_output": "I cannot see the object"}),
+    ("lamp/free_text", "A brass desk lamp."),
+    ("lamp/no_dims", dict(PARSED, dimensions=None, placement=[])),
+]
+
+class TestAudit(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_categorize_failure(self):
+        self.assertEqual(categorize_failure("**Image"), "image_only")
+        self.assertEqual(categorize_failure("**Object 1** ... Category"), "truncated")
+        self.assertEqual(categorize_failure("## Object 2\nfoo"), "multi_object")
+        self.assertEqual(categorize_failure(None), "other")
+
+    def test_audit_matches_scripts(self):
+        output_dir = os.path.join(self.tmp, "out")
+        FileOutputStore(output_dir).write_many(RESULTS)
+        with open(os.path.join(output_dir, "cup", "broken_annotation.json"), "w") as f:
+            f.write('{"cup/broken": {"categ')
+        table = AnnotationTable.load(output_dir)
+        summary = audit_table(table)
+        lists = {name: sorted(assets) for name, assets in summary["lists"].items()}
+
+        self.assertEqual(summary["assets"], 11)
+        self.assertEqual(summary["corrupted"], 1)
+        self.assertEqual(lists["failed"], ["cup/broken", "cup/image_only", "lamp/multi", "lamp/other", "lamp/truncated"])
+        self.assertEqual(lists["success"], ["cup/bad_mass", "cup/no_material", "cup/ok", "cup/ok2", "lamp/free_text", "lamp/no_dims"])
+        self.assertEqual(lists["incomplete"], ["cup/broken", "cup/no_material", "lamp/no_dims"])
+        self.assertEqual(lists["incomplete_strict"], ["cup/bad_mass", "cup/broken", "cup/no_material", "lamp/no_dims"])
+        self.assertEqual(lists["failed_image_only"], ["cup/image_only"])
+        self.assertEqual(lists["failed_truncated"], ["lamp/truncated"])
+        self.assertEqual(lists["failed_multi_object"], ["lamp/multi"])
+        self.assertEqual(lists["failed_other"], ["lamp/other"])
+        self.assertEqual(summary["empty_fields"], {"material": 1, "dimensions": 1, "mass": 0, "placement": 1})
+        self.assertEqual(summary["invalid_fields"], {"dimensions": 0, "mass": 1})
+        self.assertEqual(summary["categories"]["cup"], {"total": 4, "incomplete": 1, "failed": 1})
+        self.assertEqual(summary["categories"]["lamp"], {"total": 1, "incomplete": 1, "failed": 3})
+
+        save_dir = os.path.join(self.tmp, "audit")
+        write_audit(summary, save_dir)
+        with open(os.path.join(save_dir, "incomplete_assets.txt")) as f:
+            self.assertEqual(sorted(f.read().split()), lists["incomplete"])
+        with open(os.path.join(save_dir, "audit_summary.json")) as f:
+            self.assertEqual(json.load(f)["lists"]["failed"], 5)
+
+    def test_jsonl_latest_result(self):
+        output_dir = os.path.join(self.tmp, "out")
+        store = JsonlOutputStore(output_dir)
+        store.write_many(RESULTS)
+        store.write("cup/image_only", PARSED)  # re-annotated
+        store.close()
+        summary = audit_table(AnnotationTable.load(output_dir))
+        self.assertEqual(summary["assets"], 10)
+        self.assertEqual(summary["failure_types"], {"image_only": 0, "multi_object": 1, "truncated": 1, "other": 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import importlib.util
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from src.auto_asset_annotator.utils.category_stats import CategoryStats, QuantileSketch, format_number
+from src.auto_asset_annotator.utils.manifest import AnnotationManifest, STATUS_OK
+from src.auto_asset_annotator.utils.output_store import JsonlOutputStore, open_output_store
+from src.auto_asset_annotator.utils.result_writer import ResultWriter
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "fill_defaults.py")
+spec = importlib.util.spec_from_file_location("fill_defaults", SCRIPT)
+fill_defaults = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fill_defaults)
+
+def cup(material="Ceramic", mass="0.2", dimensions="0.1 * 0.1 * 0.12", placement="OnTable"):
+    return {"category": "cup", "description": "A cup.", "material": material,
+            "dimensions": dimensions, "mass": mass, "placement": placement}
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_median_within_accuracy(self):
+        rng = random.Random(0)
+        values = [rng.lognormvariate(0, 2) for _ in range(10001)]
+        sketch = QuantileSketch(0.01)
+        for value in values:
+            sketch.add(value)
+        median = statistics.median(values)
+        self.assertLess(abs(sketch.quantile(0.5) - median) / median, 0.01)
+        for value in values[:5000]:
+            sketch.remove(value)
+        median = statistics.median(values[5000:])
+        self.assertLess(abs(sketch.quantile(0.5) - median) / median, 0.01)
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+    def test_format_number(self):
+        self.assertEqual([format_number(v) for v in (0.05, 10, 1234.5, 0.000012)], ["0.05", "10.0", "1234.5", "0.000012"])
+        self.assertEqual([format_number(v, 0.01) for v in (0.0991, 0.2004, 0.2488, 4.96)], ["0.1", "0.2", "0.25", "5.0"])
+
+class TestCategoryStats(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.stats = CategoryStats(self.output_dir)
+
+    def tearDown(self):
+        self.stats.close()
+        shutil.rmtree(self.output_dir)
+
+    def test_defaults_and_replacement(self):
+        self.stats.record_results([
+            ("cup/a", cup()), ("cup/b", cup(material="ceramic ", mass="0.3")), ("cup/c", cup(material="Glass", mass="0.25")),
+            ("cup/d", cup(mass="N/A", dimensions="")), ("cup/e", {"raw_output": "**Image"}), ("lamp/f", "free text"),
+        ])
+        self.assertEqual(self.stats.categories(), {"cup": 4})
+        defaults = self.stats.defaults("cup", min_samples=3)
+        self.assertEqual(defaults["material"].casefold(), "ceramic")
+        self.assertEqual(defaults["placement"], "OnTable")
+        self.assertEqual(defaults["mass"], "0.25")
+        self.assertEqual(defaults["dimensions"], "0.1 * 0.1 * 0.12")
+        self.assertEqual(self.stats.defaults("lamp"), {})
+
+        # Re-annotated assets replace their earlier values
+        self.stats.record_results([("cup/a", cup(material="Glass", mass="0.4")), ("cup/b", {"raw_output": "x"})])
+        defaults = self.stats.defaults("cup", min_samples=3)
+        self.assertEqual(defaults["material"], "Glass")
+        self.assertNotIn("mass", defaults)  # only cup/a and cup/c left
+        self.assertNotIn("dimensions", defaults)
+        self.assertEqual(self.stats.defaults("cup", min_samples=2)["mass"], "0.25")
+        self.assertEqual(self.stats.categories(), {"cup": 3})
+
+    def test_incremental_matches_full_count(self):
+        rng = random.Random(1)
+        results = [(f"c{i % 7}/a{i}", cup(material=rng.choice(["Wood", "Metal", "Plastic"]), mass=str(round(rng.uniform(0.1, 9), 2)),
+                                          dimensions=f"{rng.randint(1, 90) / 100} * 0.2 * 0.3"))
+                   for i in range(700)]
+        for start in range(0, 700, 64):  # written in batches, some assets re-annotated
+            self.stats.record_results(results[start:start + 64])
+            self.stats.record_results(results[max(0, start - 10):start])
+        full = CategoryStats(tempfile.mkdtemp())
+        self.assertEqual(full.sync_from_results(results), 700)
+        self.assertTrue(full.synced)
+        for category in ["c0", "c3", None]:
+            self.assertEqual(self.stats.defaults(category), full.defaults(category))
+        full.close()
+        shutil.rmtree(full.output_dir)
+
+    def test_writer_records_stats(self):
+        manifest = AnnotationManifest(self.output_dir)
+        writer = ResultWriter({"p": JsonlOutputStore(self.output_dir)}, {"p": manifest}, stats={"p": self.stats})
+        writer.submit([("p", f"cup/{i}", cup()) for i in range(5)])
+        writer.close()
+        manifest.close()
+        self.assertEqual(self.stats.defaults("cup")["mass"], "0.2")
+
+    def test_fill_defaults_reads_stats_and_updates_index(self):
+        manifest = AnnotationManifest(self.output_dir)
+        writer = ResultWriter({"p": JsonlOutputStore(self.output_dir)}, {"p": manifest}, stats={"p": self.stats})
+        writer.submit([("p", f"cup/{i}", cup(material="Glass", mass="0.3")) for i in range(3)]
+                      + [("p", "cup/gap", cup(material="", mass="N/A"))])
+        writer.close()
+        self.assertEqual(manifest.pending(["cup/0", "cup/gap"], retry_incomplete=True), ["cup/gap"])
+        asset_list = os.path.join(self.output_dir, "incomplete.txt")
+        with open(asset_list, "w") as f:
+            f.write("cup/gap\n")
+
+        argv = ["fill_defaults.py", "--output_dir", self.output_dir, "--asset_list", asset_list,
+                "--min_samples", "3", "--apply"]
+        with mock.patch.object(sys, "argv", argv), mock.patch("builtins.print"):
+            fill_defaults.main()
+
+        filled = open_output_store(self.output_dir).get_many(["cup/gap"])["cup/gap"]
+        self.assertEqual((filled["material"], filled["mass"]), ("Glass", "0.3"))
+        self.assertEqual(manifest.lookup(["cup/gap"]), {"cup/gap": STATUS_OK})
+        self.assertEqual(manifest.pending(["cup/0", "cup/gap"], retry_incomplete=True), [])
+        manifest.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+from src.auto_asset_annotator.config.settings import DataConfig
+from src.auto_asset_annotator.utils.dedup import cluster_signatures, dhash, fan_out_result, find_duplicate_assets
+
+def render(seed, size=64):
+    # Random blocky "render"; the same seed gives the same picture
+    rng = random.Random(seed)
+    image = Image.new("L", (8, 8))
+    image.putdata([rng.randrange(256) for _ in range(64)])
+    return image.resize((size, size), Image.NEAREST).convert("RGB")
+
+class TestDedup(unittest.TestCase):
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        self.config = DataConfig(input_dir=self.input_dir, output_dir="unused", views={"front": ["0.*"], "left": ["1.*"]})
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+
+    def add_asset(self, name, seeds, fmt="png"):
+        os.makedirs(os.path.join(self.input_dir, name))
+        for view, seed in enumerate(seeds):
+            render(seed).save(os.path.join(self.input_dir, name, f"{view}.{fmt}"))
+
+    def test_dhash_tolerates_reencoding(self):
+        self.add_asset("a/x-1", [1, 2])
+        self.add_asset("b/x-2", [1, 2], fmt="jpg")
+        self.add_asset("c/x-3", [3, 2])
+        hashes = {name: dhash(os.path.join(self.input_dir, name, "0." + ext))
+                  for name, ext in [("a/x-1", "png"), ("b/x-2", "jpg"), ("c/x-3", "png")]}
+        self.assertLessEqual(bin(hashes["a/x-1"] ^ hashes["b/x-2"]).count("1"), 3)
+        self.assertGreater(bin(hashes["a/x-1"] ^ hashes["c/x-3"]).count("1"), 10)
+
+    def test_find_duplicate_assets(self):
+        self.add_asset("chair/mesh-chair-1", [1, 2])
+        self.add_asset("chair/mesh-chair-2", [3, 4])
+        self.add_asset("stool/mesh-stool-3", [1, 2], fmt="jpg")  # same mesh, re-encoded
+        self.add_asset("chair/mesh-chair-4", [1, 5])  # same front, different left view
+        self.add_asset("chair/mesh-chair-5", [3, 4])
+        names = ["chair/mesh-chair-1", "chair/mesh-chair-2", "stool/mesh-stool-3", "chair/mesh-chair-4", "chair/mesh-chair-5"]
+        duplicates = find_duplicate_assets(self.input_dir, names, self.config, max_distance=3, show_progress=False)
+        self.assertEqual(duplicates, {"chair/mesh-chair-1": ["stool/mesh-stool-3"], "chair/mesh-chair-2": ["chair/mesh-chair-5"]})
+
+    def test_clusters_are_transitive(self):
+        views = ("front",)
+        signatures = [(views, (0b0000,)), (views, (0b0011,)), (views, (0b1111,)), (("left",), (0b0011,)), None]
+        self.assertEqual(cluster_signatures(signatures, 2), [[0, 1, 2]])
+        self.assertEqual(cluster_signatures(signatures, 0), [])
+
+    def test_fan_out_result(self):
+        result = {"category": "chair", "mass": "4"}
+        self.assertEqual(fan_out_result(result, "stool/mesh-3"), {"category": "stool", "mass": "4"})
+        self.assertEqual(result["category"], "chair")
+        self.assertEqual(fan_out_result({"p": result, "q": "text"}, "stool/mesh-3", multi_prompt=True),
+                         {"p": {"category": "stool", "mass": "4"}, "q": "text"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import yaml
+from PIL import Image
+from src.auto_asset_annotator import main as main_module
+from src.auto_asset_annotator.config.settings import ModelConfig
+from src.auto_asset_annotator.core.engine import create_engine
+from src.auto_asset_annotator.core.mock_engine import MockEngine
+
+def conversation(text, images):
+    return [{"role": "user", "content": [{"type": "text", "text": text}] +
+             [{"type": "image_url", "image": path} for path in images]}]
+
+class TestEngineBackends(unittest.TestCase):
+    def test_create_engine(self):
+        self.assertIsInstance(create_engine(ModelConfig(name="unused", backend="mock")), MockEngine)
+        with self.assertRaises(ValueError):
+            create_engine(ModelConfig(name="unused", backend="vllm"))
+
+    def test_mock_is_deterministic(self):
+        engine = create_engine(ModelConfig(name="unused", backend="mock"))
+        a = conversation("describe", ["/x/a/0.png", "/x/a/1.png"])
+        b = conversation("describe", ["/x/b/0.png"])
+        first = engine.inference_batch([a, b])
+        self.assertEqual(first, engine.inference_batch([a, b]))
+        self.assertEqual(first[0], engine.inference(a))
+        self.assertNotEqual(first[0], first[1])
+        canned = create_engine(ModelConfig(name="unused", backend="mock", mock_response="Chair"))
+        self.assertEqual(canned.inference(a), "Chair")
+
+class TestMockEndToEnd(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.root, "input")
+        self.output_dir = os.path.join(self.root, "output")
+        self.assets = [f"chair/scene-chair-{i}" for i in range(5)]
+        for asset in self.assets:
+            os.makedirs(os.path.join(self.input_dir, asset))
+            Image.new("RGB", (28, 28)).save(os.path.join(self.input_dir, asset, "0.png"))
+        self.config_path = os.path.join(self.root, "config.yaml")
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump({
+                "model": {"name": "unused", "backend": "mock"},
+                "data": {"input_dir": self.input_dir, "output_dir": self.output_dir, "views": {"front": ["0.png"]}},
+                "processing": {"batch_size": 2},
+            }, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_main_writes_annotations(self):
+        with mock.patch.object(sys, "argv", ["annotate", "--config", self.config_path]):
+            main_module.main()
+        for asset in self.assets:
+            with open(os.path.join(self.output_dir, f"{asset}_annotation.json"), 'r', encoding='utf-8') as f:
+                result = json.load(f)[asset]
+            self.assertEqual(result["category"], "chair")
+            self.assertTrue(all(result[field] for field in ("material", "dimensions", "mass", "placement")))
+
+    def test_dedup_rejected_with_work_queue(self):
+        argv = ["annotate", "--config", self.config_path, "--dedup", "--work_queue", os.path.join(self.root, "queue")]
+        with mock.patch.object(sys, "argv", argv), mock.patch("builtins.print") as printed:
+            main_module.main()
+        self.assertIn("--dedup cannot be combined with --work_queue", str(printed.call_args_list))
+        self.assertFalse(os.path.exists(self.output_dir))
+
+if __name__ == '__main__':
+    unittest.main()
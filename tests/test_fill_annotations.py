@@ -0,0 +1,82 @@
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from src.auto_asset_annotator.utils.output_store import FileOutputStore
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "fill_annotations.py")
+spec = importlib.util.spec_from_file_location("fill_annotations", SCRIPT)
+fill_annotations = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fill_annotations)
+
+PARSED = {"category": "chair", "description": "A chair.", "material": "wood",
+          "dimensions": "0.5 * 0.5 * 0.9", "mass": "4", "placement": "OnFloor, OnObject"}
+
+class TestFillAnnotations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.source_dir = self.tmp / "output"
+        self.target_dir = self.tmp / "GRScenes_assets"
+        FileOutputStore(str(self.source_dir)).write_many([
+            ("chair/a1", PARSED), ("chair/a2", dict(PARSED, mass="")), ("chair/a3", {"raw_output": "**Image"}),
+            ("chair/orphan", PARSED),
+        ])
+        for asset_id in ["a1", "a2", "a3"]:
+            self.write_target(asset_id, {"id": asset_id})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def target_file(self, asset_id):
+        return self.target_dir / "chair" / asset_id / f"{asset_id}_annotation.json"
+
+    def write_target(self, asset_id, data):
+        self.target_file(asset_id).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.target_file(asset_id), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def read_target(self, asset_id):
+        with open(self.target_file(asset_id), encoding="utf-8") as f:
+            return json.load(f)
+
+    def run_fill(self, **kwargs):
+        with mock.patch("builtins.print"):
+            return fill_annotations.main(source_dir=self.source_dir, target_dir=self.target_dir, workers=4, **kwargs)
+
+    def test_fill_and_rerun(self):
+        stats = self.run_fill(dry_run=True)
+        self.assertEqual((stats["success"], stats["no_target"]), (2, 1))
+        self.assertEqual(self.read_target("a1"), {"id": "a1"})  # dry run writes nothing
+
+        stats = self.run_fill(dry_run=False)
+        self.assertEqual((stats["success"], stats["skipped"], stats["no_target"]), (2, 1, 1))
+        self.assertEqual(self.read_target("a1"), dict(
+            {key: value for key, value in PARSED.items() if key != "category"}, id="a1", placement=["OnFloor", "OnObject"]))
+        self.assertNotIn("mass", self.read_target("a2"))  # empty values are not filled
+        self.assertEqual(self.read_target("a3"), {"id": "a3"})
+
+        # Re-run: unchanged targets are only stat'ed, never read
+        with mock.patch("builtins.open", wraps=open) as opened:
+            stats = self.run_fill(dry_run=False)
+        self.assertFalse([call for call in opened.call_args_list if "GRScenes_assets" in str(call.args[0])])
+        self.assertEqual((stats["success"], stats["skipped"]), (0, 3))
+
+    def test_target_replaced_after_fill(self):
+        self.run_fill(dry_run=False)
+        self.write_target("a1", {"id": "a1"})  # reset by another tool
+        stats = self.run_fill(dry_run=False)
+        self.assertEqual(stats["success"], 1)
+        self.assertEqual(self.read_target("a1")["material"], "wood")
+
+        # Changed source values reach the target as well
+        FileOutputStore(str(self.source_dir)).write_many([("chair/a2", dict(PARSED, material="metal"))])
+        stats = self.run_fill(dry_run=False)
+        self.assertEqual(stats["success"], 1)
+        self.assertEqual(self.read_target("a2")["material"], "metal")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+from src.auto_asset_annotator.config.settings import ModelConfig
+from src.auto_asset_annotator.utils.generation_log import (
+    GenerationLog, config_hash, latest_generations, read_generations,
+)
+
+class TestGenerationLog(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_append_rotate_and_read(self):
+        log = GenerationLog(self.output_dir, ModelConfig(name="m"), segment_bytes=300, flush_every=1)
+        for i in range(6):
+            log.append(f"cup/a{i % 3}", "extract_object_attributes_prompt", f"text {i}",
+                       prompt_tokens=100, output_tokens=2, seconds=0.5, batch_size=3)
+        log.append("cup/a0", "is_symmetric_object_prompt", "Yes")
+        log.close()
+        self.assertGreater(len(os.listdir(log.log_dir)), 1)  # rotated
+        records = list(read_generations(self.output_dir))
+        self.assertEqual([r["text"] for r in records[:6]], [f"text {i}" for i in range(6)])
+        self.assertEqual(records[0]["model"], "m")
+        self.assertEqual(records[0]["config_hash"], config_hash(ModelConfig(name="m")))
+        latest = latest_generations(self.output_dir, "extract_object_attributes_prompt")
+        self.assertEqual({a: r["text"] for a, r in latest.items()}, {"cup/a0": "text 3", "cup/a1": "text 4", "cup/a2": "text 5"})
+
+    def test_truncated_segment(self):
+        log = GenerationLog(self.output_dir, ModelConfig(name="m"), flush_every=1)
+        for i in range(20):
+            log.append(f"cup/a{i}", "p", "x" * 50)
+        log.close()
+        name = os.listdir(log.log_dir)[0]
+        path = os.path.join(log.log_dir, name)
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:len(data) - 20])  # writer killed before closing the stream
+        records = list(read_generations(self.output_dir))
+        self.assertGreater(len(records), 0)
+        self.assertEqual(records[0]["asset"], "cup/a0")
+
+    def test_runtime_settings_do_not_change_hash(self):
+        self.assertEqual(config_hash(ModelConfig(name="m", device_map="cpu")), config_hash(ModelConfig(name="m")))
+        self.assertNotEqual(config_hash(ModelConfig(name="m", temperature=0.1)), config_hash(ModelConfig(name="m")))
+
+if __name__ == '__main__':
+    unittest.main()
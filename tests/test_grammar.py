@@ -0,0 +1,68 @@
+
+import unittest
+import torch
+from src.auto_asset_annotator.core.grammar import START, AttributeGrammar, TokenMasks
+from src.auto_asset_annotator.core.model import GrammarConstraint
+from src.auto_asset_annotator.core.stopping import GenerationLimits
+
+VALID = (
+    "Category: chair\nDescription: A wooden chair.\nMaterial: wood frame, fabric seat\n"
+    "Dimensions: 0.5 * 0.45 * 0.9\nMass: 6.5\nPlacement: OnFloor, OnObject"
+)
+
+# Tokens: single characters plus a few multi-character pieces; the last id ends the sequence
+VOCAB = sorted(set(VALID + "\nkgm xyz")) + ["Description", ": ", " *", "On", "Floor", "kg", "\nMass"]
+EOS = len(VOCAB)
+
+class TestGrammar(unittest.TestCase):
+    def setUp(self):
+        self.grammar = AttributeGrammar()
+
+    def test_format(self):
+        state = self.grammar.advance(START, VALID)
+        self.assertTrue(self.grammar.accepting(state))
+        self.assertTrue(self.grammar.accepting(self.grammar.advance(state, "\n")))
+        self.assertFalse(self.grammar.accepting(self.grammar.advance(START, VALID[:-3])))
+        for bad in (
+            VALID.replace("0.9", "0.9 m"),  # units
+            VALID.replace("Mass: 6.5", "Mass: about 6"),
+            VALID.replace("OnFloor", "OnGround"),  # outside the placement enum
+            VALID + ", OnFloor",  # repeated placement
+            VALID.replace("Material: wood frame, fabric seat\n", ""),  # missing field
+            "**Category:** chair",  # markdown headers
+            VALID.replace("chair\n", "\n"),  # empty value
+        ):
+            self.assertIsNone(self.grammar.advance(START, bad), bad)
+
+    def test_token_masks(self):
+        masks = TokenMasks(VOCAB + [None], [EOS])
+        allowed = {VOCAB[i] for i in masks.allowed(START)}
+        self.assertEqual(allowed, {"C"})
+        state = self.grammar.advance(START, VALID.split("Dimensions")[0] + "Dimensions: 0")
+        allowed = {VOCAB[i] if i < EOS else "EOS" for i in masks.allowed(state)}
+        self.assertIn(" *", allowed)
+        self.assertIn(".", allowed)
+        self.assertNotIn("kg", allowed)
+        self.assertNotIn("\nMass", allowed)  # dimensions need three numbers
+        # The end of sequence only after a complete placement list
+        self.assertNotIn(EOS, masks.allowed(self.grammar.advance(START, VALID[:-2])))
+        self.assertIn(EOS, masks.allowed(self.grammar.advance(START, VALID)))
+
+    def test_constraint_masks_rows(self):
+        masks = TokenMasks(VOCAB, [EOS])
+        constraint = GrammarConstraint(masks, 1, [GenerationLimits(100, constrained=True), GenerationLimits(100)])
+        ids = torch.zeros(2, 1, dtype=torch.long)
+        torch.manual_seed(0)
+        for _ in range(400):
+            scores = constraint(ids, torch.randn(2, EOS + 1))
+            next_ids = scores.argmax(-1)
+            ids = torch.cat([ids, next_ids[:, None]], dim=1)
+            if next_ids[0] == EOS:
+                break
+        self.assertEqual(int(ids[0, -1]), EOS)
+        text = "".join(VOCAB[i] for i in ids[0, 1:-1].tolist())
+        self.assertTrue(self.grammar.accepting(self.grammar.advance(START, text)), text)
+        self.assertIsNone(constraint.states[1])  # unconstrained row
+
+if __name__ == '__main__':
+    unittest.main()
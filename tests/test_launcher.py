@@ -0,0 +1,116 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+from src.auto_asset_annotator.config.settings import Config, ModelConfig, DataConfig, ProcessingConfig, PromptConfig
+from src.auto_asset_annotator.core import launcher
+from src.auto_asset_annotator.core.launcher import assign_devices, launch_workers
+from src.auto_asset_annotator.utils.generation_log import latest_generations
+
+CANNED = "Category: x\nDescription: A thing.\nMaterial: wood\nDimensions: 1 m * 2 m * 3 m\nMass: 4 kg\nPlacement: OnFloor"
+
+# Fake engine built inside each worker process (must be importable, hence module level)
+class FakeEngine:
+    def prepare_inputs(self, batch_messages):
+        return len(batch_messages)
+
+    def generate(self, inputs, limits=None):
+        return [CANNED] * inputs
+
+    def inference(self, messages, limits=None):
+        return CANNED
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+def fake_engine_factory(model_config):
+    return FakeEngine()
+
+# Kills its worker process at the first generate call; with model.name "once:<path>"
+# only the first worker to get there dies
+class DyingEngine(FakeEngine):
+    def __init__(self, name):
+        self.name = name
+
+    def generate(self, inputs, limits=None):
+        if self.name.startswith("once:"):
+            try:
+                os.close(os.open(self.name[len("once:"):], os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                return super().generate(inputs, limits)
+        os._exit(3)
+
+def dying_engine_factory(model_config):
+    return DyingEngine(model_config.name)
+
+class TestLauncher(unittest.TestCase):
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        self.output_dir = tempfile.mkdtemp()
+        self.assets = [f"chair/scene-chair-{i}" for i in range(9)]
+        for asset in self.assets:
+            os.makedirs(os.path.join(self.input_dir, asset))
+            Image.new("RGB", (28, 28)).save(os.path.join(self.input_dir, asset, "0.png"))
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+        shutil.rmtree(self.output_dir)
+
+    def test_assign_devices(self):
+        self.assertEqual(assign_devices([], 2), [None, None])
+        self.assertEqual(assign_devices(["0", "1", "2", "3"], 2), ["0,1", "2,3"])
+        self.assertEqual(assign_devices(["0", "1"], 4), ["0", "1", "0", "1"])
+        self.assertEqual(assign_devices([str(i) for i in range(6)], 4), ["0,1", "2,3", "4", "5"])
+
+    def config(self, model_name="unused"):
+        return Config(
+            model=ModelConfig(name=model_name),
+            data=DataConfig(input_dir=self.input_dir, output_dir=self.output_dir, views={"front": ["0.png"]}),
+            processing=ProcessingConfig(batch_size=2, prefetch_workers=0),
+            prompts=PromptConfig(),
+        )
+
+    def test_workers_share_assets(self):
+        config = self.config()
+        results = {}
+
+        def on_result(name, result):
+            self.assertNotIn(name, results)
+            results[name] = result
+
+        stats, unprocessed = launch_workers(config, self.assets, on_result, num_workers=2,
+                                            engine_factory=fake_engine_factory, chunk_size=2)
+        self.assertEqual(unprocessed, [])
+        self.assertEqual(set(results), set(self.assets))
+        self.assertEqual(results["chair/scene-chair-4"]["category"], "chair")
+        self.assertEqual(sum(s["annotated"] for s in stats), len(self.assets))
+        self.assertTrue(all("error" not in s for s in stats))
+        # Each worker logged its raw generations
+        logged = latest_generations(self.output_dir)
+        self.assertEqual(set(logged), set(self.assets))
+        self.assertEqual(logged["chair/scene-chair-4"]["text"], CANNED)
+
+    @mock.patch.object(launcher, "_POLL_SECONDS", 0.2)
+    def test_killed_worker_chunk_is_reassigned(self):
+        config = self.config("once:" + os.path.join(self.output_dir, "died"))
+        results = {}
+        stats, unprocessed = launch_workers(config, self.assets, results.__setitem__, num_workers=2,
+                                            engine_factory=dying_engine_factory, chunk_size=2)
+        self.assertEqual(set(results), set(self.assets))
+        self.assertEqual(unprocessed, [])
+        self.assertEqual(sorted("error" in s for s in stats), [False, True])
+
+    @mock.patch.object(launcher, "_POLL_SECONDS", 0.2)
+    def test_all_workers_killed(self):
+        results = {}
+        stats, unprocessed = launch_workers(self.config(), self.assets, results.__setitem__, num_workers=2,
+                                            engine_factory=dying_engine_factory, chunk_size=2)
+        self.assertEqual(results, {})
+        self.assertEqual(unprocessed, self.assets)
+        self.assertTrue(all("error" in s for s in stats))
+
+if __name__ == '__main__':
+    unittest.main()
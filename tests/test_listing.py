@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+from src.auto_asset_annotator.config.settings import DataConfig
+from src.auto_asset_annotator.utils.file import asset_chunk, get_asset_images, list_assets, scan_assets, stream_assets
+from src.auto_asset_annotator.utils.listing import AssetListing, set_asset_listing
+
+class TestAssetListing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.tmp, "input")
+        self.cache_path = os.path.join(self.tmp, "listing.json.gz")
+        layout = {
+            "chair/chair-1": ["0.png", "1.png", "notes.txt"],
+            "chair/chair-2": ["front_view.jpg", ".front_hidden.jpg"],
+            "chair/chair-2/thumbnails": ["0.png"],
+            "lamp/sub/lamp-10": ["3.PNG", "10.png", "2.png"],
+            "lamp/empty": ["readme.md"],
+        }
+        for rel_dir, files in layout.items():
+            os.makedirs(os.path.join(self.input_dir, rel_dir), exist_ok=True)
+            for name in files:
+                open(os.path.join(self.input_dir, rel_dir, name), "w").close()
+        self.configs = [
+            DataConfig(input_dir=self.input_dir, output_dir="unused", views={"front": ["0.png", "front*"], "left": ["1.png"]}),
+            DataConfig(input_dir=self.input_dir, output_dir="unused", views={"front": ["missing.png"]}),
+            DataConfig(input_dir=self.input_dir, output_dir="unused", views={"front": ["0.png"]}, use_thumbnails_dir=True),
+        ]
+
+    def tearDown(self):
+        set_asset_listing(None)
+        shutil.rmtree(self.tmp)
+
+    def test_matches_filesystem_lookup(self):
+        expected_assets = list_assets(self.input_dir)
+        expected_images = [{asset: get_asset_images(os.path.join(self.input_dir, asset), config) for asset in expected_assets}
+                           for config in self.configs]
+        assets, listing = scan_assets(self.input_dir, self.cache_path, "thumbnails")
+        self.assertEqual(assets, expected_assets)
+        for config, expected in zip(self.configs, expected_images):
+            self.assertEqual({asset: get_asset_images(os.path.join(self.input_dir, asset), config) for asset in assets}, expected)
+
+    def test_cached_listing_is_refreshed_by_mtime(self):
+        scan_assets(self.input_dir, self.cache_path, "thumbnails")
+        listing = AssetListing(self.input_dir, self.cache_path, "thumbnails")
+        self.assertTrue(listing.load())
+        listing.refresh()
+        self.assertEqual(listing.scanned, 0)
+
+        os.makedirs(os.path.join(self.input_dir, "lamp", "lamp-11"))
+        open(os.path.join(self.input_dir, "lamp", "lamp-11", "0.png"), "w").close()
+        os.remove(os.path.join(self.input_dir, "chair", "chair-1", "1.png"))
+        assets = listing.refresh()
+        self.assertEqual(listing.scanned, 3)  # lamp, the new lamp-11 and chair-1
+        self.assertEqual(assets, list_assets(self.input_dir))
+        self.assertEqual(listing.files(os.path.join(self.input_dir, "chair", "chair-1")), ["0.png", "notes.txt"])
+
+    def test_parallel_and_streaming_scan(self):
+        for i in range(30):
+            os.makedirs(os.path.join(self.input_dir, f"cat{i % 3}", f"asset-{i}"))
+            open(os.path.join(self.input_dir, f"cat{i % 3}", f"asset-{i}", "0.png"), "w").close()
+        expected = list_assets(self.input_dir)
+        self.assertEqual(list_assets(self.input_dir, workers=4), expected)
+
+        streamed = stream_assets(self.input_dir, self.cache_path, "thumbnails", workers=4)
+        first = next(streamed)
+        self.assertFalse(os.path.exists(self.cache_path))  # the walk is still running
+        self.assertEqual(sorted([first] + list(streamed)), sorted(expected))
+        listing = AssetListing(self.input_dir, self.cache_path, "thumbnails")
+        self.assertTrue(listing.load())
+        self.assertEqual(listing.refresh(workers=4), expected)
+        self.assertEqual(listing.scanned, 0)
+
+    def test_asset_chunk(self):
+        names = [f"cat{i % 7}/asset-{i}" for i in range(2000)]
+        chunks = [asset_chunk(name, 4) for name in names]
+        self.assertTrue(all(400 < chunks.count(k) < 600 for k in range(4)))
+        self.assertEqual(asset_chunk("chair/chair-1", 4), 3)  # stable across processes and runs
+
+    def test_asset_list_file(self):
+        assets, listing = scan_assets(self.input_dir, self.cache_path, None, ["chair/chair-2"])
+        self.assertEqual(assets, ["chair/chair-2"])
+        self.assertIsNone(listing.files(os.path.join(self.input_dir, "chair", "chair-1")))  # falls back to the filesystem
+        self.assertEqual(get_asset_images(os.path.join(self.input_dir, "chair", "chair-1"), self.configs[0]),
+                         {"front": os.path.join(self.input_dir, "chair", "chair-1", "0.png"),
+                          "left": os.path.join(self.input_dir, "chair", "chair-1", "1.png")})
+
+if __name__ == '__main__':
+    unittest.main()
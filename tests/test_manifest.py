@@ -0,0 +1,66 @@
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from src.auto_asset_annotator.utils.manifest import (
+    AnnotationManifest, classify_result, STATUS_OK, STATUS_FAILED, STATUS_INCOMPLETE,
+)
+
+COMPLETE = {"category": "cup", "description": "A cup.", "material": "ceramic",
+            "dimensions": "0.1 * 0.1 * 0.1", "mass": "0.2", "placement": "OnTable"}
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def write(self, asset_name, content):
+        path = os.path.join(self.output_dir, f"{asset_name}_annotation.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+
+    def test_classify_result(self):
+        self.assertEqual(classify_result(COMPLETE), STATUS_OK)
+        self.assertEqual(classify_result({"raw_output": "**Image"}), STATUS_FAILED)
+        self.assertEqual(classify_result(dict(COMPLETE, mass=None)), STATUS_INCOMPLETE)
+        self.assertEqual(classify_result(dict(COMPLETE, placement=" ")), STATUS_INCOMPLETE)
+        self.assertEqual(classify_result("Cup"), STATUS_OK)
+
+    def test_sync_and_pending(self):
+        self.write("cup/ok-1", {"cup/ok-1": COMPLETE})
+        self.write("cup/failed-1", {"cup/failed-1": {"raw_output": "..."}})
+        self.write("cup/incomplete-1", {"cup/incomplete-1": dict(COMPLETE, material="")})
+        self.write("cup/truncated-1", '{"cup/truncated-1": {"categ')
+        assets = ["cup/ok-1", "cup/failed-1", "cup/incomplete-1", "cup/truncated-1", "cup/new-1"]
+
+        manifest = AnnotationManifest(self.output_dir)
+        self.assertFalse(manifest.synced)
+        self.assertEqual(manifest.sync_from_files(), 3)
+        self.assertTrue(manifest.synced)
+
+        self.assertEqual(manifest.pending(assets), ["cup/failed-1", "cup/truncated-1", "cup/new-1"])
+        self.assertEqual(manifest.pending(assets, retry_incomplete=True),
+                         ["cup/failed-1", "cup/incomplete-1", "cup/truncated-1", "cup/new-1"])
+        self.assertEqual(manifest.pending(assets, force=True), assets)
+
+        manifest.record("cup/new-1", COMPLETE)
+        manifest.record("cup/failed-1", dict(COMPLETE, mass=""))
+        manifest.close()
+
+        # Statuses persist across runs
+        reopened = AnnotationManifest(self.output_dir)
+        self.assertTrue(reopened.synced)
+        self.assertEqual(reopened.pending(assets), ["cup/truncated-1"])
+        self.assertEqual(set(reopened.statuses(STATUS_INCOMPLETE)), {"cup/incomplete-1", "cup/failed-1"})
+        reopened.clear()
+        self.assertFalse(reopened.synced)
+        self.assertEqual(reopened.statuses(), {})
+        reopened.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from src.auto_asset_annotator.utils.manifest import AnnotationManifest, STATUS_INCOMPLETE, STATUS_OK
+from src.auto_asset_annotator.utils.output_store import FileOutputStore
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "merge_annotations.py")
+spec = importlib.util.spec_from_file_location("merge_annotations", SCRIPT)
+merge_annotations = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(merge_annotations)
+
+PARSED = {"category": "cup", "description": "A cup.", "material": "ceramic",
+          "dimensions": "0.1 * 0.1 * 0.1", "mass": "0.2", "placement": "OnTable"}
+
+class TestMergeAnnotations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.old_dir = os.path.join(self.tmp, "old")
+        self.new_dir = os.path.join(self.tmp, "new")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_merged_assets_leave_retry_list(self):
+        FileOutputStore(self.old_dir).write_many([("cup/a", dict(PARSED, mass="")), ("cup/b", dict(PARSED, material=""))])
+        FileOutputStore(self.new_dir).write_many([("cup/a", PARSED), ("cup/b", dict(PARSED, material=""))])
+        manifest = AnnotationManifest(self.old_dir)
+        manifest.sync_from_files()
+        self.assertEqual(manifest.pending(["cup/a", "cup/b"], retry_incomplete=True), ["cup/a", "cup/b"])
+
+        argv = ["merge_annotations.py", "--old_dir", self.old_dir, "--new_dir", self.new_dir, "--apply"]
+        with mock.patch.object(sys, "argv", argv), mock.patch("builtins.print"):
+            merge_annotations.main()
+
+        self.assertEqual(FileOutputStore(self.old_dir).load_all()["cup/a"], PARSED)
+        self.assertEqual(manifest.statuses(), {"cup/a": STATUS_OK, "cup/b": STATUS_INCOMPLETE})
+        self.assertEqual(manifest.pending(["cup/a", "cup/b"], retry_incomplete=True), ["cup/b"])
+        manifest.close()
+
+if __name__ == '__main__':
+    unittest.main()
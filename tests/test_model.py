@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+import torch
+from PIL import Image
+from transformers import BatchFeature
+from src.auto_asset_annotator.config.settings import ModelConfig
+from src.auto_asset_annotator.core.model import ModelEngine
+
+PAD, EOS, IMAGE = 0, 1, "#"
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+# Character-level processor: token id == code point, every image becomes one IMAGE token
+class CharProcessor:
+    def __init__(self):
+        self.tokenizer = self
+        self.padding_side = "left"
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        content = messages[0]["content"]
+        return "".join(item["text"] if item["type"] == "text" else "<image>" for item in content) + ":"
+
+    def __call__(self, text, images=None, videos=None, padding=True, return_tensors="pt"):
+        images = list(images or [])
+        rows = []
+        for prompt in text:
+            while "<image>" in prompt:
+                self.images_seen.append(images.pop(0).getpixel((0, 0)))
+                prompt = prompt.replace("<image>", IMAGE, 1)
+            rows.append([ord(c) for c in prompt])
+        assert not images, "every image must be consumed by a placeholder"
+        width = max(len(r) for r in rows)
+        input_ids = [[PAD] * (width - len(r)) + r for r in rows]  # left padding
+        attention_mask = [[0] * (width - len(r)) + [1] * len(r) for r in rows]
+        return BatchFeature({"input_ids": torch.tensor(input_ids), "attention_mask": torch.tensor(attention_mask)})
+
+    def batch_decode(self, sequences, skip_special_tokens=True, clean_up_tokenization_spaces=False):
+        special = {PAD, EOS} if skip_special_tokens else set()
+        return ["".join(chr(int(i)) for i in ids if int(i) not in special) for ids in sequences]
+
+# Echoes each row's prompt (pad tokens removed) and ends it with EOS; rows that finish
+# early are padded up to the longest row, as transformers' generate does
+class EchoModel:
+    device = torch.device("cpu")
+
+    def forward(self, input_ids=None, attention_mask=None):
+        raise NotImplementedError
+
+    def generate(self, input_ids=None, attention_mask=None, max_new_tokens=None, temperature=None, **kwargs):
+        assert not attention_mask[:, -1].eq(0).any(), "prompts must be left-padded"
+        answers = [[int(i) for i, m in zip(row, mask) if m] + [ord("!"), EOS] for row, mask in zip(input_ids, attention_mask)]
+        width = max(len(a) for a in answers)
+        new_tokens = torch.tensor([a + [PAD] * (width - len(a)) for a in answers])
+        return torch.cat([input_ids, new_tokens], dim=1)
+
+class StubEngine(ModelEngine):
+    def load(self):
+        self.model = EchoModel()
+        self.processor = CharProcessor()
+        self.processor.images_seen = []
+        self.prefix_cache = None
+        self.token_masks = None
+        self.mask_tensors = {}
+        self.pixel_cache = None
+
+def conversation(text, images):
+    return [{"role": "user", "content": [{"type": "text", "text": text}] +
+             [{"type": "image_url", "image": path} for path in images]}]
+
+class TestModelEngine(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.images = []
+        for i, color in enumerate(COLORS):
+            path = os.path.join(self.root, f"{i}.png")
+            Image.new("RGB", (28, 28), color).save(path)
+            self.images.append(path)
+        self.engine = StubEngine(ModelConfig(name="unused"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_batch_keeps_order_and_strips_padding(self):
+        batch = [
+            conversation("short", self.images[:2]),
+            conversation("a much longer prompt without images", []),
+            conversation("mid", self.images[2:]),
+        ]
+        outputs = self.engine.inference_batch(batch)
+        self.assertEqual(outputs, ["short##:!", "a much longer prompt without images:!", "mid#:!"])
+        # Images reach the processor in conversation order
+        self.assertEqual(self.engine.processor.images_seen, COLORS)
+        # Each row decodes the same whether batched with longer rows or alone
+        self.assertEqual([self.engine.inference(messages) for messages in batch], outputs)
+
+if __name__ == '__main__':
+    unittest.main()
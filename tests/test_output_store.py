@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from src.auto_asset_annotator.export import export_output_dir
+from src.auto_asset_annotator.reparse import RECOVERED, reparse_output_dir
+from src.auto_asset_annotator.utils.category_stats import CategoryStats
+from src.auto_asset_annotator.utils.manifest import AnnotationManifest, STATUS_FAILED, STATUS_OK
+from src.auto_asset_annotator.utils.output_store import (
+    SHARD_DIRNAME, FileOutputStore, JsonlOutputStore, OutputStore, detect_output_format, open_output_store,
+)
+
+RAW = "**Category:** Mug\n**Description:** A mug.\n**Material:** ceramic\n**Dimensions:** 0.1 m * 0.1 m * 0.12 m\n**Mass:** 0.3 kg\n**Placement:** OnTable"
+PARSED = {"category": "cup", "description": "A cup.", "material": "ceramic",
+          "dimensions": "0.1 * 0.1 * 0.1", "mass": "0.2", "placement": "OnTable"}
+
+class TestOutputStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_jsonl_latest_record_wins(self):
+        output_dir = os.path.join(self.tmp, "out")
+        store = JsonlOutputStore(output_dir, shard_bytes=200)
+        store.write("cup/a", {"raw_output": "**Image"})
+        store.write_many([("cup/b", PARSED), ("lamp/c", "free text")])
+        store.write("cup/a", PARSED)  # re-annotated
+        # Readable before close: every write_many is flushed
+        self.assertEqual(JsonlOutputStore(output_dir).load_all(), {"cup/a": PARSED, "cup/b": PARSED, "lamp/c": "free text"})
+        store.close()
+
+        shard_dir = os.path.join(output_dir, SHARD_DIRNAME)
+        shards = sorted(os.listdir(shard_dir))
+        self.assertGreater(len(shards), 1)  # rotated after shard_bytes
+        with open(os.path.join(shard_dir, shards[-1]), "a", encoding="utf-8") as f:
+            f.write('{"asset": "cup/d", "res')  # writer killed mid-line
+        self.assertEqual(detect_output_format(output_dir), "jsonl")
+        reopened = open_output_store(output_dir)
+        self.assertEqual(reopened.load_all(), {"cup/a": PARSED, "cup/b": PARSED, "lamp/c": "free text"})
+        self.assertEqual(reopened.get_many(["cup/a", "cup/missing"]), {"cup/a": PARSED})
+
+    def test_incomplete_backend_fails_on_creation(self):
+        class WriteOnlyStore(OutputStore):
+            def write_many(self, items):
+                pass
+
+        with self.assertRaises(TypeError):
+            WriteOnlyStore(self.tmp)
+
+    def test_file_store_layout(self):
+        output_dir = os.path.join(self.tmp, "out")
+        store = FileOutputStore(output_dir)
+        store.write("cup/a", PARSED)
+        with open(os.path.join(output_dir, "cup", "a_annotation.json"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"cup/a": PARSED})
+        with open(os.path.join(output_dir, "cup", "broken_annotation.json"), "w") as f:
+            f.write('{"cup/broken": {"categ')
+        self.assertEqual(detect_output_format(output_dir), "files")
+        store.write("cup/mug", dict(PARSED, material="陶瓷"))
+        with open(os.path.join(output_dir, "cup", "mug_annotation.json"), encoding="utf-8") as f:
+            self.assertIn("陶瓷", f.read())  # written as text, not \uXXXX escapes
+        self.assertEqual(store.load_all(), {"cup/a": PARSED, "cup/broken": None, "cup/mug": dict(PARSED, material="陶瓷")})
+
+    def test_export_round_trip_and_index(self):
+        files_dir = os.path.join(self.tmp, "files")
+        FileOutputStore(files_dir).write_many([("cup/a", PARSED), ("cup/b", {"raw_output": RAW})])
+        jsonl_dir = os.path.join(self.tmp, "jsonl")
+        self.assertEqual(export_output_dir(files_dir, jsonl_dir, "jsonl"), 2)
+        manifest = AnnotationManifest(jsonl_dir)
+        self.assertTrue(manifest.synced)
+        self.assertEqual(manifest.statuses(), {"cup/a": STATUS_OK, "cup/b": STATUS_FAILED})
+        manifest.close()
+        stats = CategoryStats(jsonl_dir)
+        self.assertEqual(stats.categories(), {"cup": 1})
+
+        # Re-parse appends the recovered record to the shards and counts it
+        summary = reparse_output_dir(jsonl_dir, apply=True, show_progress=False)
+        self.assertEqual(summary["outcomes"][RECOVERED], 1)
+        self.assertEqual(open_output_store(jsonl_dir).load_all()["cup/b"]["material"], "ceramic")
+        self.assertEqual(stats.categories(), {"cup": 2})
+        stats.close()
+
+        back_dir = os.path.join(self.tmp, "back")
+        self.assertEqual(export_output_dir(jsonl_dir, back_dir, "files"), 2)
+        self.assertEqual(FileOutputStore(back_dir).load_all(), open_output_store(jsonl_dir).load_all())
+
+    def test_sync_from_results(self):
+        output_dir = os.path.join(self.tmp, "out")
+        store = JsonlOutputStore(output_dir)
+        store.write_many([("cup/a", PARSED), ("cup/b", {"raw_output": "x"})])
+        store.close()
+        manifest = AnnotationManifest(output_dir)
+        self.assertEqual(manifest.sync_from_results(store.iter_results()), 2)
+        self.assertEqual(manifest.pending(["cup/a", "cup/b", "cup/c"]), ["cup/b", "cup/c"])
+        manifest.close()
+
+if __name__ == '__main__':
+    unittest.main()
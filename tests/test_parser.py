@@ -0,0 +1,53 @@
+
+import random
+import re
+import unittest
+from src.auto_asset_annotator.core.parser import parse_annotation, parse_fields
+
+KEYS = ["Category", "Description", "Material", "Dimensions", "Mass", "Placement"]
+
+# The original per-key regex parser, kept as the reference the single-pass parser must match
+def reference_parse(text):
+    result = {}
+    for key in KEYS:
+        pattern = r"(?:^|\n)[\*#\-]*\s*(" + key + r")\s*:\s*([\s\S]*?)(?=(?:^|\n)[\*#\-]*\s*(?:Category|Description|Material|Dimensions|Mass|Placement)\s*:|$)"
+        match = re.search(pattern, text, re.IGNORECASE)
+        result[key.lower()] = re.sub(r'^[\*#\-]*\s*', '', match.group(2).strip()) if match else None
+    if all(v is None for v in result.values()):
+        return {}
+    return result
+
+CASES = [
+    "Category: Bowl\nDescription: A blue bowl\nMaterial: Ceramic",
+    "### Object 1\n\n**Category:** Ceiling Panel\n\n**Description:** Flat.\n\n**Mass:** 10 kg\n\n---\n\n### Object 2\n\n**Category:** Pole",
+    "\nHere is the info:\n* Category: Bowl\n* Description: \nA white bowl.\nVery round.\n* Material: Ceramic\n",
+    "* **Category:** Tool\n* **Mass:** 0.05 kg",
+    "Category:\nDescription: x\nMass :\n\n  Placement: OnFloor\n",  # empty values swallow the next header
+    "CATEGORY: cup\ncategory: mug\nmass: 1",
+    "Category\n: split colon\n-\n Material: wood",
+    "no headers at all",
+    "",
+]
+
+class TestParser(unittest.TestCase):
+    def test_matches_reference(self):
+        for text in CASES:
+            self.assertEqual(parse_fields(text), reference_parse(text), repr(text))
+
+    def test_matches_reference_fuzzed(self):
+        pieces = ["\n", "\n\n", " ", "*", "**", "#", "-", ":", " \n", "Category", "mass", "Mass:", "Placement",
+                  "Description:", "Material :", "Dimensions", "wood", "0.5 * 1 m", "OnFloor", "Object 1", "\t"]
+        rng = random.Random(0)
+        for _ in range(3000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+            self.assertEqual(parse_fields(text), reference_parse(text), repr(text))
+
+    def test_parse_annotation(self):
+        text = "**Image\n\nObject 1:\nCategory: Bowl\nDescription: bowl bowl bowl bowl is blue\naddCriterion: x\n\nObject 2:\nCategory: Cup"
+        result = parse_annotation(text)
+        self.assertEqual(result["category"], "Bowl")
+        self.assertEqual(result["description"], "bowl is blue x")
+        self.assertEqual(parse_annotation("  \n"), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+from src.auto_asset_annotator.utils.pixel_cache import PixelCache
+
+class TestPixelCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache = PixelCache(os.path.join(self.tmp, "cache"))
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.tmp, f"{i}.png")
+            Image.new("RGB", (8, 8), (i * 60, 10, 200)).save(path)
+            self.paths.append(path)
+        self.fetched = []
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp)
+
+    def fetch(self, item):
+        self.fetched.append(item["image"])
+        return Image.open(item["image"]).convert("RGB").resize((4, 4))
+
+    def test_miss_then_hit(self):
+        items = [{"image": path, "max_pixels": 16} for path in self.paths]
+        first = self.cache.fetch_many(items, self.fetch)
+        second = self.cache.fetch_many(items, self.fetch)
+        self.assertEqual(len(self.fetched), 3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 3))
+        for image, array in zip(first, second):
+            self.assertIsInstance(array, np.memmap)
+            np.testing.assert_array_equal(np.asarray(image), array)
+
+        # Same content under another path hits; other resize settings miss
+        copy = os.path.join(self.tmp, "copy.png")
+        shutil.copy(self.paths[0], copy)
+        self.cache.fetch_many([{"image": "file://" + copy, "max_pixels": 16}], self.fetch)
+        self.assertEqual(len(self.fetched), 3)
+        self.cache.fetch_many([{"image": self.paths[0], "max_pixels": 64}], self.fetch)
+        self.assertEqual(len(self.fetched), 4)
+
+    def test_lru_eviction(self):
+        self.cache.max_bytes = 2 * 200  # room for two 4x4x3 arrays (.npy header included)
+        self.cache.fetch_many([{"image": self.paths[0]}], self.fetch)
+        self.cache.fetch_many([{"image": self.paths[1]}], self.fetch)
+        self.cache.fetch_many([{"image": self.paths[0]}], self.fetch)  # refresh 0
+        self.cache.fetch_many([{"image": self.paths[2]}], self.fetch)  # evicts 1
+        self.fetched.clear()
+        self.cache.fetch_many([{"image": path} for path in self.paths], self.fetch)
+        self.assertEqual(self.fetched, [self.paths[1]])
+
+if __name__ == '__main__':
+    unittest.main()
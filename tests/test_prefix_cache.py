@@ -0,0 +1,38 @@
+
+import unittest
+from src.auto_asset_annotator.core.prefix_cache import PrefixKVCache
+
+INSTRUCTIONS = list(range(100, 140))
+
+class TestPrefixKVCache(unittest.TestCase):
+    def test_learns_shared_prefix(self):
+        cache = PrefixKVCache(max_entries=2, min_tokens=32)
+        chair = INSTRUCTIONS + [1, 2, 3]
+        table = INSTRUCTIONS + [4, 5]
+        self.assertEqual(cache.lookup(chair), (0, None))
+        self.assertEqual(cache.observe(chair), 0)  # nothing to compare with yet
+        self.assertEqual(cache.lookup(table), (0, None))
+        self.assertEqual(cache.observe(table), len(INSTRUCTIONS))
+        cache.store(INSTRUCTIONS, "kv")
+        self.assertEqual(cache.lookup(chair + [9]), (len(INSTRUCTIONS), "kv"))
+        self.assertEqual(cache.reused_tokens, len(INSTRUCTIONS))
+        # Too short to be worth caching, or already cached
+        self.assertEqual(cache.observe([7] * 10), 0)
+        self.assertEqual(cache.observe([7] * 10 + [8]), 0)
+        cache.observe(INSTRUCTIONS + [1])
+        self.assertEqual(cache.observe(INSTRUCTIONS + [2]), 0)
+
+    def test_longest_match_and_eviction(self):
+        cache = PrefixKVCache(max_entries=2, min_tokens=1)
+        cache.store(INSTRUCTIONS, "short")
+        cache.store(INSTRUCTIONS + [1, 2], "long")
+        self.assertEqual(cache.lookup(INSTRUCTIONS + [1, 2, 3]), (len(INSTRUCTIONS) + 2, "long"))
+        # Only strict prefixes match: one token must be left to process
+        self.assertEqual(cache.lookup(INSTRUCTIONS)[1], None)
+        cache.lookup(INSTRUCTIONS + [5])  # touches "short"
+        cache.store([1, 2, 3], "other")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.lookup(INSTRUCTIONS + [1, 2, 3])[1], "short")  # "long" was evicted
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from src.auto_asset_annotator.config.settings import ModelConfig
+from src.auto_asset_annotator.reparse import (
+    NORMALIZED, RECOVERED, REPARSED, RESTORED, STILL_FAILED, UNCHANGED, UNREADABLE, reparse_output_dir,
+)
+from src.auto_asset_annotator.utils.generation_log import GenerationLog
+from src.auto_asset_annotator.utils.manifest import AnnotationManifest, STATUS_FAILED, STATUS_OK
+
+RAW = "**Category:** Mug\n**Description:** A mug.\n**Material:** ceramic\n**Dimensions:** 0.1 m * 0.1 m * 0.12 m\n**Mass:** 0.3 kg\n**Placement:** OnTable"
+PARSED = {"category": "cup", "description": "A cup.", "material": "ceramic",
+          "dimensions": "0.1 * 0.1 * 0.1 meters", "mass": "0.2", "placement": "OnTable"}
+
+class TestReparse(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.files = {
+            "cup/recoverable": {"cup/recoverable": {"raw_output": RAW}},
+            "cup/hopeless": {"cup/hopeless": {"raw_output": "**Image"}},
+            "cup/units": {"cup/units": PARSED},
+            "cup/clean": {"cup/clean": dict(PARSED, dimensions="0.1 * 0.1 * 0.1")},
+            "cup/broken": '{"cup/broken": {"categ',
+        }
+        for name, content in self.files.items():
+            path = os.path.join(self.output_dir, f"{name}_annotation.json")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content if isinstance(content, str) else json.dumps(content))
+        manifest = AnnotationManifest(self.output_dir)
+        manifest.record_statuses({"cup/recoverable": STATUS_FAILED, "cup/hopeless": STATUS_FAILED})
+        manifest.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def read(self, name):
+        with open(os.path.join(self.output_dir, f"{name}_annotation.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)[name]
+
+    def test_dry_run_then_apply(self):
+        summary = reparse_output_dir(self.output_dir, workers=2, renormalize=True, chunk_size=2, show_progress=False)
+        self.assertEqual(summary["files"], 5)
+        self.assertEqual(summary["outcomes"], {RECOVERED: 1, STILL_FAILED: 1, NORMALIZED: 1, UNCHANGED: 1, UNREADABLE: 1})
+        self.assertEqual(summary["fields"]["dimensions"], 2)
+        self.assertIn("raw_output", self.read("cup/recoverable"))  # dry run writes nothing
+
+        summary = reparse_output_dir(self.output_dir, workers=1, renormalize=True, apply=True, show_progress=False)
+        self.assertEqual(summary["changed"], 2)
+        recovered = self.read("cup/recoverable")
+        self.assertEqual(recovered["category"], "cup")
+        self.assertEqual(recovered["dimensions"], "0.1 * 0.1 * 0.12")
+        self.assertEqual(recovered["mass"], "0.3")
+        self.assertEqual(self.read("cup/units")["dimensions"], "0.1 * 0.1 * 0.1")
+        manifest = AnnotationManifest(self.output_dir)
+        self.assertEqual(manifest.lookup(["cup/recoverable", "cup/hopeless"]),
+                         {"cup/recoverable": STATUS_OK, "cup/hopeless": STATUS_FAILED})
+        manifest.close()
+
+    def test_from_log(self):
+        log = GenerationLog(self.output_dir, ModelConfig(name="m"))
+        prompt = "extract_object_attributes_prompt"
+        log.append("cup/units", prompt, RAW.replace("0.3 kg", "0.4 kg"))  # parsed record, newer generation
+        log.append("cup/hopeless", prompt, "**Image")  # same failure as stored
+        log.append("cup/broken", prompt, RAW)  # corrupted file rebuilt from the log
+        log.append("cup/lost", prompt, RAW)  # no output file at all
+        log.append("cup/clean", "is_symmetric_object_prompt", "No")  # other prompt type: ignored
+        log.close()
+        summary = reparse_output_dir(self.output_dir, workers=1, apply=True, show_progress=False,
+                                     log_dir=self.output_dir, prompt_type=prompt)
+        self.assertEqual(summary["outcomes"], {REPARSED: 1, RESTORED: 2, RECOVERED: 1, UNCHANGED: 2})
+        self.assertEqual(self.read("cup/units")["mass"], "0.4")
+        self.assertEqual(self.read("cup/lost")["dimensions"], "0.1 * 0.1 * 0.12")
+        self.assertEqual(self.read("cup/broken")["category"], "cup")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+from src.auto_asset_annotator.config.settings import Config, ModelConfig, DataConfig, ProcessingConfig, PromptConfig
+from src.auto_asset_annotator.core.pipeline import AnnotationPipeline
+from src.auto_asset_annotator.utils.result_cache import ResultCache
+
+CANNED = "Category: x\nDescription: A thing.\nMaterial: wood\nDimensions: 1 m * 2 m * 3 m\nMass: 4 kg\nPlacement: OnFloor"
+
+# Fake engine counting the requests that reach the model
+class CountingEngine:
+    def __init__(self):
+        self.generated = 0
+
+    def prepare_inputs(self, batch_messages):
+        return len(batch_messages)
+
+    def generate(self, inputs, limits=None):
+        self.generated += inputs
+        return [CANNED] * inputs
+
+    def count_tokens(self, text):
+        return len(text)
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.tmp, "input")
+        for i, category in enumerate(["chair", "chair", "table"]):
+            asset = os.path.join(self.input_dir, category, f"scene-{category}-{i}")
+            os.makedirs(asset)
+            Image.new("RGB", (28, 28), (i, 0, 0)).save(os.path.join(asset, "0.png"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def make_pipeline(self, engine, temperature=0.8):
+        config = Config(
+            model=ModelConfig(name="m", temperature=temperature),
+            data=DataConfig(input_dir=self.input_dir, output_dir="unused", views={"front": ["0.png"]}),
+            processing=ProcessingConfig(),
+            prompts=PromptConfig(),
+        )
+        return AnnotationPipeline(config, engine, result_cache=ResultCache(os.path.join(self.tmp, "cache")))
+
+    def test_lru_eviction(self):
+        cache = ResultCache(os.path.join(self.tmp, "lru"), max_bytes=250)
+        cache.put_many({"a": "x" * 99, "b": "y" * 99})
+        self.assertEqual(cache.get_many(["a", "missing"]), {"a": "x" * 99})  # "a" is now the most recent
+        cache.put_many({"c": "z" * 99})
+        self.assertEqual(set(cache.get_many(["a", "b", "c"])), {"a", "c"})
+        self.assertLessEqual(cache.total_bytes(), 250)
+        cache.close()
+
+    def test_pipeline_reuses_results(self):
+        paths = sorted(os.path.join(root, d) for root, dirs, _ in os.walk(self.input_dir) for d in dirs if "-" in d)
+        engine = CountingEngine()
+        first = self.make_pipeline(engine).process_batch(paths)
+        self.assertEqual(engine.generated, 3)
+
+        # Same images under another category folder: served from the cache, category from the new folder
+        moved = os.path.join(self.input_dir, "sofa", os.path.basename(paths[0]))
+        shutil.copytree(paths[0], moved)
+        second = self.make_pipeline(engine).process_batch(paths + [moved])
+        self.assertEqual(engine.generated, 3)
+        self.assertEqual(second[:3], first)
+        self.assertEqual(second[3]["category"], "sofa")
+
+        # Different generation settings miss
+        self.make_pipeline(engine, temperature=0.1).process_batch(paths[:1])
+        self.assertEqual(engine.generated, 4)
+
+if __name__ == '__main__':
+    unittest.main()
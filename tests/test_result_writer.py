@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from src.auto_asset_annotator.utils.manifest import AnnotationManifest, STATUS_FAILED, STATUS_OK
+from src.auto_asset_annotator.utils.output_store import FileOutputStore, JsonlOutputStore
+from src.auto_asset_annotator.utils.result_writer import ResultWriter
+
+PARSED = {"category": "cup", "description": "A cup.", "material": "ceramic",
+          "dimensions": "0.1 * 0.1 * 0.1", "mass": "0.2", "placement": "OnTable"}
+
+# Store on slow storage, recording the size of every write
+class SlowStore(JsonlOutputStore):
+    def __init__(self, output_dir, delay=0.2, fail=False):
+        super().__init__(output_dir)
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    def write_many(self, items):
+        time.sleep(self.delay)
+        if self.fail:
+            raise OSError("No space left on device")
+        items = list(items)
+        self.calls.append(len(items))
+        super().write_many(items)
+
+class TestResultWriter(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.manifest = AnnotationManifest(self.output_dir)
+
+    def tearDown(self):
+        self.manifest.close()
+        shutil.rmtree(self.output_dir)
+
+    def test_batches_without_blocking(self):
+        store = SlowStore(self.output_dir)
+        writer = ResultWriter({"p": store}, {"p": self.manifest}, batch_size=10, flush_interval=5.0)
+        done = []
+        start = time.monotonic()
+        for i in range(25):
+            writer.submit([("p", f"cup/{i}", PARSED if i % 5 else {"raw_output": "x"})], lambda i=i: done.append(i))
+        writer.submit([], lambda: done.append("failed"))  # nothing to write, callback still ordered
+        self.assertLess(time.monotonic() - start, 0.1)  # the producer never waited on the store
+        writer.flush()
+        self.assertEqual(done, list(range(25)) + ["failed"])
+        self.assertEqual(store.calls, [10, 10, 5])
+        writer.close()
+        statuses = self.manifest.statuses()
+        self.assertEqual(len(statuses), 25)
+        self.assertEqual(statuses["cup/0"], STATUS_FAILED)
+        self.assertEqual(statuses["cup/1"], STATUS_OK)
+        self.assertEqual(len(JsonlOutputStore(self.output_dir).load_all()), 25)
+
+    def test_flush_interval(self):
+        store = SlowStore(self.output_dir, delay=0)
+        writer = ResultWriter({"p": store}, {"p": self.manifest}, batch_size=100, flush_interval=0.1)
+        written = threading.Event()
+        writer.submit([("p", "cup/a", PARSED)], written.set)
+        self.assertTrue(written.wait(2))
+        writer.close()
+
+    def test_error_keeps_index_and_callbacks_back(self):
+        writer = ResultWriter({"p": SlowStore(self.output_dir, delay=0, fail=True)}, {"p": self.manifest})
+        done = []
+        writer.submit([("p", "cup/a", PARSED)], lambda: done.append("cup/a"))
+        with self.assertRaises(RuntimeError):
+            writer.close()
+        self.assertEqual(done, [])
+        self.assertEqual(self.manifest.statuses(), {})
+
+    def test_atomic_file_writes(self):
+        store = FileOutputStore(self.output_dir)
+        writer = ResultWriter({"p": store}, {"p": self.manifest}, flush_interval=0)
+        writer.submit([("p", "cup/a", PARSED), ("p", "cup/b", PARSED)])
+        writer.close()
+        self.assertEqual(sorted(os.listdir(os.path.join(self.output_dir, "cup"))), ["a_annotation.json", "b_annotation.json"])
+        self.assertEqual(store.load_all(), {"cup/a": PARSED, "cup/b": PARSED})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from PIL import Image
+from src.auto_asset_annotator.config.settings import Config, ModelConfig, DataConfig, ProcessingConfig, PromptConfig
+from src.auto_asset_annotator.core.pipeline import AnnotationPipeline
+from src.auto_asset_annotator.core.runner import StagedRunner
+from src.auto_asset_annotator.core.scheduler import ScheduledAsset
+
+CANNED = "Category: x\nDescription: A thing.\nMaterial: wood\nDimensions: 1 m * 2 m * 3 m\nMass: 4 kg\nPlacement: OnFloor"
+
+# Fake engine recording which thread runs each stage
+class FakeEngine:
+    def __init__(self):
+        self.prepare_threads = set()
+        self.generate_threads = set()
+
+    def prepare_inputs(self, batch_messages):
+        self.prepare_threads.add(threading.current_thread().name)
+        return len(batch_messages)
+
+    def generate(self, inputs, limits=None):
+        self.generate_threads.add(threading.current_thread().name)
+        return [CANNED] * inputs
+
+    def inference(self, messages, limits=None):
+        return CANNED
+
+class TestStagedRunner(unittest.TestCase):
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        self.assets = [f"chair/scene-chair-{i}" for i in range(7)]
+        for asset in self.assets:
+            os.makedirs(os.path.join(self.input_dir, asset))
+            Image.new("RGB", (28, 28)).save(os.path.join(self.input_dir, asset, "0.png"))
+        os.makedirs(os.path.join(self.input_dir, "chair/empty-1"))
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+
+    def run_pipeline(self, prefetch_workers):
+        config = Config(
+            model=ModelConfig(name="unused"),
+            data=DataConfig(input_dir=self.input_dir, output_dir="unused", views={"front": ["0.png"]}),
+            processing=ProcessingConfig(prefetch_workers=prefetch_workers, queue_size=2),
+            prompts=PromptConfig(),
+        )
+        engine = FakeEngine()
+        runner = StagedRunner(AnnotationPipeline(config, engine), config.processing)
+        results = {}
+        lock = threading.Lock()
+
+        def on_result(name, result):
+            with lock:
+                self.assertNotIn(name, results)
+                results[name] = result
+
+        names = self.assets + ["chair/empty-1"]
+        batches = [[ScheduledAsset(n) for n in names[i:i + 3]] for i in range(0, len(names), 3)]
+        runner.run(batches, "extract_object_attributes_prompt", on_result)
+        return engine, results
+
+    def test_staged_results(self):
+        engine, results = self.run_pipeline(prefetch_workers=2)
+        self.assertEqual(set(results), set(self.assets) | {"chair/empty-1"})
+        self.assertIsNone(results["chair/empty-1"])
+        self.assertEqual(results["chair/scene-chair-3"]["category"], "chair")
+        self.assertEqual(results["chair/scene-chair-3"]["mass"], "4")
+        # Preprocessing happens off the engine thread
+        self.assertTrue(all(name.startswith("prefetch") for name in engine.prepare_threads))
+        self.assertEqual(engine.generate_threads, {threading.current_thread().name})
+
+    def test_multi_prompt(self):
+        config = Config(
+            model=ModelConfig(name="unused"),
+            data=DataConfig(input_dir=self.input_dir, output_dir="unused", views={"front": ["0.png"]}),
+            processing=ProcessingConfig(),
+            prompts=PromptConfig(),
+        )
+        pipeline = AnnotationPipeline(config, FakeEngine())
+        types = ["extract_object_attributes_prompt", "classify_object_category_prompt"]
+        batch = pipeline.prepare_batch([os.path.join(self.input_dir, a) for a in self.assets[:2]] +
+                                       [os.path.join(self.input_dir, "chair/empty-1")], types)
+        # One row per (asset, prompt type); the asset without views gets none
+        self.assertEqual(batch.inputs, 4)
+        self.assertEqual(batch.request_prompts, types * 2)
+        results = pipeline.finish_batch(batch, pipeline.generate_batch(batch))
+        self.assertEqual(set(results[0]), set(types))
+        self.assertEqual(results[0]["extract_object_attributes_prompt"]["category"], "chair")
+        self.assertEqual(results[1]["classify_object_category_prompt"], CANNED)
+        self.assertIsNone(results[2])
+
+    def test_inline_matches_staged(self):
+        _, staged = self.run_pipeline(prefetch_workers=2)
+        _, inline = self.run_pipeline(prefetch_workers=0)
+        self.assertEqual(staged, inline)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+from src.auto_asset_annotator.config.settings import Config, ModelConfig, DataConfig, ProcessingConfig, PromptConfig
+from src.auto_asset_annotator.core.scheduler import MicroBatcher, estimate_image_tokens
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        # Assets with 1, 2, 8 and 16 views (no named views -> natsort fallback path)
+        self.view_counts = {"chair/scene-chair-1": 1, "chair/scene-chair-2": 2,
+                            "table/scene-table-1": 8, "table/scene-table-2": 16}
+        for asset, count in self.view_counts.items():
+            asset_dir = os.path.join(self.input_dir, asset)
+            os.makedirs(asset_dir)
+            for i in range(count):
+                Image.new("RGB", (280, 280)).save(os.path.join(asset_dir, f"view_{i}.png"))
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+
+    def make_config(self, batch_size, max_batch_tokens):
+        return Config(
+            model=ModelConfig(name="unused"),
+            data=DataConfig(input_dir=self.input_dir, output_dir="unused", views={}),
+            processing=ProcessingConfig(batch_size=batch_size, max_batch_tokens=max_batch_tokens),
+            prompts=PromptConfig(),
+        )
+
+    def test_estimate_image_tokens(self):
+        path = os.path.join(self.input_dir, "chair/scene-chair-1/view_0.png")
+        # 280x280 -> 10x10 grid of 28px merged patches
+        self.assertEqual(estimate_image_tokens(path), 100)
+        # Bounded by max_pixels
+        self.assertEqual(estimate_image_tokens(path, max_pixels=56 * 56), 4)
+
+    def test_fixed_batches_without_budget(self):
+        batcher = MicroBatcher(self.make_config(batch_size=3, max_batch_tokens=0))
+        batches = list(batcher.batches(sorted(self.view_counts)))
+        self.assertEqual([len(b) for b in batches], [3, 1])
+        # No discovery is done in fixed mode
+        self.assertIsNone(batches[0][0].images)
+
+    def test_budget_groups_similar_assets(self):
+        batcher = MicroBatcher(self.make_config(batch_size=8, max_batch_tokens=2000))
+        batches = list(batcher.batches(sorted(self.view_counts)))
+        names = [[a.name for a in b] for b in batches]
+        # Small assets share a batch, the 16-view asset exceeds the budget alone
+        self.assertIn(["chair/scene-chair-1", "chair/scene-chair-2"], names)
+        self.assertIn(["table/scene-table-2"], names)
+        for batch in batches:
+            self.assertEqual(len({a.name for a in batch}), len(batch))
+            if len(batch) > 1:
+                self.assertLessEqual(len(batch) * max(a.tokens for a in batch), 2000)
+        self.assertEqual(sum(len(b) for b in batches), len(self.view_counts))
+        self.assertEqual(len(batches[0][0].images), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+
+import unittest
+import torch
+from src.auto_asset_annotator.core.model import RowStopping
+from src.auto_asset_annotator.core.stopping import (
+    GenerationLimits, find_repetition, structured_output_complete, trim_repetition,
+)
+
+FIELDS = "**Category:** Chair\n**Description:** A chair.\n**Material:** wood\n**Dimensions:** 1 * 2 * 3\n**Mass:** 4\n"
+
+# Character-level tokenizer: token id == code point, 0 is the pad token
+class CharTokenizer:
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(int(i)) for i in ids if not (skip_special_tokens and int(i) == 0))
+
+def encode(text):
+    return [ord(c) for c in text]
+
+class TestStopping(unittest.TestCase):
+    def test_structured_output_complete(self):
+        self.assertFalse(structured_output_complete(FIELDS))
+        self.assertFalse(structured_output_complete(FIELDS + "**Placement:** OnFloor, OnTa"))
+        self.assertTrue(structured_output_complete(FIELDS + "**Placement:** OnFloor, OnTable\n"))
+        # Placement as a list on the following lines
+        self.assertFalse(structured_output_complete(FIELDS + "**Placement:**\n- OnFloor\n- On"))
+        self.assertTrue(structured_output_complete(FIELDS + "**Placement:**\n- OnFloor\n- OnTable\n\n"))
+        self.assertTrue(structured_output_complete(FIELDS + "Placement:\nOnFloor\n"))
+        # A missing field keeps generation going
+        self.assertFalse(structured_output_complete(FIELDS.replace("**Mass:** 4\n", "") + "Placement: OnFloor\n"))
+
+    def test_repetition(self):
+        loop = "Description: A wooden chair" + " with legs" * 8
+        self.assertEqual(trim_repetition(loop), "Description: A wooden chair with legs")
+        self.assertIsNone(find_repetition(FIELDS))
+        self.assertIsNone(find_repetition("x" + " " * 100))  # whitespace runs are left to the budget
+
+    def test_row_stopping(self):
+        rows = [FIELDS + "Placement: OnFloor\n### Object 2", "Chair" + "s and chairs" * 10, "Chair, wooden"]
+        limits = [GenerationLimits(1000, structured=True), GenerationLimits(1000), GenerationLimits(1000)]
+        stopping = RowStopping(CharTokenizer(), 2, limits)
+        stopping.CHECK_INTERVAL = 1
+        # Rows of one batch have equal length; pad the shorter ones
+        width = max(len(r) for r in rows)
+        ids = torch.tensor([[0, 0] + encode(r) + [0] * (width - len(r)) for r in rows])
+        self.assertEqual(stopping(ids, None).tolist(), [True, True, False])
+        self.assertEqual(stopping.looping, {1})
+        # Budget: each row stops after its own max_new_tokens
+        stopping = RowStopping(CharTokenizer(), 2, [GenerationLimits(4), GenerationLimits(8)])
+        self.assertEqual(stopping(ids[:2, :2 + 5], None).tolist(), [True, False])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from src.auto_asset_annotator.utils.work_queue import LeaseQueue
+
+class TestLeaseQueue(unittest.TestCase):
+    def setUp(self):
+        self.queue_dir = os.path.join(tempfile.mkdtemp(), "queue")
+        self.assets = [f"cup/asset-{i}" for i in range(10)]
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.queue_dir))
+
+    def make_worker(self, worker_id, lease_timeout=600.0):
+        worker = LeaseQueue(self.queue_dir, worker_id, lease_timeout=lease_timeout)
+        worker.initialize(lambda: self.assets + ["cup/asset-0"], batch_size=3)
+        return worker
+
+    def test_initialize_once(self):
+        calls = []
+        first = LeaseQueue(self.queue_dir, "a")
+        self.assertTrue(first.initialize(lambda: calls.append(1) or self.assets, batch_size=3))
+        second = LeaseQueue(self.queue_dir, "b")
+        self.assertFalse(second.initialize(lambda: calls.append(1) or self.assets, batch_size=3))
+        self.assertEqual(calls, [1])
+        self.assertEqual(second.total_assets, 10)
+        self.assertEqual(second.progress()["total"], 4)
+
+    def test_slow_listing_keeps_init_lock(self):
+        # Listing takes several lease timeouts; the heartbeat keeps the init lock fresh
+        calls = []
+
+        def slow_listing():
+            calls.append("a")
+            time.sleep(1.0)
+            return self.assets
+
+        first = LeaseQueue(self.queue_dir, "a", lease_timeout=0.3, heartbeat_interval=0.05)
+        second = LeaseQueue(self.queue_dir, "b", lease_timeout=0.3, heartbeat_interval=0.05)
+        results = {}
+        thread = threading.Thread(target=lambda: results.update(a=first.initialize(slow_listing, batch_size=3)))
+        thread.start()
+        while not os.path.exists(os.path.join(self.queue_dir, "init.lock")):
+            time.sleep(0.01)
+        results["b"] = second.initialize(lambda: calls.append("b") or self.assets, batch_size=3, poll_interval=0.05)
+        thread.join()
+        first._stop.set()
+        self.assertEqual(results, {"a": True, "b": False})
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(second.progress()["total"], 4)
+
+    def test_workers_share_tasks(self):
+        a, b = self.make_worker("a"), self.make_worker("b")
+        claimed = []
+        while True:
+            progressed = False
+            for worker in (a, b):
+                task = worker.claim()
+                if task is not None:
+                    claimed.append(task)
+                    worker.complete(task)
+                    progressed = True
+            if not progressed:
+                break
+        # Every asset claimed exactly once (duplicates in the listing are dropped)
+        self.assertEqual(sorted(x for t in claimed for x in t.assets), sorted(self.assets))
+        self.assertEqual(a.progress(), {"total": 4, "done": 4, "leased": 0, "open": 0})
+        self.assertEqual(list(a.tasks(poll_interval=0)), [])
+
+    def test_live_lease_is_not_taken(self):
+        a, b = self.make_worker("a"), self.make_worker("b")
+        held = [a.claim() for _ in range(4)]
+        self.assertTrue(all(held))
+        self.assertIsNone(b.claim())
+
+    def test_expired_lease_is_reclaimed(self):
+        a = self.make_worker("a")
+        task = a.claim()
+        lease = os.path.join(self.queue_dir, "leases", f"{task.task_id}.lease")
+        old = time.time() - 3600
+        os.utime(lease, (old, old))  # worker "a" stopped heartbeating
+
+        b = self.make_worker("b", lease_timeout=60.0)
+        reclaimed = [b.claim() for _ in range(4)]
+        self.assertIn(task.task_id, [t.task_id for t in reclaimed if t])
+        self.assertTrue(all(reclaimed))
+
+if __name__ == '__main__':
+    unittest.main()